@@ -3,12 +3,26 @@ from .core.extract import (
     extract, 
     extract_to_model, 
     async_extract, 
-    async_extract_to_model
+    async_extract_to_model,
+    async_extract_result,
+    stream_extract,
+    async_stream_extract
+)
+from .core.adapter_manager import (
+    warmup_adapters,
+    close_adapters,
+    aclose_adapters
 )
 
 __all__ = [
     "extract", 
     "extract_to_model", 
     "async_extract", 
-    "async_extract_to_model"
+    "async_extract_to_model",
+    "async_extract_result",
+    "stream_extract",
+    "async_stream_extract",
+    "warmup_adapters",
+    "close_adapters",
+    "aclose_adapters"
 ]
\ No newline at end of file
@@ -4,24 +4,237 @@
 """
 import os
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Union
 from pydantic import BaseModel, Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 import yaml
 
 
+class ModelPrice(BaseModel):
+    """单个模型的计费单价（每千 Token），覆盖所属提供商的默认单价"""
+    input_price_per_1k: float = 0.0
+    output_price_per_1k: float = 0.0
+    cached_input_price_per_1k: Optional[float] = None
+
+
 class ModelConfig(BaseModel):
     """模型配置"""
     name: str = ""
     temperature: float = 0.1
     max_tokens: int = 4096
     timeout: int = 60
+    # 计费单价（每千 Token），用于成本预估
+    input_price_per_1k: float = 0.0
+    output_price_per_1k: float = 0.0
+    # 命中上下文缓存的输入 Token 单价（为空时按普通输入单价计）
+    cached_input_price_per_1k: Optional[float] = None
+    # 同一提供商下其他模型（如路由规则指定的模型）的单价：模型名 -> 单价
+    model_prices: Dict[str, ModelPrice] = Field(default_factory=dict)
+    # HTTP 接入地址与连接池配置（为空时使用适配器默认地址）
+    base_url: Optional[str] = None
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0
+    # 客户端限流：每分钟请求数 / 每分钟 Token 数（为空表示不限制）
+    rpm: Optional[int] = None
+    tpm: Optional[int] = None
+    # 单进程内对该提供商的最大并发请求数（为空表示不限制）
+    max_concurrency: Optional[int] = None
+    # 模型在服务端的驻留时长（Ollama keep_alive，如 "30m"；负数表示常驻）
+    keep_alive: Optional[Union[int, str]] = None
+
+
+class FailoverConfig(BaseModel):
+    """多提供商故障切换与熔断配置"""
+    # 按优先级排列的提供商列表
+    providers: List[str] = Field(default_factory=list)
+    # 连续失败次数达到该值即熔断
+    failure_threshold: int = 5
+    # 滑动窗口（最近 window_size 次调用，且不少于 min_calls 次）内失败率达到该值即熔断
+    failure_rate_threshold: float = 0.5
+    window_size: int = 20
+    min_calls: int = 10
+    # 熔断后经过多少秒进入半开状态放行探测请求
+    recovery_timeout: float = 30.0
+    half_open_max_calls: int = 1
+
+
+class MockConfig(BaseModel):
+    """录制 / 回放模拟适配器配置，用于压测与基准测试"""
+    # replay：回放录制结果；record：调用 record_provider 并录制响应
+    mode: str = "replay"
+    record_provider: str = "dashscope"
+    # 按 (schema, 提示词哈希) 存放的录制目录
+    recordings_dir: str = "outputs/mock_recordings"
+    # 无精确录制时按 schema 回放的历史输出（如 outputs/*/raw_markdown/<schema>.md）
+    replay_globs: List[str] = Field(default_factory=lambda: ["outputs/*/raw_markdown"])
+    # 延迟分布：constant / uniform / normal / lognormal / exponential（秒）
+    latency_distribution: str = "lognormal"
+    latency_mean: float = 2.0
+    latency_stddev: float = 1.0
+    latency_min: float = 0.0
+    latency_max: float = 60.0
+    # 注入的错误率：error_rate 返回 503，rate_limit_rate 返回 429
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    # 模拟服务端容量：在途请求超过该值时返回 429（为空表示不限制）
+    capacity: Optional[int] = None
+    # 流式输出：每个分片的字符数，首个分片在总延迟的 first_chunk_ratio 处到达
+    stream_chunk_size: int = 20
+    first_chunk_ratio: float = 0.2
+    # 随机种子：相同的种子与调用顺序产生相同的延迟与错误序列
+    seed: int = 0
 
 
 class LLMConfig(BaseModel):
     """LLM 配置"""
     provider: str = "dashscope"
     models: Dict[str, ModelConfig] = Field(default_factory=dict)
+    failover: FailoverConfig = Field(default_factory=FailoverConfig)
+    mock: MockConfig = Field(default_factory=MockConfig)
+
+
+class RetryConfig(BaseModel):
+    """LLM 调用重试配置"""
+    enabled: bool = True
+    # 单次请求最多尝试次数（含首次）
+    max_attempts: int = 3
+    # 指数退避（全抖动）的初始与最大等待秒数
+    initial_backoff: float = 1.0
+    max_backoff: float = 30.0
+    # 全局重试预算：每次请求存入 budget_ratio 个重试令牌，另每秒保底补充 budget_min_per_second 个
+    budget_ratio: float = 0.2
+    budget_min_per_second: float = 1.0
+    budget_max_tokens: float = 20.0
+
+
+class AdaptiveConcurrencyConfig(BaseModel):
+    """自适应并发（AIMD）配置"""
+    enabled: bool = True
+    initial_limit: int = 8
+    min_limit: int = 1
+    max_limit: int = 64
+    # 遇到限流 / 超时 / 延迟劣化时窗口乘以该系数
+    backoff_ratio: float = 0.5
+    # 延迟超过健康基线的倍数即视为劣化
+    latency_tolerance: float = 3.0
+    # 两次收缩之间的最短间隔（秒）
+    cooldown: float = 2.0
+
+
+class SchedulerConfig(BaseModel):
+    """优先级与租户公平调度配置：交互请求优先于批量请求，同一优先级内各租户 / 批量任务按权重分享提供商并发"""
+    enabled: bool = False
+    # 每个提供商的并发槽位；0 表示跟随自适应并发窗口（未启用时取提供商 max_concurrency 或 adaptive_concurrency.initial_limit）
+    max_concurrency: int = 0
+    # 为交互请求保留的槽位：批量请求最多占用 槽位数 - reserved_slots 个（至少 1 个）
+    reserved_slots: int = 1
+    # 请求上下文未指定优先级时使用：interactive | batch
+    default_priority: str = "interactive"
+    # 租户（批量任务以任务名作为租户）的权重，未列出的使用 default_weight
+    tenant_weights: Dict[str, float] = Field(default_factory=dict)
+    default_weight: float = 1.0
+
+
+class HedgingConfig(BaseModel):
+    """对冲请求配置：慢请求超过延迟分位数阈值后补发一个副本，先返回者胜出"""
+    enabled: bool = False
+    # 按 schema 在线统计的延迟分位数，作为补发阈值
+    percentile: float = 0.95
+    # 样本数不足时不对冲
+    min_samples: int = 20
+    window_size: int = 200
+    # 阈值下限（秒），避免对本身很快的调用对冲
+    min_delay: float = 1.0
+    # 对冲请求占总请求量的比例上限（令牌桶：每个请求存入 max_hedge_ratio 个令牌）
+    max_hedge_ratio: float = 0.05
+    # 令牌桶容量，即空闲后突发流量最多额外对冲的次数
+    max_hedge_burst: float = 10.0
+    # 对冲副本发往的提供商（为空时发往同一提供商）
+    provider: Optional[str] = None
+
+
+class BatchInferenceConfig(BaseModel):
+    """离线批量推理（服务商 Batch 接口）配置"""
+    # 提交批量任务的提供商（openai / dashscope，均使用 OpenAI 兼容的 Batch 文件格式）
+    provider: str = "dashscope"
+    completion_window: str = "24h"
+    # 轮询任务状态的间隔与最长等待时间（秒）
+    poll_interval: float = 30.0
+    max_wait: float = 86400.0
+    # 批量输入 / 输出 JSONL 文件的存放目录
+    work_dir: str = "outputs/batch_jobs"
+
+
+class BatchRunnerConfig(BaseModel):
+    """多文档批量运行配置：(文档 × schema) 任务经有界工作池调度"""
+    # 全局并发（工作协程数）
+    concurrency: int = 16
+    # 各提供商的并发上限：提供商 -> 并发数，未列出的只受全局并发限制
+    provider_limits: Dict[str, int] = Field(default_factory=dict)
+    # 目录输入时读取的文件扩展名
+    extensions: List[str] = Field(default_factory=lambda: [".md", ".txt"])
+    # 进度（docs/min、calls/min）报告间隔（秒）
+    report_interval: float = 10.0
+    # 任务清单（输出目录下的 manifest.sqlite3）：失败任务在重新运行时最多尝试的次数
+    max_attempts: int = 3
+    # 运行中任务的租约（秒）：运行期间每隔 lease_seconds / 3 续期，持有进程崩溃后超过该时间可被其他进程重新领取
+    lease_seconds: float = 120.0
+
+
+class ResultSinkConfig(BaseModel):
+    """提取结果写入配置：结果在内存中攒批，由工作线程批量写出"""
+    # files（原有的每个 schema 一个文件）| jsonl | parquet（需要 pyarrow）
+    type: str = "files"
+    # 攒满多少条写出一次
+    batch_size: int = 100
+    # 最长写出间隔（秒），结果较少时也能及时落盘
+    flush_interval: float = 5.0
+    # JSONL 单个文件的大小上限（字节），超过后轮转到新文件
+    jsonl_max_bytes: int = 256 * 1024 * 1024
+    # JSONL / Parquet 中是否保留 LLM 原始输出
+    include_raw: bool = True
+
+
+class RouteRule(BaseModel):
+    """模型路由规则：schema 与预估输入 Token 数均匹配时使用该规则的提供商与模型"""
+    name: str
+    # 适用的 schema，为空表示任意 schema
+    schemas: List[str] = Field(default_factory=list)
+    # 预估输入 Token（系统提示词 + 渲染后的提示词）区间，为空表示不限
+    min_input_tokens: Optional[int] = None
+    max_input_tokens: Optional[int] = None
+    # 为空时分别使用 LLM_PROVIDER 与该提供商配置的模型
+    provider: Optional[str] = None
+    model: Optional[str] = None
+
+
+class RoutingConfig(BaseModel):
+    """按 schema 与输入规模的模型路由配置，规则按顺序匹配，首条命中生效"""
+    enabled: bool = False
+    rules: List[RouteRule] = Field(default_factory=list)
+
+
+class ResponseCacheConfig(BaseModel):
+    """LLM 响应缓存配置：按 (模型, 生成参数, 系统提示词, 提示词) 指纹复用历史响应"""
+    enabled: bool = False
+    # 过期时间（秒），为空表示不过期
+    ttl_seconds: Optional[float] = 7 * 24 * 3600
+    # 内存层与磁盘层（SQLite）的容量上限（字节），超出时淘汰最久未访问的条目
+    memory_max_bytes: int = 64 * 1024 * 1024
+    disk_max_bytes: int = 1024 * 1024 * 1024
+    # SQLite 文件路径（相对项目根目录），为空时只使用内存层
+    path: Optional[str] = "outputs/cache/llm_responses.sqlite3"
+
+
+class ContextCacheConfig(BaseModel):
+    """服务商上下文缓存（Context Cache）管理配置"""
+    # 新建缓存的有效期（秒）
+    ttl_seconds: int = 3600
+    # 距离过期不足该秒数时重新创建，避免调用途中缓存失效
+    refresh_margin: int = 300
+    # 文档哈希 -> 缓存 ID 映射的本地持久化文件（相对项目根目录）
+    path: str = "outputs/cache/context_caches.json"
 
 
 class PromptConfig(BaseModel):
@@ -35,19 +248,69 @@ class ServiceConfig(BaseModel):
     default_schema: str = ""
     task_queue: str = "extract"
     default_timeout: int = 30
+    # HTTP 服务（python -m llm_structured_extract_service.main serve）
+    host: str = "0.0.0.0"
+    port: int = 8000
+    # 同时处理的提取请求数；已满时新请求最多排队 max_queue 个、等待 queue_timeout 秒，超出返回 429
+    max_concurrency: int = 32
+    max_queue: int = 64
+    queue_timeout: float = 30.0
+    # 请求体大小上限（字节）
+    max_body_bytes: int = 10 * 1024 * 1024
+    # 流式响应的心跳间隔（秒），长时间提取期间保持连接
+    stream_heartbeat: float = 15.0
+    # 批量提交的执行方式：local（进程内 BatchRunner）| redis（入队给分布式 Worker）
+    batch_backend: str = "local"
+    # local 模式下同时运行的批量任务数上限，超出返回 429
+    max_batch_jobs: int = 4
+    # local 模式下批量结果的根目录（相对项目根目录）
+    batch_output_dir: str = "outputs/service"
+
+
+class WorkerConfig(BaseModel):
+    """分布式提取 Worker 配置：（文档 × schema）任务经 Redis 队列分发到多个进程 / 节点"""
+    # Redis 键前缀，队列键为 <key_prefix>:<service.task_queue>:*
+    key_prefix: str = "llmx"
+    # 每个 Worker 进程同时处理的任务数
+    concurrency: int = 8
+    # 可见性超时（秒）：任务被领取后在该时间内未确认则重新投递；处理期间 Worker 定期续期
+    visibility_timeout: float = 300.0
+    # 最大投递次数，超过后进入死信队列
+    max_attempts: int = 3
+    # 失败后重新投递前的等待（秒），按已投递次数线性增加
+    retry_delay: float = 10.0
+    # 队列为空时的轮询间隔（秒）
+    poll_interval: float = 1.0
+    # 文档正文在 Redis 中的保留时间（秒）
+    document_ttl: int = 7 * 24 * 3600
+    # 结果写入的根目录（相对项目根目录），每个任务批次写入 <output_dir>/<job>/
+    output_dir: str = "outputs/worker"
 
 
 class YAMLConfig(BaseModel):
     """YAML配置文件结构"""
     llm: LLMConfig = Field(default_factory=LLMConfig)
+    retry: RetryConfig = Field(default_factory=RetryConfig)
+    adaptive_concurrency: AdaptiveConcurrencyConfig = Field(default_factory=AdaptiveConcurrencyConfig)
+    scheduler: SchedulerConfig = Field(default_factory=SchedulerConfig)
+    hedging: HedgingConfig = Field(default_factory=HedgingConfig)
+    batch_inference: BatchInferenceConfig = Field(default_factory=BatchInferenceConfig)
+    batch_runner: BatchRunnerConfig = Field(default_factory=BatchRunnerConfig)
+    result_sink: ResultSinkConfig = Field(default_factory=ResultSinkConfig)
+    routing: RoutingConfig = Field(default_factory=RoutingConfig)
+    response_cache: ResponseCacheConfig = Field(default_factory=ResponseCacheConfig)
+    context_cache: ContextCacheConfig = Field(default_factory=ContextCacheConfig)
     prompts: PromptConfig = Field(default_factory=PromptConfig)
     service: ServiceConfig = Field(default_factory=ServiceConfig)
+    worker: WorkerConfig = Field(default_factory=WorkerConfig)
 
 
 class Settings(BaseSettings):
     """统一配置类 - 合并环境变量和YAML配置"""
     # 环境变量配置（优先级最高）
     DASHSCOPE_API_KEY: str = ""
+    OPENAI_API_KEY: str = ""
+    OPENAI_BASE_URL: str = ""
     LLM_PROVIDER: str = ""
     REDIS_URL: str = ""
     OLLAMA_HOST: str = ""
@@ -155,6 +418,61 @@ class Settings(BaseSettings):
         """获取服务配置"""
         return self.yaml_config.service
 
+    @property
+    def worker_config(self) -> WorkerConfig:
+        """获取分布式 Worker 配置"""
+        return self.yaml_config.worker
+
+    @property
+    def retry_config(self) -> RetryConfig:
+        """获取重试配置"""
+        return self.yaml_config.retry
+
+    @property
+    def adaptive_concurrency_config(self) -> AdaptiveConcurrencyConfig:
+        """获取自适应并发配置"""
+        return self.yaml_config.adaptive_concurrency
+
+    @property
+    def scheduler_config(self) -> SchedulerConfig:
+        """获取公平调度配置"""
+        return self.yaml_config.scheduler
+
+    @property
+    def hedging_config(self) -> HedgingConfig:
+        """获取对冲请求配置"""
+        return self.yaml_config.hedging
+
+    @property
+    def batch_inference_config(self) -> BatchInferenceConfig:
+        """获取离线批量推理配置"""
+        return self.yaml_config.batch_inference
+
+    @property
+    def batch_runner_config(self) -> BatchRunnerConfig:
+        """获取多文档批量运行配置"""
+        return self.yaml_config.batch_runner
+
+    @property
+    def result_sink_config(self) -> ResultSinkConfig:
+        """获取结果写入配置"""
+        return self.yaml_config.result_sink
+
+    @property
+    def routing_config(self) -> RoutingConfig:
+        """获取模型路由配置"""
+        return self.yaml_config.routing
+
+    @property
+    def response_cache_config(self) -> ResponseCacheConfig:
+        """获取响应缓存配置"""
+        return self.yaml_config.response_cache
+
+    @property
+    def context_cache_config(self) -> ContextCacheConfig:
+        """获取上下文缓存管理配置"""
+        return self.yaml_config.context_cache
+
 
 # 全局配置实例
 settings = Settings()
\ No newline at end of file
@@ -0,0 +1,128 @@
+# llm_structured_extract/core/adapter_manager.py
+import threading
+from typing import Dict, Iterable, Optional, Tuple, Type
+from llm_structured_extract.config.settings import settings
+from llm_structured_extract.core.exceptions import ProviderError
+from llm_structured_extract.core.llm_adapters.base_adapter import ADAPTER_REGISTRY, BaseAdapter
+from llm_structured_extract.core.concurrency import AdaptiveConcurrencyAdapter
+from llm_structured_extract.core.hedging import HedgingAdapter
+from llm_structured_extract.core.rate_limit import RateLimitedAdapter
+from llm_structured_extract.core.response_cache import CachingAdapter
+from llm_structured_extract.core.retry import RetryingAdapter
+from llm_structured_extract.core.scheduler import SchedulingAdapter
+from llm_structured_extract.utils.http_pool import aclose_async_clients, close_sync_clients
+from llm_structured_extract.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 进程级适配器缓存：键为 (提供商, 适配器类, 模型配置, 是否带重试层, 覆盖的模型名)，
+# 使连接池与 SDK 状态在多次提取之间复用；配置或注册表变化时自动生成新实例
+_AdapterKey = Tuple[str, Type[BaseAdapter], str, bool, Optional[str]]
+
+_lock = threading.Lock()
+_ADAPTER_CACHE: Dict[_AdapterKey, BaseAdapter] = {}
+
+
+def _resolve_adapter_cls(provider: str) -> Type[BaseAdapter]:
+    adapter_cls = ADAPTER_REGISTRY.get(provider)
+    if not adapter_cls:
+        supported = sorted(ADAPTER_REGISTRY.keys())
+        raise ProviderError(
+            f"Unsupported LLM provider '{provider}'. "
+            f"Supported: {supported or ['(none registered)']}"
+        )
+    return adapter_cls
+
+
+def _build_adapter(provider: str, adapter_cls: Type[BaseAdapter], with_retry: bool, model: Optional[str] = None) -> BaseAdapter:
+    """
+    创建提供商适配器，并按配置由内向外叠加：自适应并发 -> 限流 -> 公平调度 -> 对冲 -> 重试 -> 响应缓存。
+    并发窗口只包住真实调用以准确测量延迟；限流在重试内层，每次重试都重新申请配额。
+    公平调度位于各提供商的并发与限流之外，排队按优先级与租户权重放行，重试的退避等待不占用调度槽位。
+    对冲的主请求与副本各自占用并发与限流配额，一次对冲整体算作一次重试尝试。
+    组合型适配器（如 failover）的子提供商已各自带并发与限流控制，只在外层叠加对冲与重试。
+    响应缓存位于最外层，命中时不占用任何并发、限流与重试配额。
+    """
+    adapter = adapter_cls(model=model) if model else adapter_cls()
+    if not getattr(adapter_cls, "is_composite", False):
+        if settings.adaptive_concurrency_config.enabled:
+            adapter = AdaptiveConcurrencyAdapter(adapter, provider)
+        model_config = settings.get_model_config(provider)
+        if model_config.rpm or model_config.tpm:
+            adapter = RateLimitedAdapter(adapter, provider)
+        if settings.scheduler_config.enabled:
+            adapter = SchedulingAdapter(adapter, provider)
+    # 只对顶层适配器对冲；作为子适配器（with_retry=False）时由外层决定
+    if with_retry and settings.hedging_config.enabled:
+        adapter = HedgingAdapter(adapter, provider)
+    if with_retry and settings.retry_config.enabled:
+        adapter = RetryingAdapter(adapter)
+    if with_retry and settings.response_cache_config.enabled:
+        adapter = CachingAdapter(adapter, provider)
+    return adapter
+
+
+def get_adapter(provider: Optional[str] = None, with_retry: bool = True, model: Optional[str] = None) -> BaseAdapter:
+    """
+    获取（必要时创建）指定提供商的共享适配器实例，默认使用 settings.LLM_PROVIDER。
+    model 覆盖该提供商配置的模型名（用于模型路由），组合型适配器不支持覆盖。
+    """
+    provider = (provider or settings.LLM_PROVIDER).lower()
+    adapter_cls = _resolve_adapter_cls(provider)
+    if model and getattr(adapter_cls, "is_composite", False):
+        raise ProviderError(f"Provider '{provider}' is composite and does not support a model override")
+    key = (provider, adapter_cls, settings.get_model_config(provider).model_dump_json(), with_retry, model)
+
+    with _lock:
+        adapter = _ADAPTER_CACHE.get(key)
+    if adapter is not None:
+        return adapter
+
+    # 在锁外构造：组合型适配器（如 failover）的构造过程会递归获取子适配器
+    adapter = _build_adapter(provider, adapter_cls, with_retry, model=model)
+    with _lock:
+        cached = _ADAPTER_CACHE.setdefault(key, adapter)
+    if cached is adapter:
+        logger.debug(f"Created adapter instance for provider '{provider}'" + (f" with model '{model}'" if model else ""))
+    return cached
+
+
+def warmup_adapters(providers: Optional[Iterable[str]] = None) -> None:
+    """预先创建并预热适配器（如预加载本地模型），默认仅预热 settings.LLM_PROVIDER"""
+    for provider in providers or [settings.LLM_PROVIDER]:
+        adapter = get_adapter(provider)
+        warmup = getattr(adapter, "warmup", None)
+        if callable(warmup):
+            warmup()
+
+
+def _drain_cache():
+    with _lock:
+        adapters = list(_ADAPTER_CACHE.values())
+        _ADAPTER_CACHE.clear()
+    return adapters
+
+
+def close_adapters() -> None:
+    """关闭并清空所有缓存的适配器及共享同步连接池"""
+    for adapter in _drain_cache():
+        close = getattr(adapter, "close", None)
+        if callable(close):
+            try:
+                close()
+            except Exception as e:
+                logger.warning(f"Failed to close adapter {type(adapter).__name__}: {str(e)}")
+    close_sync_clients()
+
+
+async def aclose_adapters() -> None:
+    """在事件循环退出前关闭所有缓存的适配器及共享连接池"""
+    for adapter in _drain_cache():
+        aclose = getattr(adapter, "aclose", None)
+        if callable(aclose):
+            try:
+                await aclose()
+            except Exception as e:
+                logger.warning(f"Failed to close adapter {type(adapter).__name__}: {str(e)}")
+    await aclose_async_clients()
+    close_sync_clients()
@@ -0,0 +1,281 @@
+# llm_structured_extract/core/batch_inference.py
+import json
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Union
+import openai
+from pydantic import BaseModel
+from llm_structured_extract.config.settings import BatchInferenceConfig, settings
+from llm_structured_extract.core.exceptions import (
+    ConfigurationError, LLMCallError, LLMTimeoutError, ParserError, SchemaError
+)
+from llm_structured_extract.core.llm_adapters.base_adapter import status_error
+from llm_structured_extract.core.parser import MarkdownParser
+from llm_structured_extract.core.prompt_engine import build_prompt
+from llm_structured_extract.core.request_context import request_scope
+from llm_structured_extract.core.schema_registry import get_model
+from llm_structured_extract.core.usage import TokenUsage, record_usage, usage_field
+from llm_structured_extract.utils.logger import get_logger
+from llm_structured_extract.utils.strings import clean_markdown_code_block
+
+logger = get_logger(__name__)
+
+# DashScope 的 Batch 接口走 OpenAI 兼容模式
+DASHSCOPE_COMPATIBLE_BASE_URL = "https://dashscope.aliyuncs.com/compatible-mode/v1"
+CHAT_COMPLETIONS_ENDPOINT = "/v1/chat/completions"
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+class BatchTask(NamedTuple):
+    """批量任务中的一次提取：custom_id 在同一批次内唯一，用于回填结果"""
+    custom_id: str
+    schema_name: str
+    text: str
+
+
+class BatchItemResult:
+    """单条批量结果：原始 Markdown、解析后的模型或错误，以及该请求的用量"""
+
+    def __init__(
+        self,
+        custom_id: str,
+        schema_name: str,
+        markdown: Optional[str] = None,
+        model: Optional[BaseModel] = None,
+        error: Optional[Exception] = None,
+        usage: Optional[TokenUsage] = None,
+    ):
+        self.custom_id = custom_id
+        self.schema_name = schema_name
+        self.markdown = markdown
+        self.model = model
+        self.error = error
+        self.usage = usage
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and self.model is not None
+
+
+def build_batch_request(custom_id: str, prompt: str, provider: str, model: Optional[str] = None) -> Dict[str, Any]:
+    """构造 Batch 文件中的一行请求（OpenAI / DashScope 兼容格式）"""
+    model_config = settings.get_model_config(provider)
+    return {
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": CHAT_COMPLETIONS_ENDPOINT,
+        "body": {
+            "model": model or model_config.name,
+            "messages": [
+                {"role": "system", "content": settings.get_system_prompt()},
+                {"role": "user", "content": prompt},
+            ],
+            "temperature": model_config.temperature,
+            "max_tokens": model_config.max_tokens,
+        },
+    }
+
+
+def build_batch_requests(tasks: Iterable[BatchTask], provider: str, model: Optional[str] = None) -> List[Dict[str, Any]]:
+    """按 build_prompt 为每个任务生成提示词并转换为 Batch 请求行"""
+    requests = []
+    seen = set()
+    for task in tasks:
+        if task.custom_id in seen:
+            raise ValueError(f"Duplicate custom_id in batch: {task.custom_id}")
+        seen.add(task.custom_id)
+        try:
+            model_cls = get_model(task.schema_name)
+        except ValueError as e:
+            raise SchemaError(f"Failed to load schema '{task.schema_name}': {str(e)}") from e
+        requests.append(build_batch_request(task.custom_id, build_prompt(task.text, model_cls), provider, model=model))
+    return requests
+
+
+def write_batch_file(requests: Iterable[Dict[str, Any]], path: Union[str, Path]) -> Path:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for request in requests:
+            f.write(json.dumps(request, ensure_ascii=False) + "\n")
+    return path
+
+
+def parse_batch_output(
+    content: str, usage: Optional[Dict[str, Dict[str, Any]]] = None
+) -> Dict[str, Union[str, LLMCallError]]:
+    """
+    解析 Batch 输出 / 错误文件：custom_id -> 生成文本或调用错误。
+    传入 usage 字典时，同时收集每条响应的 usage 字段（custom_id -> usage）。
+    """
+    results: Dict[str, Union[str, LLMCallError]] = {}
+    for line in content.splitlines():
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        custom_id = record.get("custom_id")
+        response = record.get("response") or {}
+        error = record.get("error")
+        status_code = response.get("status_code")
+        if usage is not None and isinstance(response.get("body"), dict) and response["body"].get("usage"):
+            usage[custom_id] = response["body"]["usage"]
+        if error or (status_code and status_code != 200):
+            message = (error or {}).get("message") or json.dumps(response.get("body"), ensure_ascii=False)
+            results[custom_id] = status_error(f"Batch request {custom_id} failed with status {status_code}: {message}", status_code)
+            continue
+        try:
+            content_text = response["body"]["choices"][0]["message"]["content"]
+        except (KeyError, IndexError, TypeError) as e:
+            results[custom_id] = LLMCallError(f"Batch response format error for {custom_id}: {str(e)}")
+            continue
+        if not content_text:
+            results[custom_id] = LLMCallError(f"LLM returned empty response for {custom_id}")
+        else:
+            results[custom_id] = content_text.strip()
+    return results
+
+
+class BatchInferenceClient:
+    """服务商 Batch 接口客户端：上传输入文件、创建批量任务、轮询状态并下载结果"""
+
+    def __init__(
+        self,
+        provider: Optional[str] = None,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        config: Optional[BatchInferenceConfig] = None,
+    ):
+        self.config = config or settings.batch_inference_config
+        self.provider = (provider or self.config.provider).lower()
+        model_config = settings.get_model_config(self.provider)
+
+        if self.provider == "dashscope":
+            key = api_key or settings.DASHSCOPE_API_KEY
+            base_url = base_url or DASHSCOPE_COMPATIBLE_BASE_URL
+        elif self.provider == "openai":
+            key = api_key or settings.OPENAI_API_KEY
+            base_url = base_url or settings.OPENAI_BASE_URL or model_config.base_url or None
+        else:
+            raise ConfigurationError(f"Batch inference is not supported for provider '{self.provider}'. Use openai or dashscope.")
+        if not key:
+            raise ConfigurationError(f"API key for batch provider '{self.provider}' is not set.")
+
+        self.model = model_config.name
+        self.client = openai.OpenAI(api_key=key, base_url=base_url, timeout=model_config.timeout)
+
+    def submit(self, input_path: Union[str, Path], metadata: Optional[Dict[str, str]] = None) -> str:
+        """上传输入文件并创建批量任务，返回 batch id"""
+        try:
+            with open(input_path, "rb") as f:
+                uploaded = self.client.files.create(file=f, purpose="batch")
+            extra = {"metadata": metadata} if metadata else {}
+            batch = self.client.batches.create(
+                input_file_id=uploaded.id,
+                endpoint=CHAT_COMPLETIONS_ENDPOINT,
+                completion_window=self.config.completion_window,
+                **extra,
+            )
+        except openai.OpenAIError as e:
+            raise LLMCallError(f"Failed to submit batch job: {str(e)}") from e
+        logger.info(f"Submitted batch {batch.id} ({input_path}) to {self.provider}")
+        return batch.id
+
+    def wait(self, batch_id: str, poll_interval: Optional[float] = None, max_wait: Optional[float] = None):
+        """轮询直到批量任务结束（completed / failed / expired / cancelled）"""
+        poll_interval = self.config.poll_interval if poll_interval is None else poll_interval
+        max_wait = self.config.max_wait if max_wait is None else max_wait
+        deadline = time.monotonic() + max_wait
+        while True:
+            try:
+                batch = self.client.batches.retrieve(batch_id)
+            except openai.OpenAIError as e:
+                raise LLMCallError(f"Failed to poll batch {batch_id}: {str(e)}") from e
+            if batch.status in TERMINAL_STATUSES:
+                logger.info(f"Batch {batch_id} finished with status {batch.status}")
+                return batch
+            if time.monotonic() + poll_interval > deadline:
+                raise LLMTimeoutError(f"Batch {batch_id} still {batch.status} after {max_wait:.0f}s")
+            logger.debug(f"Batch {batch_id} is {batch.status}, polling again in {poll_interval:.0f}s")
+            time.sleep(poll_interval)
+
+    def _file_text(self, file_id: str) -> str:
+        try:
+            return self.client.files.content(file_id).text
+        except openai.OpenAIError as e:
+            raise LLMCallError(f"Failed to download batch file {file_id}: {str(e)}") from e
+
+    def download_results(
+        self, batch, usage: Optional[Dict[str, Dict[str, Any]]] = None
+    ) -> Dict[str, Union[str, LLMCallError]]:
+        """下载输出文件与错误文件并合并为 custom_id -> 结果；传入 usage 时一并收集用量"""
+        if batch.status != "completed":
+            raise LLMCallError(f"Batch {batch.id} ended with status {batch.status}")
+        results: Dict[str, Union[str, LLMCallError]] = {}
+        if batch.error_file_id:
+            results.update(parse_batch_output(self._file_text(batch.error_file_id), usage))
+        if batch.output_file_id:
+            results.update(parse_batch_output(self._file_text(batch.output_file_id), usage))
+        return results
+
+    def close(self) -> None:
+        self.client.close()
+
+
+def run_batch_extraction(
+    tasks: List[BatchTask],
+    provider: Optional[str] = None,
+    job_name: Optional[str] = None,
+    work_dir: Optional[Union[str, Path]] = None,
+    client: Optional[BatchInferenceClient] = None,
+    poll_interval: Optional[float] = None,
+) -> Dict[str, BatchItemResult]:
+    """
+    离线批量提取：生成 Batch 输入文件 -> 提交 -> 轮询 -> 下载结果 -> MarkdownParser 解析。
+    返回 custom_id -> BatchItemResult；单条失败不影响其他结果。
+    """
+    owns_client = client is None
+    client = client or BatchInferenceClient(provider=provider)
+    job_name = job_name or f"batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    job_dir = Path(work_dir or client.config.work_dir) / job_name
+
+    try:
+        input_path = write_batch_file(build_batch_requests(tasks, client.provider, model=client.model), job_dir / "input.jsonl")
+        batch_id = client.submit(input_path, metadata={"job": job_name})
+        batch = client.wait(batch_id, poll_interval=poll_interval)
+        usage: Dict[str, Dict[str, Any]] = {}
+        outputs = client.download_results(batch, usage=usage)
+    finally:
+        if owns_client:
+            client.close()
+
+    results: Dict[str, BatchItemResult] = {}
+    for task in tasks:
+        item = BatchItemResult(task.custom_id, task.schema_name)
+        if task.custom_id in usage:
+            # 批量任务没有单条延迟；按 schema 计入当前用量汇总（价格按在线单价估算）
+            raw = usage[task.custom_id]
+            with request_scope(schema=task.schema_name):
+                item.usage = record_usage(
+                    client.provider,
+                    client.model,
+                    prompt_tokens=usage_field(raw, "prompt_tokens"),
+                    completion_tokens=usage_field(raw, "completion_tokens"),
+                    cached_tokens=usage_field(usage_field(raw, "prompt_tokens_details"), "cached_tokens"),
+                )
+        output = outputs.get(task.custom_id)
+        if output is None:
+            item.error = LLMCallError(f"No result returned for batch request {task.custom_id}")
+        elif isinstance(output, Exception):
+            item.error = output
+        else:
+            item.markdown = output
+            try:
+                item.model = MarkdownParser(get_model(task.schema_name)).parse(clean_markdown_code_block(output))
+            except Exception as e:
+                item.error = ParserError(f"Failed to parse structured output for {task.custom_id}: {str(e)}")
+        results[task.custom_id] = item
+
+    failed = sum(1 for r in results.values() if not r.ok)
+    logger.info(f"Batch job {job_name}: {len(results) - failed} succeeded, {failed} failed")
+    return results
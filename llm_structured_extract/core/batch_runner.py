@@ -0,0 +1,401 @@
+# llm_structured_extract/core/batch_runner.py
+import asyncio
+import glob
+import json
+import time
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple, Union
+from llm_structured_extract.config.settings import BatchRunnerConfig, settings
+from llm_structured_extract.core.context_cache import ContextCacheLease, get_context_cache_manager
+from llm_structured_extract.core.extract import async_extract_result
+from llm_structured_extract.core.job_manifest import JobManifest, renew_leases
+from llm_structured_extract.core.prompt_engine import async_build_prompt
+from llm_structured_extract.core.routing import default_route, select_route
+from llm_structured_extract.core.schema_registry import get_model
+from llm_structured_extract.core.sinks import FileSink, ResultRecord, ResultSink, create_sink
+from llm_structured_extract.core.scheduler import BATCH, scheduling_scope
+from llm_structured_extract.core.usage import UsageTracker, usage_scope
+from llm_structured_extract.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+MANIFEST_SUFFIX = ".jsonl"
+# 非文件写入器下，各文档的用量汇总追加到该文件（每份文档一行），避免大量小文件
+DOCUMENT_USAGE_FILENAME = "document_usage.jsonl"
+
+
+class Document(NamedTuple):
+    """批量输入中的一份文档：path 与 text 二选一；schemas 为空时使用运行器的默认 schema 列表"""
+    doc_id: str
+    path: Optional[Path] = None
+    text: Optional[str] = None
+    schemas: Optional[List[str]] = None
+
+    def read(self) -> str:
+        if self.text is not None:
+            return self.text
+        return self.path.read_text(encoding="utf-8")
+
+
+def _doc_id(path: Path, root: Optional[Path] = None) -> str:
+    relative = path.relative_to(root) if root else Path(path.name)
+    return "__".join(relative.with_suffix("").parts)
+
+
+def _load_manifest(path: Path) -> List[Document]:
+    """JSONL 清单：每行 {"id": ..., "path": ...} 或 {"id": ..., "text": ...}，可选 "schemas"；相对路径相对清单所在目录"""
+    documents = []
+    with open(path, "r", encoding="utf-8") as f:
+        for lineno, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            doc_path = Path(record["path"]) if record.get("path") else None
+            if doc_path is not None and not doc_path.is_absolute():
+                doc_path = path.parent / doc_path
+            if doc_path is None and record.get("text") is None:
+                raise ValueError(f"Manifest {path} line {lineno}: either 'path' or 'text' is required")
+            doc_id = record.get("id") or (_doc_id(doc_path) if doc_path else f"line_{lineno}")
+            documents.append(Document(str(doc_id), doc_path, record.get("text"), record.get("schemas")))
+    return documents
+
+
+def load_documents(source: Union[str, Path], extensions: Optional[List[str]] = None) -> List[Document]:
+    """从目录（递归）、通配符、JSONL 清单或单个文件加载待处理文档"""
+    extensions = [e.lower() for e in (extensions or settings.batch_runner_config.extensions)]
+    path = Path(source)
+    if path.is_dir():
+        files = sorted(p for p in path.rglob("*") if p.is_file() and p.suffix.lower() in extensions)
+        documents = [Document(_doc_id(p, path), p) for p in files]
+    elif path.is_file() and path.suffix.lower() == MANIFEST_SUFFIX:
+        documents = _load_manifest(path)
+    elif path.is_file():
+        documents = [Document(_doc_id(path), path)]
+    else:
+        files = sorted(Path(p) for p in glob.glob(str(source), recursive=True) if Path(p).is_file())
+        documents = [Document(_doc_id(p), p) for p in files]
+
+    seen = set()
+    for doc in documents:
+        if doc.doc_id in seen:
+            raise ValueError(f"Duplicate document id in batch input: {doc.doc_id}")
+        seen.add(doc.doc_id)
+    return documents
+
+
+class BatchProgress:
+    """批量运行进度与吞吐：docs/min 为完成全部 schema 的文档数，calls/min 为完成的（文档 × schema）任务数"""
+
+    def __init__(self, documents: int, tasks: int):
+        self.documents = documents
+        self.tasks = tasks
+        self.docs_done = 0
+        self.tasks_done = 0
+        self.tasks_failed = 0
+        self.tasks_skipped = 0
+        self.started = time.monotonic()
+
+    def task_done(self, ok: bool) -> None:
+        self.tasks_done += 1
+        if not ok:
+            self.tasks_failed += 1
+
+    def task_skipped(self) -> None:
+        self.tasks_skipped += 1
+
+    def doc_done(self) -> None:
+        self.docs_done += 1
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def as_dict(self) -> Dict[str, Any]:
+        minutes = max(self.elapsed, 1e-9) / 60
+        return {
+            "documents": self.documents,
+            "documents_done": self.docs_done,
+            "tasks": self.tasks,
+            "tasks_done": self.tasks_done,
+            "tasks_failed": self.tasks_failed,
+            "tasks_skipped": self.tasks_skipped,
+            "elapsed_seconds": round(self.elapsed, 2),
+            "docs_per_min": round(self.docs_done / minutes, 2),
+            "calls_per_min": round(self.tasks_done / minutes, 2),
+        }
+
+    def describe(self) -> str:
+        d = self.as_dict()
+        return (
+            f"docs {d['documents_done']}/{d['documents']}, tasks {d['tasks_done']}/{d['tasks']} "
+            f"({d['tasks_failed']} failed, {d['tasks_skipped']} skipped), {d['docs_per_min']} docs/min, {d['calls_per_min']} calls/min"
+        )
+
+
+class _DocumentState:
+    """单份文档在运行期间的共享状态：文本（按需读取，完成后释放）、用量汇总与上下文缓存租约"""
+
+    def __init__(self, document: Document, schemas: List[str]):
+        self.document = document
+        self.schemas = schemas
+        self.remaining = len(schemas)
+        self.ran = 0
+        # 失败的 schema -> 错误信息
+        self.failed: Dict[str, str] = {}
+        self.usage = UsageTracker(document.doc_id)
+        self.lease: Optional[ContextCacheLease] = None
+        self._text: Optional[str] = None
+        self._lock = asyncio.Lock()
+
+    async def text(self) -> str:
+        async with self._lock:
+            if self._text is None:
+                self._text = await asyncio.to_thread(self.document.read)
+            return self._text
+
+    async def cache_lease(self, text: str) -> ContextCacheLease:
+        """文档的上下文缓存租约：首个任务创建，其余 schema 共享"""
+        async with self._lock:
+            if self.lease is None:
+                self.lease = await asyncio.to_thread(get_context_cache_manager().acquire, text)
+            return self.lease
+
+    def release_text(self) -> None:
+        self._text = None
+
+    def failed_schemas(self) -> List[str]:
+        return [schema for schema in self.schemas if schema in self.failed]
+
+
+class BatchRunner:
+    """
+    多文档批量提取：把（文档 × schema）任务放入队列，由固定数量的工作协程消费。
+    - 全局并发 = 工作协程数；provider_limits 中的提供商另有各自的队列与工作协程（数量即并发上限），
+      路由到这些提供商的任务交给其队列，不占用全局槽位等待，其他提供商的任务不会被阻塞在后面
+    - 结果交给 ResultSink 攒批写出（默认按 result_sink 配置，files 时写入 <output_dir>/<doc_id>/），
+      每份文档单独汇总用量；运行结束时关闭写入器
+    - 定期报告 docs/min 与 calls/min
+    - 提供 JobManifest 时只调度清单中可领取的任务，执行前逐个领取，结束后记录完成或失败，
+      因此中断后重新运行、或多个进程共享同一输出目录时都不会重复已完成的工作；
+      成功的任务在结果写出后才标记完成
+    - 所有调用以批量优先级、以 tenant（默认任务名）为租户参与公平调度，只使用交互请求之外的空闲容量
+    """
+
+    def __init__(
+        self,
+        schemas: List[str],
+        output_dir: Union[str, Path],
+        config: Optional[BatchRunnerConfig] = None,
+        timeout: Optional[float] = None,
+        use_cache: bool = False,
+        manifest: Optional[JobManifest] = None,
+        sink: Optional[ResultSink] = None,
+        tenant: Optional[str] = None,
+    ):
+        self.schemas = list(schemas)
+        self.output_dir = Path(output_dir)
+        self.config = config or settings.batch_runner_config
+        self.timeout = timeout
+        self.use_cache = use_cache
+        self.manifest = manifest
+        self.sink = sink or create_sink(self.output_dir, per_document=True)
+        self.usage = UsageTracker(self.output_dir.name)
+        # 公平调度中的租户，默认为任务名（输出目录名）
+        self.tenant = tenant or self.output_dir.name
+        self.progress: Optional[BatchProgress] = None
+        self._docs: Dict[str, _DocumentState] = {}
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._lanes: Dict[str, "asyncio.Queue"] = {}
+
+    # ---- 调度 ----
+    async def run(self, documents: List[Document]) -> Dict[str, Any]:
+        plan = [(doc, doc.schemas or self.schemas) for doc in documents]
+        if self.manifest is not None:
+            await asyncio.to_thread(self.manifest.register, [(doc.doc_id, schema) for doc, schemas in plan for schema in schemas])
+            claimable = await asyncio.to_thread(self.manifest.claimable)
+            plan = [(doc, [schema for schema in schemas if (doc.doc_id, schema) in claimable]) for doc, schemas in plan]
+        states = [_DocumentState(doc, schemas) for doc, schemas in plan if schemas]
+        self._docs = {s.document.doc_id: s for s in states}
+        self.progress = BatchProgress(len(states), sum(len(s.schemas) for s in states))
+
+        # 按文档顺序入队，使文档尽早完成全部 schema 并释放文本
+        queue: "asyncio.Queue" = asyncio.Queue()
+        for state in states:
+            for schema in state.schemas:
+                queue.put_nowait((state, schema))
+        workers = max(1, min(self.config.concurrency, self.progress.tasks))
+        for _ in range(workers):
+            queue.put_nowait(None)
+        self._slots = asyncio.Semaphore(workers)
+        # 受限提供商的队列有界，避免提前读取大量文档、渲染大量提示词
+        limits = {p.lower(): n for p, n in self.config.provider_limits.items()}
+        self._lanes = {p: asyncio.Queue(maxsize=n) for p, n in limits.items()}
+
+        if self.manifest is not None:
+            self.sink.add_flush_listener(self._mark_written)
+
+        logger.info(f"Batch run started: {len(states)} documents, {self.progress.tasks} tasks, {workers} workers")
+        reporter = asyncio.ensure_future(self._report())
+        heartbeat = asyncio.ensure_future(renew_leases(self.manifest)) if self.manifest is not None else None
+        try:
+            with usage_scope(self.usage), scheduling_scope(BATCH, self.tenant):
+                lane_workers = [
+                    asyncio.ensure_future(self._lane_worker(self._lanes[p])) for p, n in limits.items() for _ in range(n)
+                ]
+                try:
+                    await asyncio.gather(*(self._worker(queue) for _ in range(workers)))
+                    for p, n in limits.items():
+                        for _ in range(n):
+                            await self._lanes[p].put(None)
+                    await asyncio.gather(*lane_workers)
+                finally:
+                    for task in lane_workers:
+                        task.cancel()
+        finally:
+            reporter.cancel()
+            # 写入器关闭前任务仍处于运行中（结果落盘后才标记完成），续期到最后
+            await self.sink.close()
+            if heartbeat is not None:
+                heartbeat.cancel()
+        logger.info(f"Batch run finished: {self.progress.describe()}")
+        return self._summary()
+
+    async def _worker(self, queue: "asyncio.Queue") -> None:
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            state, schema = item
+            doc_id = state.document.doc_id
+            if self.manifest is not None and not await asyncio.to_thread(self.manifest.claim, doc_id, schema):
+                # 已被其他进程领取或完成
+                self.progress.task_skipped()
+                await self._task_finished(state)
+                continue
+            state.ran += 1
+            prepared = await self._prepare(state, schema)
+            if prepared is None:
+                await self._task_done(state, schema, False)
+                continue
+            provider, text, prompt = prepared
+            lane = self._lanes.get(provider)
+            if lane is not None:
+                # 交给该提供商的工作协程，本协程继续处理后续任务
+                await lane.put((state, schema, text, prompt))
+            else:
+                await self._execute(state, schema, text, prompt)
+
+    async def _lane_worker(self, lane: "asyncio.Queue") -> None:
+        while True:
+            item = await lane.get()
+            if item is None:
+                return
+            await self._execute(*item)
+
+    async def _execute(self, state: _DocumentState, schema: str, text: str, prompt: Optional[str]) -> None:
+        async with self._slots:
+            ok = await self._run_task(state, schema, text, prompt)
+        await self._task_done(state, schema, ok)
+
+    async def _task_done(self, state: _DocumentState, schema: str, ok: bool) -> None:
+        self.progress.task_done(ok)
+        if self.manifest is not None and not ok:
+            await asyncio.to_thread(self.manifest.fail, state.document.doc_id, schema, state.failed[schema])
+        await self._task_finished(state)
+
+    async def _task_finished(self, state: _DocumentState) -> None:
+        state.remaining -= 1
+        if state.remaining == 0:
+            await self._finish_document(state)
+
+    def _mark_written(self, batch: List[ResultRecord]) -> None:
+        """写入器落盘一批结果后（工作线程中）把对应任务标记为完成"""
+        for record in batch:
+            if record.data is not None:
+                self.manifest.complete(record.doc_id, record.schema)
+
+    async def _report(self) -> None:
+        while True:
+            await asyncio.sleep(self.config.report_interval)
+            logger.info(f"Batch progress: {self.progress.describe()}")
+
+    async def _prepare(self, state: _DocumentState, schema: str) -> Optional[Tuple[str, str, Optional[str]]]:
+        """
+        读取文本并按路由规则确定任务将发往的提供商，返回 (提供商, 文本, 渲染后的提示词)。
+        路由需要渲染后的提示词来预估 Token，渲染结果随任务传给提取调用，不再重复渲染。
+        """
+        try:
+            text = await state.text()
+            if not settings.routing_config.enabled:
+                return default_route().provider.lower(), text, None
+            prompt = await async_build_prompt(text, get_model(schema))
+            return select_route(schema, prompt).provider.lower(), text, prompt
+        except Exception as e:
+            self._fail(state, schema, e)
+            return None
+
+    def _fail(self, state: _DocumentState, schema: str, e: Exception) -> None:
+        state.failed[schema] = str(e)
+        logger.error(f"❌ {state.document.doc_id} / {schema} failed: {str(e)}")
+
+    # ---- 单个任务 ----
+    async def _run_task(self, state: _DocumentState, schema: str, text: str, prompt: Optional[str]) -> bool:
+        doc_id = state.document.doc_id
+        try:
+            with usage_scope(state.usage):
+                cache_id = await self._cache_id(state, text)
+                raw_output, result = await async_extract_result(
+                    text, schema, context_cache_id=cache_id, timeout=self.timeout, prompt=prompt
+                )
+            await self.sink.write(ResultRecord(doc_id, schema, result.model_dump(mode="json"), raw_output))
+            logger.info(f"✅ {doc_id} / {schema} done")
+            return True
+        except Exception as e:
+            self._fail(state, schema, e)
+            return False
+
+    async def _cache_id(self, state: _DocumentState, text: str) -> Optional[str]:
+        if not self.use_cache:
+            return None
+        lease = await state.cache_lease(text)
+        return await lease.acache_id()
+
+    async def _finish_document(self, state: _DocumentState) -> None:
+        if state.lease is not None:
+            get_context_cache_manager().release(state.lease)
+            state.lease = None
+        state.release_text()
+        self.progress.doc_done()
+        if not state.ran:
+            return
+        report = {"document": state.document.doc_id, "failed_schemas": state.failed_schemas(), **state.usage.as_dict()}
+        if isinstance(self.sink, FileSink):
+            await asyncio.to_thread(self._write_json, self.output_dir / state.document.doc_id / "usage.json", report)
+        else:
+            await asyncio.to_thread(self._append_jsonl, self.output_dir / DOCUMENT_USAGE_FILENAME, report)
+
+    @staticmethod
+    def _write_json(path: Path, data: Any) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+    @staticmethod
+    def _append_jsonl(path: Path, data: Any) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(data, ensure_ascii=False) + "\n")
+
+    def _summary(self) -> Dict[str, Any]:
+        summary = {
+            "job": self.output_dir.name,
+            **self.progress.as_dict(),
+            "records_written": self.sink.written,
+            "failed": {doc_id: s.failed_schemas() for doc_id, s in self._docs.items() if s.failed},
+            **self.usage.as_dict(),
+        }
+        if self.manifest is not None:
+            # 清单统计覆盖历次运行与所有进程，用量与吞吐只统计本次运行
+            summary["manifest"] = self.manifest.counts()
+        self._write_json(self.output_dir / "usage.json", summary)
+        return summary
@@ -0,0 +1,144 @@
+# llm_structured_extract/core/circuit_breaker.py
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+import httpx
+from llm_structured_extract.config.settings import FailoverConfig, settings
+from llm_structured_extract.core.exceptions import ProviderError
+from llm_structured_extract.utils.logger import get_logger
+from llm_structured_extract.utils.metrics import metrics
+
+logger = get_logger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+def is_provider_failure(exc: BaseException) -> bool:
+    """服务商侧故障（调用失败、限流、网络中断、超时）计入熔断统计；本地代码错误不计入"""
+    return isinstance(exc, (ProviderError, httpx.HTTPError, ConnectionError, TimeoutError, asyncio.TimeoutError))
+
+
+class CircuitBreaker:
+    """
+    三态熔断器：
+    - CLOSED：正常放行；连续失败达到 failure_threshold，或滑动窗口内失败率达到 failure_rate_threshold 时打开
+    - OPEN：直接拒绝，recovery_timeout 后进入半开
+    - HALF_OPEN：最多放行 half_open_max_calls 个探测请求，成功则关闭，失败则重新打开
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        failure_rate_threshold: float = 0.5,
+        window_size: int = 20,
+        min_calls: int = 10,
+        recovery_timeout: float = 30.0,
+        half_open_max_calls: int = 1,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.failure_rate_threshold = failure_rate_threshold
+        self.min_calls = min_calls
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._consecutive_failures = 0
+        self._half_open_inflight = 0
+        self._window: Deque[bool] = deque(maxlen=window_size)
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def _maybe_half_open(self) -> None:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+            self._state = HALF_OPEN
+            self._half_open_inflight = 0
+            logger.info(f"Circuit '{self.name}' half-open, probing for recovery")
+
+    def allow_request(self) -> bool:
+        """是否放行本次请求；半开状态下放行即占用一个探测名额"""
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and self._half_open_inflight < self.half_open_max_calls:
+                self._half_open_inflight += 1
+                return True
+            return False
+
+    def release_probe(self) -> None:
+        """调用以非服务商原因结束时，归还半开探测名额而不计入统计"""
+        with self._lock:
+            if self._state == HALF_OPEN and self._half_open_inflight > 0:
+                self._half_open_inflight -= 1
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._consecutive_failures = 0
+            self._window.append(True)
+            if self._state == HALF_OPEN:
+                self._state = CLOSED
+                self._window.clear()
+                logger.info(f"Circuit '{self.name}' closed, provider recovered")
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._consecutive_failures += 1
+            self._window.append(False)
+            if self._state == HALF_OPEN:
+                self._open("probe failed")
+                return
+            if self._state != CLOSED:
+                return
+            if self._consecutive_failures >= self.failure_threshold:
+                self._open(f"{self._consecutive_failures} consecutive failures")
+                return
+            if len(self._window) >= self.min_calls:
+                rate = self._window.count(False) / len(self._window)
+                if rate >= self.failure_rate_threshold:
+                    self._open(f"failure rate {rate:.0%}")
+
+    def _open(self, reason: str) -> None:
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._half_open_inflight = 0
+        logger.warning(f"Circuit '{self.name}' opened: {reason}")
+
+
+_lock = threading.Lock()
+_BREAKERS: Dict[str, CircuitBreaker] = {}
+
+
+def get_circuit_breaker(provider: str, config: Optional[FailoverConfig] = None) -> CircuitBreaker:
+    """获取提供商维度进程内共享的熔断器，并注册状态指标（0=closed, 1=half_open, 2=open）"""
+    with _lock:
+        breaker = _BREAKERS.get(provider)
+        if breaker is not None:
+            return breaker
+        config = config or settings.yaml_config.llm.failover
+        breaker = CircuitBreaker(
+            provider,
+            failure_threshold=config.failure_threshold,
+            failure_rate_threshold=config.failure_rate_threshold,
+            window_size=config.window_size,
+            min_calls=config.min_calls,
+            recovery_timeout=config.recovery_timeout,
+            half_open_max_calls=config.half_open_max_calls,
+        )
+        _BREAKERS[provider] = breaker
+
+    metrics.register_gauge("llm_circuit_state", lambda: _STATE_VALUES[breaker.state], provider=provider)
+    return breaker
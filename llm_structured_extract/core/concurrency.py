@@ -0,0 +1,279 @@
+# llm_structured_extract/core/concurrency.py
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import aclosing
+from typing import AsyncIterator, Deque, Dict, Iterator, Optional, Tuple
+import httpx
+from llm_structured_extract.config.settings import AdaptiveConcurrencyConfig, settings
+from llm_structured_extract.core.deadline import check_deadline, expired, remaining
+from llm_structured_extract.core.exceptions import DeadlineExceededError, LLMTimeoutError, RateLimitError
+from llm_structured_extract.core.llm_adapters.base_adapter import AdapterWrapper, BaseAdapter
+from llm_structured_extract.core.request_context import current_schema
+from llm_structured_extract.utils.logger import get_logger
+from llm_structured_extract.utils.metrics import metrics
+
+logger = get_logger(__name__)
+
+
+def is_congestion_signal(exc: BaseException) -> bool:
+    """限流与超时视为拥塞信号；鉴权、参数等其他错误不影响并发窗口"""
+    return isinstance(exc, (RateLimitError, LLMTimeoutError, httpx.TimeoutException, TimeoutError, asyncio.TimeoutError))
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD 自适应并发限制器，线程与协程共用。
+    - 加性增：调用成功且延迟不超过基线 latency_tolerance 倍时，窗口每轮增加约 1（每次 +1/limit）；
+      延迟基线按 schema 分别维护，字段多、输出长的 schema 的正常延迟不会被当作拥塞
+    - 乘性减：遇到限流、超时或延迟劣化时，窗口乘以 backoff_ratio；cooldown 内只收缩一次，
+      避免同一批在途请求的连锁失败把窗口压到最低
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 8,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        backoff_ratio: float = 0.5,
+        latency_tolerance: float = 3.0,
+        cooldown: float = 2.0,
+    ):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff_ratio = backoff_ratio
+        self.latency_tolerance = latency_tolerance
+        self.cooldown = cooldown
+
+        self._limit = float(min(max(initial_limit, min_limit), max_limit))
+        self._inflight = 0
+        self._baselines: Dict[Optional[str], float] = {}
+        self._last_decrease = 0.0
+
+        self._lock = threading.Lock()
+        self._sync_cond = threading.Condition(self._lock)
+        self._sync_waiting = 0
+        self._async_waiters: Deque[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = deque()
+
+    # ---- 指标 ----
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def inflight(self) -> int:
+        return self._inflight
+
+    @property
+    def queue_depth(self) -> int:
+        with self._lock:
+            return self._sync_waiting + len(self._async_waiters)
+
+    # ---- 获取 / 释放 ----
+    def _has_capacity(self) -> bool:
+        return self._inflight < int(self._limit)
+
+    def _wake(self) -> None:
+        """在持有锁时调用：按当前窗口放行排队中的协程与线程"""
+        while self._async_waiters and self._has_capacity():
+            loop, fut = self._async_waiters.popleft()
+            if fut.done():
+                continue
+            self._inflight += 1
+            loop.call_soon_threadsafe(self._grant, fut)
+        if self._sync_waiting and self._has_capacity():
+            self._sync_cond.notify(int(self._limit) - self._inflight)
+
+    def _grant(self, fut: asyncio.Future) -> None:
+        # 放行与取消可能交错：等待方已被取消时归还名额
+        if fut.cancelled():
+            self.release()
+        else:
+            fut.set_result(None)
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """获取一个并发名额；timeout 内未获得时返回 False"""
+        end = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            self._sync_waiting += 1
+            try:
+                while not self._has_capacity():
+                    if end is None:
+                        self._sync_cond.wait()
+                        continue
+                    left = end - time.monotonic()
+                    if left <= 0:
+                        return False
+                    self._sync_cond.wait(left)
+            finally:
+                self._sync_waiting -= 1
+            self._inflight += 1
+            return True
+
+    async def aacquire(self) -> None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._has_capacity() and not self._async_waiters:
+                self._inflight += 1
+                return
+            fut = loop.create_future()
+            self._async_waiters.append((loop, fut))
+        try:
+            await fut
+        except asyncio.CancelledError:
+            with self._lock:
+                try:
+                    self._async_waiters.remove((loop, fut))
+                    granted = False
+                except ValueError:
+                    granted = fut.done() and not fut.cancelled()
+            if granted:
+                self.release()
+            raise
+
+    def release(self) -> None:
+        with self._lock:
+            self._inflight -= 1
+            self._wake()
+
+    # ---- 窗口调整 ----
+    def record(self, latency: float, exc: Optional[BaseException] = None, key: Optional[str] = None) -> None:
+        """根据一次调用的结果调整并发窗口；key（通常为 schema 名称）区分各自的延迟基线"""
+        with self._lock:
+            if exc is not None:
+                if is_congestion_signal(exc):
+                    self._decrease(f"{type(exc).__name__}")
+                return
+
+            baseline = self._baselines.get(key)
+            if baseline is not None and latency > baseline * self.latency_tolerance:
+                self._decrease(f"latency {latency:.2f}s > {self.latency_tolerance}x baseline {baseline:.2f}s")
+                return
+
+            # 基线只用健康样本做指数平滑，防止延迟劣化被“学习”为常态
+            self._baselines[key] = latency if baseline is None else baseline * 0.95 + latency * 0.05
+            self._limit = min(self.max_limit, self._limit + 1.0 / self._limit)
+            self._wake()
+
+    def _decrease(self, reason: str) -> None:
+        now = time.monotonic()
+        if now - self._last_decrease < self.cooldown:
+            return
+        self._last_decrease = now
+        old = self._limit
+        self._limit = max(float(self.min_limit), self._limit * self.backoff_ratio)
+        logger.warning(f"Adaptive concurrency limit {old:.1f} -> {self._limit:.1f} ({reason})")
+
+    def snapshot(self) -> Dict[str, float]:
+        return {"limit": self.limit, "inflight": self.inflight, "queue_depth": self.queue_depth}
+
+
+_lock = threading.Lock()
+_LIMITERS: Dict[str, AdaptiveConcurrencyLimiter] = {}
+
+
+def get_concurrency_limiter(provider: str, config: Optional[AdaptiveConcurrencyConfig] = None) -> AdaptiveConcurrencyLimiter:
+    """获取提供商维度进程内共享的自适应并发限制器，并注册 limit / inflight / queue_depth 指标"""
+    with _lock:
+        limiter = _LIMITERS.get(provider)
+        if limiter is not None:
+            return limiter
+
+        config = config or settings.adaptive_concurrency_config
+        max_limit = config.max_limit
+        # 提供商配置了固定并发上限（如 Ollama 并行槽位）时，窗口不超过该上限
+        fixed = settings.get_model_config(provider).max_concurrency
+        if fixed:
+            max_limit = min(max_limit, fixed)
+        limiter = AdaptiveConcurrencyLimiter(
+            initial_limit=min(config.initial_limit, max_limit),
+            min_limit=config.min_limit,
+            max_limit=max_limit,
+            backoff_ratio=config.backoff_ratio,
+            latency_tolerance=config.latency_tolerance,
+            cooldown=config.cooldown,
+        )
+        _LIMITERS[provider] = limiter
+
+    metrics.register_gauge("llm_concurrency_limit", lambda: limiter.limit, provider=provider)
+    metrics.register_gauge("llm_concurrency_inflight", lambda: limiter.inflight, provider=provider)
+    metrics.register_gauge("llm_concurrency_queue_depth", lambda: limiter.queue_depth, provider=provider)
+    return limiter
+
+
+class AdaptiveConcurrencyAdapter(AdapterWrapper):
+    """通过自适应并发窗口控制在途请求数，并以每次调用的延迟与错误反馈调整窗口"""
+
+    def __init__(self, inner: BaseAdapter, provider: str, limiter: Optional[AdaptiveConcurrencyLimiter] = None):
+        super().__init__(inner)
+        self.provider = provider
+        self.limiter = limiter or get_concurrency_limiter(provider)
+
+    def _acquire(self) -> None:
+        check_deadline(f"acquiring {self.provider} concurrency slot")
+        if not self.limiter.acquire(timeout=remaining()):
+            raise DeadlineExceededError(f"Deadline exceeded while waiting for {self.provider} concurrency slot")
+
+    async def _aacquire(self) -> None:
+        check_deadline(f"acquiring {self.provider} concurrency slot")
+        await self.limiter.aacquire()
+        # 排队期间截止时间已过：放弃调用，不再占用服务商容量
+        if expired():
+            self.limiter.release()
+            raise DeadlineExceededError(f"Deadline exceeded while waiting for {self.provider} concurrency slot")
+
+    def generate_text(self, prompt: str, context_cache_id: Optional[str] = None) -> str:
+        self._acquire()
+        start = time.monotonic()
+        try:
+            result = self.inner.generate_text(prompt, context_cache_id=context_cache_id)
+        except Exception as e:
+            self.limiter.record(time.monotonic() - start, e, key=current_schema())
+            raise
+        finally:
+            self.limiter.release()
+        self.limiter.record(time.monotonic() - start, key=current_schema())
+        return result
+
+    async def agenerate_text(self, prompt: str, context_cache_id: Optional[str] = None) -> str:
+        await self._aacquire()
+        start = time.monotonic()
+        try:
+            result = await self.inner.agenerate_text(prompt, context_cache_id=context_cache_id)
+        except Exception as e:
+            self.limiter.record(time.monotonic() - start, e, key=current_schema())
+            raise
+        finally:
+            self.limiter.release()
+        self.limiter.record(time.monotonic() - start, key=current_schema())
+        return result
+
+    def stream_text(self, prompt: str, context_cache_id: Optional[str] = None) -> Iterator[str]:
+        # 流式调用在整个生成期间占用并发名额
+        self._acquire()
+        start = time.monotonic()
+        try:
+            yield from super().stream_text(prompt, context_cache_id=context_cache_id)
+        except Exception as e:
+            self.limiter.record(time.monotonic() - start, e, key=current_schema())
+            raise
+        else:
+            self.limiter.record(time.monotonic() - start, key=current_schema())
+        finally:
+            self.limiter.release()
+
+    async def astream_text(self, prompt: str, context_cache_id: Optional[str] = None) -> AsyncIterator[str]:
+        await self._aacquire()
+        start = time.monotonic()
+        try:
+            async with aclosing(super().astream_text(prompt, context_cache_id=context_cache_id)) as chunks:
+                async for chunk in chunks:
+                    yield chunk
+        except Exception as e:
+            self.limiter.record(time.monotonic() - start, e, key=current_schema())
+            raise
+        else:
+            self.limiter.record(time.monotonic() - start, key=current_schema())
+        finally:
+            self.limiter.release()
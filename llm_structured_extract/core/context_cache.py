@@ -0,0 +1,267 @@
+# llm_structured_extract/core/context_cache.py
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from pathlib import Path
+from typing import AsyncIterator, Dict, Iterator, Optional, Tuple
+from llm_structured_extract.config.settings import ContextCacheConfig, settings
+from llm_structured_extract.core.llm_adapters.base_adapter import BaseAdapter
+from llm_structured_extract.utils.logger import get_logger
+from llm_structured_extract.utils.metrics import metrics
+
+logger = get_logger(__name__)
+
+# (提供商, 模型, 文档哈希)
+_CacheKey = Tuple[str, str, str]
+
+
+def document_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class _Entry:
+    def __init__(self, cache_id: Optional[str], expires_at: float):
+        self.cache_id = cache_id
+        self.expires_at = expires_at
+        self.refs = 0
+        # 有使用者期间保留文档文本，供后台刷新重建缓存；使用者全部释放后清空
+        self.text: Optional[str] = None
+        # 同一文档的创建 / 刷新串行执行，并发的其他使用者等待同一结果
+        self.lock = threading.Lock()
+
+
+class ContextCacheLease:
+    """
+    一份文档上下文缓存的使用凭证。每次调用前读取 cache_id：
+    临近过期时由管理器先刷新，返回始终可用的缓存 ID（不支持或创建失败时为 None）。
+    """
+
+    def __init__(self, manager: "ContextCacheManager", key: _CacheKey, text: str):
+        self._manager = manager
+        self.key = key
+        self._text = text
+
+    @property
+    def document_hash(self) -> str:
+        return self.key[2]
+
+    @property
+    def cache_id(self) -> Optional[str]:
+        return self._manager._ensure(self.key, self._text)
+
+    async def acache_id(self) -> Optional[str]:
+        """异步读取：刷新（同步 SDK 调用）放到工作线程执行"""
+        return await asyncio.to_thread(self._manager._ensure, self.key, self._text)
+
+
+class ContextCacheManager:
+    """
+    上下文缓存管理器：
+    - 按 (提供商, 模型, 文档内容哈希) 复用服务商缓存 ID，映射持久化到本地 JSON 文件，重复运行直接复用
+    - 记录过期时间，距离过期不足 refresh_margin 时重新创建
+    - 对并发使用者计数：仍有使用者的缓存由后台线程在临近过期前主动刷新，
+      使用者全部释放且已过期的条目从内存中移除
+    - 创建失败或适配器不支持时在 refresh_margin 内不再重试
+    """
+
+    def __init__(
+        self,
+        adapter: Optional[BaseAdapter] = None,
+        provider: Optional[str] = None,
+        config: Optional[ContextCacheConfig] = None,
+        path: Optional[str] = None,
+    ):
+        self.config = config or settings.context_cache_config
+        self.provider = (provider or settings.LLM_PROVIDER).lower()
+        self._adapter = adapter
+        path = Path(path or self.config.path)
+        self.path = path if path.is_absolute() else settings.PROJECT_ROOT / path
+        self._lock = threading.Lock()
+        self._entries: Dict[_CacheKey, _Entry] = {}
+        self._refresher: Optional[threading.Thread] = None
+        self._load()
+
+    @property
+    def adapter(self) -> BaseAdapter:
+        if self._adapter is None:
+            from llm_structured_extract.core.adapter_manager import get_adapter
+            self._adapter = get_adapter(self.provider)
+        return self._adapter
+
+    def _key(self, text: str) -> _CacheKey:
+        model = getattr(self.adapter, "model", "") or settings.get_model_config(self.provider).name
+        return self.provider, model, document_hash(text)
+
+    # ---- 持久化 ----
+    def _read_index(self) -> Dict[_CacheKey, Tuple[str, float]]:
+        if not self.path.exists():
+            return {}
+        try:
+            records = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Ignoring unreadable context cache index {self.path}: {str(e)}")
+            return {}
+        now = time.time()
+        return {
+            (r["provider"], r["model"], r["document_hash"]): (r["cache_id"], r["expires_at"])
+            for r in records
+            if r.get("cache_id") and r.get("expires_at", 0) > now
+        }
+
+    def _load(self) -> None:
+        for key, (cache_id, expires_at) in self._read_index().items():
+            self._entries[key] = _Entry(cache_id, expires_at)
+        logger.debug(f"Loaded {len(self._entries)} context caches from {self.path}")
+
+    def _save(self) -> None:
+        # 与文件中其他进程写入的条目合并，同一文档保留过期时间更晚的缓存
+        index = self._read_index()
+        now = time.time()
+        with self._lock:
+            for key, e in self._entries.items():
+                if e.cache_id and e.expires_at > now and e.expires_at > index.get(key, (None, 0.0))[1]:
+                    index[key] = (e.cache_id, e.expires_at)
+        records = [
+            {"provider": p, "model": m, "document_hash": h, "cache_id": cache_id, "expires_at": expires_at}
+            for (p, m, h), (cache_id, expires_at) in index.items()
+        ]
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(json.dumps(records, ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    # ---- 创建与刷新 ----
+    def _entry(self, key: _CacheKey) -> _Entry:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._prune()
+                entry = self._entries[key] = _Entry(None, 0.0)
+            return entry
+
+    def _prune(self) -> None:
+        """移除无使用者且已过期的条目（调用方持有 self._lock）"""
+        now = time.time()
+        for key in [k for k, e in self._entries.items() if not e.refs and e.expires_at <= now]:
+            del self._entries[key]
+
+    def _ensure(self, key: _CacheKey, text: str) -> Optional[str]:
+        entry = self._entry(key)
+        with entry.lock:
+            if entry.expires_at - time.time() > self.config.refresh_margin:
+                metrics.inc("llm_context_cache_hits_total", provider=self.provider)
+                return entry.cache_id
+            # 其他进程可能已为同一文档创建了缓存
+            cache_id, expires_at = self._read_index().get(key, (None, 0.0))
+            if expires_at - time.time() > self.config.refresh_margin:
+                entry.cache_id, entry.expires_at = cache_id, expires_at
+                metrics.inc("llm_context_cache_hits_total", provider=self.provider)
+                return cache_id
+            refreshing = entry.cache_id is not None
+            cache_id = self.adapter.create_context_cache(text, ttl_seconds=self.config.ttl_seconds)
+            if cache_id:
+                entry.cache_id = cache_id
+                entry.expires_at = time.time() + self.config.ttl_seconds
+                metrics.inc("llm_context_cache_creates_total", provider=self.provider)
+                logger.info(f"{'Refreshed' if refreshing else 'Created'} context cache {cache_id} for document {key[2][:12]}")
+            else:
+                # 不支持或创建失败：短时间内不再重复尝试
+                entry.cache_id = None
+                entry.expires_at = time.time() + 2 * self.config.refresh_margin
+                metrics.inc("llm_context_cache_failures_total", provider=self.provider)
+        if cache_id:
+            self._save()
+        return entry.cache_id
+
+    # ---- 使用者计数 ----
+    def acquire(self, text: str) -> ContextCacheLease:
+        """登记一个使用者并确保缓存可用"""
+        key = self._key(text)
+        entry = self._entry(key)
+        with self._lock:
+            entry.refs += 1
+            entry.text = text
+            # 当前进程不保证还有调用来触发刷新，有使用者期间由后台线程主动刷新
+            if self._refresher is None:
+                self._refresher = threading.Thread(target=self._refresh_loop, name="context-cache-refresh", daemon=True)
+                self._refresher.start()
+        lease = ContextCacheLease(self, key, text)
+        try:
+            self._ensure(key, text)
+        except Exception:
+            self.release(lease)
+            raise
+        return lease
+
+    def release(self, lease: ContextCacheLease) -> None:
+        with self._lock:
+            entry = self._entries.get(lease.key)
+            if entry is not None and entry.refs > 0:
+                entry.refs -= 1
+                if not entry.refs:
+                    entry.text = None
+                    if entry.expires_at <= time.time():
+                        del self._entries[lease.key]
+
+    def refcount(self, text: str) -> int:
+        with self._lock:
+            entry = self._entries.get(self._key(text))
+            return entry.refs if entry else 0
+
+    def refresh_leased(self) -> int:
+        """刷新仍有使用者且临近过期的缓存，返回仍有使用者的缓存数"""
+        with self._lock:
+            leased = [(key, e) for key, e in self._entries.items() if e.refs and e.text is not None]
+        for key, entry in leased:
+            text = entry.text
+            if text is None or entry.expires_at - time.time() > self.config.refresh_margin:
+                continue
+            try:
+                self._ensure(key, text)
+            except Exception as e:
+                logger.warning(f"Background refresh of context cache for document {key[2][:12]} failed: {str(e)}")
+        return len(leased)
+
+    def _refresh_loop(self) -> None:
+        interval = max(1.0, self.config.refresh_margin / 2)
+        while True:
+            time.sleep(interval)
+            self.refresh_leased()
+            with self._lock:
+                if not any(e.refs for e in self._entries.values()):
+                    self._refresher = None
+                    return
+
+    @contextmanager
+    def lease(self, text: str) -> Iterator[ContextCacheLease]:
+        lease = self.acquire(text)
+        try:
+            yield lease
+        finally:
+            self.release(lease)
+
+    @asynccontextmanager
+    async def alease(self, text: str) -> AsyncIterator[ContextCacheLease]:
+        lease = await asyncio.to_thread(self.acquire, text)
+        try:
+            yield lease
+        finally:
+            self.release(lease)
+
+
+_managers_lock = threading.Lock()
+_MANAGERS: Dict[str, ContextCacheManager] = {}
+
+
+def get_context_cache_manager(provider: Optional[str] = None) -> ContextCacheManager:
+    """获取指定提供商的进程级上下文缓存管理器，默认使用 settings.LLM_PROVIDER"""
+    provider = (provider or settings.LLM_PROVIDER).lower()
+    with _managers_lock:
+        manager = _MANAGERS.get(provider)
+        if manager is None:
+            manager = _MANAGERS[provider] = ContextCacheManager(provider=provider)
+    return manager
@@ -0,0 +1,109 @@
+# llm_structured_extract/core/deadline.py
+import asyncio
+import math
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Awaitable, Iterator, Optional, TypeVar
+from llm_structured_extract.core.exceptions import DeadlineExceededError, LLMExtractError, LLMTimeoutError
+
+T = TypeVar("T")
+
+# 当前调用链的截止时间（time.monotonic 时刻）；通过 contextvars 随协程 / 任务传递，
+# 适配器接口签名无需改动即可读取
+_deadline: ContextVar[Optional[float]] = ContextVar("llm_deadline", default=None)
+
+
+def get_deadline() -> Optional[float]:
+    return _deadline.get()
+
+
+def remaining() -> Optional[float]:
+    """距截止时间的剩余秒数；未设置截止时间时返回 None"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def expired() -> bool:
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def check_deadline(stage: str = "LLM call") -> None:
+    """截止时间已到则放弃后续工作"""
+    if expired():
+        raise DeadlineExceededError(f"Deadline exceeded before {stage}")
+
+
+def call_timeout(default: float) -> float:
+    """单次调用的超时：取模型配置超时与剩余截止时间中较小者"""
+    left = remaining()
+    if left is None:
+        return default
+    if left <= 0:
+        raise DeadlineExceededError("Deadline exceeded before LLM call")
+    return min(default, left)
+
+
+def call_timeout_seconds(default: float) -> int:
+    """同 call_timeout，向上取整为整数秒（供只接受整数超时的 SDK 使用）"""
+    return max(1, math.ceil(call_timeout(default)))
+
+
+def timeout_error(message: str) -> LLMExtractError:
+    """超时异常归类：截止时间已到时返回不可重试的 DeadlineExceededError，否则为可重试的 LLMTimeoutError"""
+    if expired():
+        return DeadlineExceededError(message)
+    return LLMTimeoutError(message)
+
+
+@contextmanager
+def deadline_scope(timeout: Optional[float]) -> Iterator[Optional[float]]:
+    """
+    在当前上下文内设置截止时间（now + timeout）。
+    嵌套时取更早的截止时间，内层不能延长外层；timeout 为 None 时沿用外层设置。
+    """
+    current = _deadline.get()
+    if timeout is None:
+        yield current
+        return
+    deadline = time.monotonic() + timeout
+    if current is not None:
+        deadline = min(deadline, current)
+    token = _deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _deadline.reset(token)
+
+
+@contextmanager
+def detached_deadline() -> Iterator[None]:
+    """在当前上下文内清除截止时间，供多个调用方共享的任务使用：各调用方只对自己的等待施加截止时间"""
+    token = _deadline.set(None)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+async def run_with_deadline(aw: Awaitable[T], stage: str = "LLM call") -> T:
+    """
+    在截止时间内等待协程完成，超时则取消（连同其中的 HTTP 请求一起中断）并抛出 DeadlineExceededError。
+    """
+    left = remaining()
+    if left is None:
+        return await aw
+    if left <= 0:
+        if asyncio.iscoroutine(aw):
+            aw.close()
+        raise DeadlineExceededError(f"Deadline exceeded before {stage}")
+    try:
+        return await asyncio.wait_for(aw, timeout=left)
+    except asyncio.TimeoutError as e:
+        if not expired():
+            # 内部自身的超时，原样抛出
+            raise
+        raise DeadlineExceededError(f"Deadline exceeded during {stage}") from e
@@ -24,6 +24,22 @@ class LLMCallError(ProviderError):
     """LLM API 调用失败"""
     pass
 
+class TransientLLMError(LLMCallError):
+    """暂时性调用失败（服务端 5xx、网络中断、超时等），可重试"""
+    pass
+
+class RateLimitError(TransientLLMError):
+    """服务商限流（HTTP 429），可重试"""
+    pass
+
+class LLMTimeoutError(TransientLLMError):
+    """LLM 调用超时，可重试"""
+    pass
+
+class DeadlineExceededError(LLMExtractError):
+    """调用方截止时间已到，剩余工作被放弃（不重试、不计入熔断）"""
+    pass
+
 class ParserError(LLMExtractError):
     """解析 Markdown 结果失败"""
     pass
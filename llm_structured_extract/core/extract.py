@@ -1,31 +1,39 @@
 import asyncio
-from typing import Any, Dict, Type, Optional, List
+from contextlib import aclosing, closing
+from typing import Any, AsyncIterator, Dict, Iterator, Type, Optional, List, Tuple
 from pydantic import BaseModel
 from llm_structured_extract.config.settings import settings
 from llm_structured_extract.core.schema_registry import get_model
 from llm_structured_extract.core.prompt_engine import build_prompt, async_build_prompt
 from llm_structured_extract.core.parser import MarkdownParser
+from llm_structured_extract.core.deadline import check_deadline, deadline_scope, run_with_deadline
+from llm_structured_extract.core.request_context import request_scope
+from llm_structured_extract.core.routing import Route, select_route
+from llm_structured_extract.core.scheduler import current_priority
+from llm_structured_extract.core.singleflight import get_singleflight, text_fingerprint
+from llm_structured_extract.core.streaming import AsyncTextStream, TextStream
 from llm_structured_extract.core.exceptions import (
-    SchemaError, PromptError, ProviderError, LLMCallError, ParserError
+    SchemaError, PromptError, ProviderError, LLMCallError, ParserError, DeadlineExceededError
 )
 from llm_structured_extract.utils.logger import get_logger
 from llm_structured_extract.utils.strings import clean_markdown_code_block
 
 logger = get_logger(__name__)
 
-def _get_adapter():
-    """统一获取 LLM 适配器逻辑"""
-    provider = settings.LLM_PROVIDER.lower()
-    from llm_structured_extract.core.llm_adapters.base_adapter import ADAPTER_REGISTRY
-    
-    adapter_cls = ADAPTER_REGISTRY.get(provider)
-    if not adapter_cls:
-        supported = sorted(ADAPTER_REGISTRY.keys())
-        raise ProviderError(
-            f"Unsupported LLM provider '{provider}'. "
-            f"Supported: {supported or ['(none registered)']}"
-        )
-    return adapter_cls()
+def _get_adapter(route: Optional[Route] = None):
+    """统一获取 LLM 适配器逻辑（进程内按提供商与模型配置复用实例），指定路由时使用路由选定的提供商与模型"""
+    from llm_structured_extract.core.adapter_manager import get_adapter
+    if route is None:
+        return get_adapter()
+    return get_adapter(route.provider, model=route.model)
+
+def _route(schema_name: str, prompt: str, context_cache_id: Optional[str]):
+    """选择路由；上下文缓存与默认模型绑定，路由到其他模型时不再传递缓存 ID"""
+    route = select_route(schema_name, prompt)
+    if context_cache_id and not route.is_default:
+        logger.debug(f"Route {route.name} uses a different model, ignoring context_cache_id for schema {schema_name}")
+        context_cache_id = None
+    return route, context_cache_id
 
 def _validate_input(text: str, schema_name: str):
     """统一输入校验"""
@@ -34,10 +42,16 @@ def _validate_input(text: str, schema_name: str):
     if not schema_name.strip():
         raise ValueError("Schema name cannot be empty")
 
-def extract(text: str, schema_name: str, save_raw_to: Optional[str] = None, context_cache_id: Optional[str] = None) -> str:
+def extract(text: str, schema_name: str, save_raw_to: Optional[str] = None, context_cache_id: Optional[str] = None, timeout: Optional[float] = None) -> str:
     """
     从非结构化文本中提取信息，直接返回LLM生成的Markdown格式结果。
+    timeout 为端到端截止时间（秒）：单次请求超时、排队与重试都不会超过该时间，到期抛出 DeadlineExceededError。
     """
+    with deadline_scope(timeout), request_scope(schema=schema_name):
+        return _extract(text, schema_name, save_raw_to=save_raw_to, context_cache_id=context_cache_id)
+
+
+def _extract(text: str, schema_name: str, save_raw_to: Optional[str] = None, context_cache_id: Optional[str] = None) -> str:
     _validate_input(text, schema_name)
 
     try:
@@ -46,10 +60,12 @@ def extract(text: str, schema_name: str, save_raw_to: Optional[str] = None, cont
         raise SchemaError(f"Failed to load schema '{schema_name}': {str(e)}") from e
 
     prompt: str = build_prompt(text, model_cls)
-    adapter = _get_adapter()
+    route, context_cache_id = _route(schema_name, prompt, context_cache_id)
+    adapter = _get_adapter(route)
 
     try:
-        markdown_output: str = adapter.generate_text(prompt, context_cache_id=context_cache_id)
+        with request_scope(route=route.name):
+            markdown_output: str = adapter.generate_text(prompt, context_cache_id=context_cache_id)
         
         # 显式保存调试信息（如果指定）
         if save_raw_to:
@@ -58,15 +74,52 @@ def extract(text: str, schema_name: str, save_raw_to: Optional[str] = None, cont
             logger.info(f"Raw output saved to {save_raw_to}")
 
         return clean_markdown_code_block(markdown_output)
+    except DeadlineExceededError:
+        logger.warning(f"Deadline exceeded for schema {schema_name}, dropping call")
+        raise
     except Exception as e:
         logger.error(f"LLM generation failed for schema {schema_name}: {str(e)}")
         raise LLMCallError(f"LLM generation failed: {str(e)}") from e
 
 
-async def async_extract(text: str, schema_name: str, save_raw_to: Optional[str] = None, context_cache_id: Optional[str] = None) -> str:
+async def async_extract(text: str, schema_name: str, save_raw_to: Optional[str] = None, context_cache_id: Optional[str] = None, timeout: Optional[float] = None) -> str:
     """
     异步从非结构化文本中提取信息。
+    timeout 为端到端截止时间（秒），未指定时沿用外层调用设置的截止时间；
+    到期时取消进行中的 HTTP 请求并抛出 DeadlineExceededError，不会在截止后继续完成。
+    并发的相同请求（schema、文本、上下文缓存 ID 与调度优先级均相同）合并为一次 LLM 调用，共享其结果；
+    合并后的调用不受任何调用方截止时间的约束，每个调用方只对自己的等待施加截止时间，全部离开后才取消共享调用。
     """
+    markdown_output = await _async_extract_raw(text, schema_name, context_cache_id=context_cache_id, timeout=timeout)
+
+    if save_raw_to:
+        def _save():
+            with open(save_raw_to, "w", encoding="utf-8") as f:
+                f.write(markdown_output)
+        await asyncio.to_thread(_save)
+        logger.info(f"Raw output saved to {save_raw_to}")
+
+    return clean_markdown_code_block(markdown_output)
+
+
+async def _async_extract_raw(
+    text: str, schema_name: str, context_cache_id: Optional[str] = None, timeout: Optional[float] = None, prompt: Optional[str] = None
+) -> str:
+    """在截止时间内执行（可能与并发的相同请求合并的）LLM 调用，返回未清理的原始输出"""
+    with deadline_scope(timeout), request_scope(schema=schema_name):
+        return await run_with_deadline(
+            get_singleflight("llm_extract").do(
+                # 优先级参与合并键：共享调用按发起者的优先级排队，交互请求不能合并到排在批量队列中的调用上
+                (schema_name, text_fingerprint(text), context_cache_id, current_priority()),
+                lambda: _async_generate(text, schema_name, context_cache_id=context_cache_id, prompt=prompt),
+                schema=schema_name,
+            ),
+            stage=f"extraction of schema {schema_name}",
+        )
+
+
+async def _async_generate(text: str, schema_name: str, context_cache_id: Optional[str] = None, prompt: Optional[str] = None) -> str:
+    """构建提示词（调用方已渲染时直接使用）并调用 LLM，返回原始 Markdown 输出"""
     _validate_input(text, schema_name)
 
     try:
@@ -74,47 +127,139 @@ async def async_extract(text: str, schema_name: str, save_raw_to: Optional[str]
     except ValueError as e:
         raise SchemaError(f"Failed to load schema '{schema_name}': {str(e)}") from e
 
-    prompt: str = await async_build_prompt(text, model_cls)
-    adapter = _get_adapter()
+    if prompt is None:
+        prompt = await async_build_prompt(text, model_cls)
+    route, context_cache_id = _route(schema_name, prompt, context_cache_id)
+    adapter = _get_adapter(route)
     
     try:
-        markdown_output: str = await adapter.agenerate_text(prompt, context_cache_id=context_cache_id)
-        
-        if save_raw_to:
-            def _save():
-                with open(save_raw_to, "w", encoding="utf-8") as f:
-                    f.write(markdown_output)
-            await asyncio.to_thread(_save)
-            logger.info(f"Raw output saved to {save_raw_to}")
-        
-        return clean_markdown_code_block(markdown_output)
+        with request_scope(route=route.name):
+            return await adapter.agenerate_text(prompt, context_cache_id=context_cache_id)
+    except DeadlineExceededError:
+        logger.warning(f"Deadline exceeded for schema {schema_name}, dropping call")
+        raise
     except Exception as e:
         logger.error(f"LLM async generation failed for schema {schema_name}: {str(e)}")
         raise LLMCallError(f"LLM async generation failed: {str(e)}") from e
 
 
-def extract_to_model(text: str, schema_name: str, save_raw_to: Optional[str] = None, context_cache_id: Optional[str] = None) -> BaseModel:
+def _wrap_stream(chunks: Iterator[str], schema_name: str) -> Iterator[str]:
+    """流式调用的错误与 extract 一致地包装为 LLMCallError；提前结束迭代时关闭底层生成器"""
+    with closing(chunks):
+        try:
+            yield from chunks
+        except DeadlineExceededError:
+            logger.warning(f"Deadline exceeded for schema {schema_name}, dropping stream")
+            raise
+        except Exception as e:
+            logger.error(f"LLM stream generation failed for schema {schema_name}: {str(e)}")
+            raise LLMCallError(f"LLM stream generation failed: {str(e)}") from e
+
+
+async def _awrap_stream(chunks: AsyncIterator[str], schema_name: str) -> AsyncIterator[str]:
+    """异步流式调用的错误包装，与 async_extract 一致"""
+    async with aclosing(chunks):
+        try:
+            async for chunk in chunks:
+                yield chunk
+        except DeadlineExceededError:
+            logger.warning(f"Deadline exceeded for schema {schema_name}, dropping stream")
+            raise
+        except Exception as e:
+            logger.error(f"LLM async stream generation failed for schema {schema_name}: {str(e)}")
+            raise LLMCallError(f"LLM async stream generation failed: {str(e)}") from e
+
+
+def stream_extract(text: str, schema_name: str, context_cache_id: Optional[str] = None) -> TextStream:
+    """
+    流式提取：逐段返回 LLM 生成的 Markdown 文本，适合需要尽早展示结果的交互场景。
+    分片为原始输出，不做代码块清理；完整文本可在迭代结束后通过 stream.text 获取，
+    首字时间与分片间隔见 stream.stats。
+    """
+    _validate_input(text, schema_name)
+
+    try:
+        model_cls: Type[BaseModel] = get_model(schema_name)
+    except ValueError as e:
+        raise SchemaError(f"Failed to load schema '{schema_name}': {str(e)}") from e
+
+    prompt: str = build_prompt(text, model_cls)
+    route, context_cache_id = _route(schema_name, prompt, context_cache_id)
+    adapter = _get_adapter(route)
+    return TextStream(_wrap_stream(adapter.stream_text(prompt, context_cache_id=context_cache_id), schema_name), schema_name=schema_name)
+
+
+async def async_stream_extract(text: str, schema_name: str, context_cache_id: Optional[str] = None) -> AsyncTextStream:
+    """
+    异步流式提取，返回可 async for 迭代的 AsyncTextStream。
+    """
+    _validate_input(text, schema_name)
+
+    try:
+        model_cls: Type[BaseModel] = get_model(schema_name)
+    except ValueError as e:
+        raise SchemaError(f"Failed to load schema '{schema_name}': {str(e)}") from e
+
+    prompt: str = await async_build_prompt(text, model_cls)
+    route, context_cache_id = _route(schema_name, prompt, context_cache_id)
+    adapter = _get_adapter(route)
+    return AsyncTextStream(
+        _awrap_stream(adapter.astream_text(prompt, context_cache_id=context_cache_id), schema_name), schema_name=schema_name
+    )
+
+
+def extract_to_model(text: str, schema_name: str, save_raw_to: Optional[str] = None, context_cache_id: Optional[str] = None, timeout: Optional[float] = None) -> BaseModel:
     """
     从非结构化文本中提取信息并转换为 Pydantic 模型实例。
     """
-    markdown_output = extract(text, schema_name, save_raw_to=save_raw_to, context_cache_id=context_cache_id)
+    with deadline_scope(timeout):
+        markdown_output = extract(text, schema_name, save_raw_to=save_raw_to, context_cache_id=context_cache_id)
+        check_deadline(f"parsing schema {schema_name}")
     
     model_cls = get_model(schema_name)
     parser = MarkdownParser(model_cls)
     return parser.parse(markdown_output)
 
 
-async def async_extract_to_model(text: str, schema_name: str, save_raw_to: Optional[str] = None, context_cache_id: Optional[str] = None) -> BaseModel:
+async def async_extract_to_model(text: str, schema_name: str, save_raw_to: Optional[str] = None, context_cache_id: Optional[str] = None, timeout: Optional[float] = None) -> BaseModel:
     """
     异步提取信息并转换为 Pydantic 模型。
+    timeout 为提取与解析整体的截止时间（秒），截止时间通过上下文传递到适配器层。
+    并发的相同请求共享同一次 LLM 调用与同一个解析结果（调用方不应修改返回的模型实例）。
     """
-    markdown_output = await async_extract(text, schema_name, save_raw_to=save_raw_to, context_cache_id=context_cache_id)
-    
+    with deadline_scope(timeout):
+        markdown_output = await async_extract(text, schema_name, save_raw_to=save_raw_to, context_cache_id=context_cache_id)
+        # 结果已过期则不再解析
+        check_deadline(f"parsing schema {schema_name}")
+    return await _async_parse(markdown_output, schema_name)
+
+
+async def async_extract_result(
+    text: str, schema_name: str, context_cache_id: Optional[str] = None, timeout: Optional[float] = None, prompt: Optional[str] = None
+) -> Tuple[str, BaseModel]:
+    """
+    与 async_extract_to_model 相同，但同时返回 LLM 的原始输出：(原始 Markdown, 模型实例)。
+    供结果写入器（core/sinks.py）把原始输出与解析结果一起批量写出，而不是由提取过程逐个写文件。
+    prompt 为调用方已渲染的提示词（如批量运行器为路由已渲染过），传入时不再重复渲染。
+    """
+    with deadline_scope(timeout):
+        raw_output = await _async_extract_raw(text, schema_name, context_cache_id=context_cache_id, prompt=prompt)
+        check_deadline(f"parsing schema {schema_name}")
+    return raw_output, await _async_parse(clean_markdown_code_block(raw_output), schema_name)
+
+
+async def _async_parse(markdown_output: str, schema_name: str) -> BaseModel:
+    """在线程池中解析 Markdown 输出，相同输出的并发解析合并为一次"""
     model_cls = get_model(schema_name)
     parser = MarkdownParser(model_cls)
     
     try:
-        return await asyncio.to_thread(parser.parse, markdown_output)
+        # 合并后的请求拿到相同的输出，解析也只做一次，共享同一个模型实例
+        return await get_singleflight("llm_parse").do(
+            (schema_name, text_fingerprint(markdown_output)),
+            lambda: asyncio.to_thread(parser.parse, markdown_output),
+            schema=schema_name,
+        )
     except Exception as e:
         logger.error(f"Markdown parsing failed in thread pool: {str(e)}")
         raise ParserError(f"Failed to parse structured output: {str(e)}") from e
\ No newline at end of file
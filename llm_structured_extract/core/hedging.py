@@ -0,0 +1,173 @@
+# llm_structured_extract/core/hedging.py
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+from llm_structured_extract.config.settings import HedgingConfig, settings
+from llm_structured_extract.core.llm_adapters.base_adapter import AdapterWrapper, BaseAdapter
+from llm_structured_extract.core.request_context import current_schema
+from llm_structured_extract.utils.logger import get_logger
+from llm_structured_extract.utils.metrics import metrics
+
+logger = get_logger(__name__)
+
+
+class LatencyTracker:
+    """按键（schema）维护最近 window_size 次调用延迟的滑动窗口，在线计算分位数"""
+
+    def __init__(self, window_size: int = 200, min_samples: int = 20):
+        self.window_size = window_size
+        self.min_samples = min_samples
+        self._windows: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, key: str, latency: float) -> None:
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None:
+                window = self._windows[key] = deque(maxlen=self.window_size)
+            window.append(latency)
+
+    def percentile(self, key: str, q: float) -> Optional[float]:
+        """最近邻秩分位数；样本不足 min_samples 时返回 None"""
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or len(window) < self.min_samples:
+                return None
+            samples = sorted(window)
+        rank = max(1, math.ceil(q * len(samples)))
+        return samples[rank - 1]
+
+
+class HedgeBudget:
+    """
+    对冲配额（令牌桶）：每个请求存入 max_ratio 个令牌、每次对冲消耗 1 个，
+    桶容量为 max_tokens。空闲期不会累积无限配额，突发流量的对冲比例仍接近 max_ratio。
+    """
+
+    def __init__(self, max_ratio: float = 0.05, max_tokens: float = 10.0):
+        self.max_ratio = max_ratio
+        self.max_tokens = max_tokens
+        self._tokens = 0.0
+        self._requests = 0
+        self._hedges = 0
+        self._lock = threading.Lock()
+
+    def record_request(self) -> None:
+        with self._lock:
+            self._requests += 1
+            self._tokens = min(self.max_tokens, self._tokens + self.max_ratio)
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            self._hedges += 1
+            return True
+
+    @property
+    def ratio(self) -> float:
+        with self._lock:
+            return self._hedges / self._requests if self._requests else 0.0
+
+
+class HedgingAdapter(AdapterWrapper):
+    """
+    对冲请求：异步调用超过该 schema 近期延迟的 percentile 分位仍未返回时，
+    向同一或备用提供商补发一个副本，先成功返回的结果胜出，另一个请求被取消。
+    对冲量受 HedgeBudget 限制；同步调用无法取消落后的请求，只记录延迟不对冲。
+    """
+
+    def __init__(
+        self,
+        inner: BaseAdapter,
+        provider: str,
+        config: Optional[HedgingConfig] = None,
+        hedge_adapter: Optional[BaseAdapter] = None,
+        tracker: Optional[LatencyTracker] = None,
+        budget: Optional[HedgeBudget] = None,
+    ):
+        super().__init__(inner)
+        self.provider = provider
+        self.config = config or settings.hedging_config
+        self.tracker = tracker or LatencyTracker(self.config.window_size, self.config.min_samples)
+        self.budget = budget or HedgeBudget(self.config.max_hedge_ratio, self.config.max_hedge_burst)
+        self._hedge_adapter = hedge_adapter
+        metrics.register_gauge("llm_hedge_ratio", lambda: self.budget.ratio, provider=provider)
+
+    @property
+    def hedge_adapter(self) -> BaseAdapter:
+        """副本目标：配置了备用提供商时使用其适配器（不带重试），否则复用内层适配器"""
+        if self._hedge_adapter is None:
+            hedge_provider = (self.config.provider or "").lower()
+            if hedge_provider and hedge_provider != self.provider:
+                from llm_structured_extract.core.adapter_manager import get_adapter
+                self._hedge_adapter = get_adapter(hedge_provider, with_retry=False)
+            else:
+                self._hedge_adapter = self.inner
+        return self._hedge_adapter
+
+    def _threshold(self, key: str) -> Optional[float]:
+        latency = self.tracker.percentile(key, self.config.percentile)
+        if latency is None:
+            return None
+        return max(latency, self.config.min_delay)
+
+    def generate_text(self, prompt: str, context_cache_id: Optional[str] = None) -> str:
+        start = time.monotonic()
+        result = self.inner.generate_text(prompt, context_cache_id=context_cache_id)
+        self.tracker.record(current_schema() or "", time.monotonic() - start)
+        return result
+
+    async def agenerate_text(self, prompt: str, context_cache_id: Optional[str] = None) -> str:
+        key = current_schema() or ""
+        self.budget.record_request()
+        threshold = self._threshold(key)
+        start = time.monotonic()
+
+        if threshold is None:
+            result = await self.inner.agenerate_text(prompt, context_cache_id=context_cache_id)
+            self.tracker.record(key, time.monotonic() - start)
+            return result
+
+        primary = asyncio.ensure_future(self.inner.agenerate_text(prompt, context_cache_id=context_cache_id))
+
+        def _record_primary(task: asyncio.Future) -> None:
+            # 只统计主请求自身的延迟；副本胜出时主请求被取消，由下方按下限记录
+            if not task.cancelled() and task.exception() is None:
+                self.tracker.record(key, time.monotonic() - start)
+
+        primary.add_done_callback(_record_primary)
+        pending = {primary}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=threshold)
+            if not done and self.budget.try_acquire():
+                logger.debug(f"Hedging slow call for schema '{key}' after {threshold:.2f}s")
+                metrics.inc("llm_hedge_requests_total", schema=key)
+                # 副本的上下文缓存与主请求提供商绑定，发往其他提供商时不携带
+                hedge_cache_id = context_cache_id if self.hedge_adapter is self.inner else None
+                pending.add(asyncio.ensure_future(
+                    self.hedge_adapter.agenerate_text(prompt, context_cache_id=hedge_cache_id)
+                ))
+
+            first_error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            metrics.inc("llm_hedge_wins_total", schema=key)
+                            if not primary.done():
+                                # 主请求延迟至少为当前耗时，记为下限，避免副本延迟拉低分位数
+                                self.tracker.record(key, time.monotonic() - start)
+                        return task.result()
+                    if first_error is None or task is primary:
+                        first_error = task.exception()
+            raise first_error
+        finally:
+            # 胜出结果已返回、或调用方被取消 / 截止：取消仍在进行的请求
+            for task in pending:
+                task.cancel()
@@ -0,0 +1,200 @@
+# llm_structured_extract/core/job_manifest.py
+import asyncio
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple, Union
+from llm_structured_extract.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+MANIFEST_FILENAME = "manifest.sqlite3"
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# (文档 ID, schema)
+TaskKey = Tuple[str, str]
+
+
+class TaskRecord(NamedTuple):
+    doc_id: str
+    schema: str
+    status: str
+    attempts: int
+    error: Optional[str]
+
+
+class JobManifest:
+    """
+    批量任务清单：在输出目录内的 SQLite 文件中记录每个（文档 × schema）任务的状态。
+    - 重新运行时跳过已完成的任务，失败的任务在 max_attempts 次以内重试
+    - claim 是单条带条件的 UPDATE，多个进程共享同一清单时同一任务只会被一个进程领取
+    - 运行中任务的租约较短，由持有进程定期 renew() 续期；进程崩溃后租约在 lease_seconds 内过期，可被其他进程重新领取
+    - 打开清单时立即回收本机上已退出进程持有的任务，close() 时归还本进程未完成的任务，
+      因此崩溃或中断后立即重新运行不必等待租约过期
+    - 租约过期且已用尽重试次数的运行中任务标记为失败
+    """
+
+    def __init__(self, path: Union[str, Path], max_attempts: int = 3, lease_seconds: float = 120.0):
+        self.path = Path(path)
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS tasks ("
+                " doc_id TEXT NOT NULL, schema TEXT NOT NULL, status TEXT NOT NULL,"
+                " attempts INTEGER NOT NULL DEFAULT 0, owner TEXT, lease_expires REAL,"
+                " error TEXT, updated_at REAL NOT NULL, PRIMARY KEY (doc_id, schema))"
+            )
+        self._reclaim_dead_owners()
+
+    @classmethod
+    def for_output_dir(cls, output_dir: Union[str, Path], **kwargs) -> "JobManifest":
+        return cls(Path(output_dir) / MANIFEST_FILENAME, **kwargs)
+
+    def register(self, tasks: Iterable[TaskKey]) -> None:
+        """登记任务；已存在的任务保持原状态"""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO tasks (doc_id, schema, status, updated_at) VALUES (?, ?, ?, ?)",
+                [(doc_id, schema, PENDING, now) for doc_id, schema in tasks],
+            )
+
+    # 可领取：未开始；失败且未用尽重试次数；运行中但租约已过期（持有进程已退出）
+    _CLAIMABLE = (
+        "(status = ? OR (status IN (?, ?) AND attempts < ? AND (status = ? OR lease_expires < ?)))"
+    )
+
+    def _claimable_args(self, now: float) -> Tuple:
+        return PENDING, FAILED, RUNNING, self.max_attempts, FAILED, now
+
+    def _reclaim_dead_owners(self) -> None:
+        """让本机上已退出进程持有的运行中任务的租约立即过期"""
+        host = socket.gethostname()
+        with self._lock:
+            owners = [row[0] for row in self._conn.execute("SELECT DISTINCT owner FROM tasks WHERE status = ?", (RUNNING,))]
+        dead = [owner for owner in owners if _owner_exited(owner, host)]
+        if not dead:
+            return
+        with self._lock, self._conn:
+            cursor = self._conn.executemany(
+                "UPDATE tasks SET lease_expires = 0 WHERE status = ? AND owner = ?", [(RUNNING, owner) for owner in dead]
+            )
+        logger.info(f"Reclaimed {cursor.rowcount} running tasks from exited processes {dead}")
+
+    def _fail_exhausted(self, now: float) -> None:
+        """在持有锁时调用：租约已过期且用尽重试次数的运行中任务不会再被领取，标记为失败"""
+        with self._conn:
+            self._conn.execute(
+                "UPDATE tasks SET status = ?, error = COALESCE(error, ?), owner = NULL, lease_expires = NULL, updated_at = ?"
+                " WHERE status = ? AND lease_expires < ? AND attempts >= ?",
+                (FAILED, "lease expired", now, RUNNING, now, self.max_attempts),
+            )
+
+    def claimable(self) -> Set[TaskKey]:
+        """当前可领取的任务（仅用于规划，真正执行前仍需 claim）"""
+        with self._lock:
+            self._fail_exhausted(time.time())
+            rows = self._conn.execute(
+                f"SELECT doc_id, schema FROM tasks WHERE {self._CLAIMABLE}", self._claimable_args(time.time())
+            ).fetchall()
+        return {(doc_id, schema) for doc_id, schema in rows}
+
+    def claim(self, doc_id: str, schema: str) -> bool:
+        """原子地领取一个任务，返回是否领取成功（已完成、已被其他进程领取或重试次数用尽时为 False）"""
+        now = time.time()
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE tasks SET status = ?, attempts = attempts + 1, owner = ?, lease_expires = ?, updated_at = ?"
+                f" WHERE doc_id = ? AND schema = ? AND {self._CLAIMABLE}",
+                (RUNNING, self.owner, now + self.lease_seconds, now, doc_id, schema, *self._claimable_args(now)),
+            )
+        return cursor.rowcount == 1
+
+    def renew(self) -> int:
+        """为本进程持有的全部运行中任务续期，返回续期的任务数；执行期间应每隔 lease_seconds / 3 调用一次"""
+        now = time.time()
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE tasks SET lease_expires = ? WHERE status = ? AND owner = ?", (now + self.lease_seconds, RUNNING, self.owner)
+            )
+        return cursor.rowcount
+
+    def _finish(self, doc_id: str, schema: str, status: str, error: Optional[str]) -> bool:
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE tasks SET status = ?, error = ?, owner = NULL, lease_expires = NULL, updated_at = ?"
+                " WHERE doc_id = ? AND schema = ? AND status = ? AND owner = ?",
+                (status, error, time.time(), doc_id, schema, RUNNING, self.owner),
+            )
+        if cursor.rowcount != 1:
+            # 租约过期后任务已被其他进程重新领取，以新持有者的结果为准
+            logger.warning(f"Lost lease on task {doc_id} / {schema}, result not recorded in manifest")
+            return False
+        return True
+
+    def complete(self, doc_id: str, schema: str) -> bool:
+        return self._finish(doc_id, schema, DONE, None)
+
+    def fail(self, doc_id: str, schema: str, error: str) -> bool:
+        return self._finish(doc_id, schema, FAILED, error)
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            self._fail_exhausted(time.time())
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+    def tasks(self, status: Optional[str] = None) -> List[TaskRecord]:
+        query = "SELECT doc_id, schema, status, attempts, error FROM tasks"
+        args: Tuple = ()
+        if status:
+            query += " WHERE status = ?"
+            args = (status,)
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY doc_id, schema", args).fetchall()
+        return [TaskRecord(*row) for row in rows]
+
+    def close(self) -> None:
+        """归还本进程仍持有的任务（使其租约立即过期）后关闭"""
+        with self._lock:
+            with self._conn:
+                self._conn.execute("UPDATE tasks SET lease_expires = 0 WHERE status = ? AND owner = ?", (RUNNING, self.owner))
+            self._conn.close()
+
+
+async def renew_leases(manifest: JobManifest) -> None:
+    """后台任务：每隔 lease_seconds / 3 为本进程持有的任务续期，直到被取消"""
+    while True:
+        await asyncio.sleep(manifest.lease_seconds / 3)
+        try:
+            await asyncio.to_thread(manifest.renew)
+        except Exception as e:
+            logger.warning(f"Failed to renew manifest leases: {str(e)}")
+
+
+def _owner_exited(owner: Optional[str], host: str) -> bool:
+    """owner 形如 host:pid:随机后缀；只能判断本机进程是否仍存活"""
+    parts = (owner or "").rsplit(":", 2)
+    if len(parts) != 3 or parts[0] != host or not parts[1].isdigit() or os.name == "nt":
+        return False
+    try:
+        os.kill(int(parts[1]), 0)
+    except ProcessLookupError:
+        return True
+    except OSError:
+        return False
+    return False
@@ -1,14 +1,27 @@
 from abc import ABC, abstractmethod
-from typing import Type, Dict, Callable, Optional
+from contextlib import aclosing
+from typing import AsyncIterator, Type, Dict, Callable, Iterator, Optional
+from llm_structured_extract.core.exceptions import LLMCallError, RateLimitError, TransientLLMError
 
 ADAPTER_REGISTRY: Dict[str, Type['BaseAdapter']] = {}
 
+# 可重试的 HTTP 状态码：限流、请求超时与服务端暂时性错误
+RETRYABLE_STATUS_CODES = {408, 409, 425, 429, 500, 502, 503, 504}
+
 def register_adapter(name: str) -> Callable[[Type['BaseAdapter']], Type['BaseAdapter']]:
     def decorator(cls: Type['BaseAdapter']) -> Type['BaseAdapter']:
         ADAPTER_REGISTRY[name] = cls
         return cls
     return decorator
 
+def status_error(message: str, status_code: Optional[int]) -> LLMCallError:
+    """按 HTTP 状态码将服务商错误归类为限流 / 可重试 / 不可重试异常"""
+    if status_code == 429:
+        return RateLimitError(message)
+    if status_code in RETRYABLE_STATUS_CODES:
+        return TransientLLMError(message)
+    return LLMCallError(message)
+
 class BaseAdapter(ABC):
     @abstractmethod
     def generate_text(self, prompt: str, context_cache_id: Optional[str] = None) -> str:
@@ -19,8 +32,89 @@ class BaseAdapter(ABC):
         """异步生成文本接口"""
         ...
 
+    def stream_text(self, prompt: str, context_cache_id: Optional[str] = None) -> Iterator[str]:
+        """
+        流式生成接口，逐段产出增量文本。
+        默认退化为一次性产出完整结果，由支持增量输出的适配器覆盖。
+        """
+        yield self.generate_text(prompt, context_cache_id=context_cache_id)
+
+    async def astream_text(self, prompt: str, context_cache_id: Optional[str] = None) -> AsyncIterator[str]:
+        """异步流式生成接口，默认退化为一次性产出完整结果"""
+        yield await self.agenerate_text(prompt, context_cache_id=context_cache_id)
+
     def create_context_cache(self, text: str, ttl_seconds: int = 3600) -> Optional[str]:
         """
         创建上下文缓存接口。默认不执行任何操作，由支持的适配器覆盖。
         """
         return None
+
+    def warmup(self) -> None:
+        """预热（如预加载模型、建立连接）。默认不执行任何操作，由支持的适配器覆盖。"""
+        return None
+
+    def close(self) -> None:
+        """释放适配器持有的同步资源（如连接池）。"""
+        return None
+
+    async def aclose(self) -> None:
+        """释放适配器持有的异步资源，默认复用同步释放逻辑。"""
+        self.close()
+
+
+class AdapterWrapper(BaseAdapter):
+    """
+    包装器适配器基类：默认将所有调用透明转发给内部适配器。
+    重试、限流等横切能力通过继承本类并覆盖 generate_text / agenerate_text 叠加。
+    """
+
+    def __init__(self, inner: BaseAdapter):
+        self.inner = inner
+
+    def __getattr__(self, name):
+        # 仅在自身属性缺失时触发，透出内部适配器的 model 等属性
+        if name == "inner":
+            raise AttributeError(name)
+        return getattr(self.inner, name)
+
+    def generate_text(self, prompt: str, context_cache_id: Optional[str] = None) -> str:
+        return self.inner.generate_text(prompt, context_cache_id=context_cache_id)
+
+    async def agenerate_text(self, prompt: str, context_cache_id: Optional[str] = None) -> str:
+        return await self.inner.agenerate_text(prompt, context_cache_id=context_cache_id)
+
+    def stream_text(self, prompt: str, context_cache_id: Optional[str] = None) -> Iterator[str]:
+        stream = getattr(self.inner, "stream_text", None)
+        if stream is None:
+            yield self.inner.generate_text(prompt, context_cache_id=context_cache_id)
+            return
+        yield from stream(prompt, context_cache_id=context_cache_id)
+
+    async def astream_text(self, prompt: str, context_cache_id: Optional[str] = None) -> AsyncIterator[str]:
+        stream = getattr(self.inner, "astream_text", None)
+        if stream is None:
+            yield await self.inner.agenerate_text(prompt, context_cache_id=context_cache_id)
+            return
+        async with aclosing(stream(prompt, context_cache_id=context_cache_id)) as chunks:
+            async for chunk in chunks:
+                yield chunk
+
+    def create_context_cache(self, text: str, ttl_seconds: int = 3600) -> Optional[str]:
+        return self.inner.create_context_cache(text, ttl_seconds=ttl_seconds)
+
+    def warmup(self) -> None:
+        warmup = getattr(self.inner, "warmup", None)
+        if callable(warmup):
+            warmup()
+
+    def close(self) -> None:
+        close = getattr(self.inner, "close", None)
+        if callable(close):
+            close()
+
+    async def aclose(self) -> None:
+        aclose = getattr(self.inner, "aclose", None)
+        if callable(aclose):
+            await aclose()
+        else:
+            self.close()
@@ -1,18 +1,27 @@
 # core/llm_adapters/dashscope_adapter.py
+import json
 import os
-from typing import Optional
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, Optional
 import dashscope
-from llm_structured_extract.core.llm_adapters.base_adapter import BaseAdapter, register_adapter
+import httpx
+from llm_structured_extract.core.llm_adapters.base_adapter import BaseAdapter, register_adapter, status_error
 from llm_structured_extract.config.settings import settings
-from llm_structured_extract.core.exceptions import ConfigurationError, LLMCallError
+from llm_structured_extract.core.exceptions import ConfigurationError, LLMCallError, TransientLLMError
+from llm_structured_extract.core.deadline import call_timeout, call_timeout_seconds, timeout_error
+from llm_structured_extract.core.usage import record_usage, usage_field
+from llm_structured_extract.utils.http_pool import get_async_client
 from llm_structured_extract.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+DEFAULT_BASE_URL = "https://dashscope.aliyuncs.com/api/v1"
+GENERATION_PATH = "/services/aigc/text-generation/generation"
+
 
 @register_adapter("dashscope")
 class DashScopeAdapter(BaseAdapter):
-    def __init__(self, model: Optional[str] = None, api_key: Optional[str] = None):
+    def __init__(self, model: Optional[str] = None, api_key: Optional[str] = None, base_url: Optional[str] = None):
         """
         初始化 DashScope 适配器
         使用统一配置系统中的模型配置
@@ -20,11 +29,13 @@ class DashScopeAdapter(BaseAdapter):
         key = api_key or settings.DASHSCOPE_API_KEY or os.getenv("DASHSCOPE_API_KEY", "")
         if not key:
             raise ConfigurationError("DashScope API key is required. Set DASHSCOPE_API_KEY in env or settings.")
-        dashscope.api_key = key
+        # 每次调用显式传入 api_key，不修改 SDK 的全局 dashscope.api_key
+        self.api_key = key
         
         # 从统一配置获取模型参数
         model_config = settings.get_model_config("dashscope")
         self.model = model or model_config.name
+        self.base_url = base_url or model_config.base_url or DEFAULT_BASE_URL
 
     def _prepare_params(self, prompt: str, context_cache_id: Optional[str] = None):
         """准备 API 调用参数"""
@@ -37,6 +48,7 @@ class DashScopeAdapter(BaseAdapter):
         ]
         
         params = {
+            "api_key": self.api_key,
             "model": self.model,
             "messages": messages,
             "result_format": "message",
@@ -53,7 +65,7 @@ class DashScopeAdapter(BaseAdapter):
     def _process_response(self, resp, is_async=False) -> str:
         """统一处理 API 响应"""
         if resp.status_code != 200:
-            raise LLMCallError(f"DashScope API failed with status {resp.status_code}: {resp.message}")
+            raise status_error(f"DashScope API failed with status {resp.status_code}: {resp.message}", resp.status_code)
         
         try:
             content = resp.output.choices[0].message.content
@@ -70,17 +82,169 @@ class DashScopeAdapter(BaseAdapter):
                 raise
             raise LLMCallError(f"DashScope API call failed: {str(e)}") from e
 
+    def _record_usage(self, usage: Any, started: float) -> None:
+        """上报用量：input_tokens 已包含命中 Context Cache 的 cached_tokens"""
+        if usage is None:
+            return
+        record_usage(
+            "dashscope",
+            self.model,
+            prompt_tokens=usage_field(usage, "input_tokens"),
+            completion_tokens=usage_field(usage, "output_tokens"),
+            cached_tokens=usage_field(usage_field(usage, "prompt_tokens_details"), "cached_tokens"),
+            latency=time.perf_counter() - started,
+        )
+
+    def _build_http_payload(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """将 SDK 风格参数转换为 DashScope HTTP 接口的请求体"""
+        parameters = {k: v for k, v in params.items() if k not in ("api_key", "model", "messages")}
+        return {
+            "model": params["model"],
+            "input": {"messages": params["messages"]},
+            "parameters": parameters,
+        }
+
+    def _process_http_response(self, resp: httpx.Response) -> str:
+        """处理 DashScope HTTP 接口响应"""
+        try:
+            data = resp.json()
+        except ValueError as e:
+            raise status_error(f"DashScope API returned non-JSON response with status {resp.status_code}", resp.status_code) from e
+
+        if resp.status_code != 200:
+            raise status_error(f"DashScope API failed with status {resp.status_code}: {data.get('message', '')}", resp.status_code)
+
+        try:
+            content = data["output"]["choices"][0]["message"]["content"]
+        except (KeyError, IndexError, TypeError) as e:
+            raise LLMCallError(f"DashScope API response format error: {str(e)}") from e
+        if not content:
+            raise LLMCallError("LLM returned empty response")
+
+        logger.debug(f"LLM Raw Async Response from {self.model}:\n{content}")
+        return content.strip()
+
     def generate_text(self, prompt: str, context_cache_id: Optional[str] = None) -> str:
         """生成纯净 Markdown 响应"""
+        model_config = settings.get_model_config("dashscope")
         params = self._prepare_params(prompt, context_cache_id=context_cache_id)
-        resp = dashscope.Generation.call(**params)
-        return self._process_response(resp)
+        started = time.perf_counter()
+        resp = dashscope.Generation.call(**params, request_timeout=call_timeout_seconds(model_config.timeout))
+        content = self._process_response(resp)
+        self._record_usage(resp.usage, started)
+        return content
+
+    def _async_client(self) -> httpx.AsyncClient:
+        model_config = settings.get_model_config("dashscope")
+        return get_async_client(
+            self.base_url,
+            max_connections=model_config.max_connections,
+            max_keepalive_connections=model_config.max_keepalive_connections,
+            keepalive_expiry=model_config.keepalive_expiry,
+        )
+
+    @staticmethod
+    def _wrap_http_error(e: httpx.HTTPError) -> LLMCallError:
+        if isinstance(e, httpx.TimeoutException):
+            return timeout_error(f"DashScope API call timed out: {str(e)}")
+        if isinstance(e, httpx.TransportError):
+            return TransientLLMError(f"DashScope API call failed: {str(e)}")
+        return LLMCallError(f"DashScope API call failed: {str(e)}")
 
     async def agenerate_text(self, prompt: str, context_cache_id: Optional[str] = None) -> str:
-        """异步生成纯净 Markdown 响应"""
-        import asyncio
-        # 使用 asyncio.to_thread 包装同步调用，确保兼容性并避免阻塞事件循环
-        return await asyncio.to_thread(self.generate_text, prompt, context_cache_id=context_cache_id)
+        """
+        异步生成纯净 Markdown 响应。
+        直接调用 DashScope HTTP 接口，复用事件循环内共享的 Keep-Alive 连接池，不占用工作线程。
+        """
+        model_config = settings.get_model_config("dashscope")
+        params = self._prepare_params(prompt, context_cache_id=context_cache_id)
+        started = time.perf_counter()
+        try:
+            resp = await self._async_client().post(
+                GENERATION_PATH,
+                json=self._build_http_payload(params),
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                timeout=call_timeout(model_config.timeout),
+            )
+        except httpx.HTTPError as e:
+            raise self._wrap_http_error(e) from e
+        content = self._process_http_response(resp)
+        self._record_usage(resp.json().get("usage"), started)
+        return content
+
+    @staticmethod
+    def _delta_content(output: Any) -> str:
+        """从增量输出中取出本次新增的文本（SDK 对象或 HTTP JSON 均可）"""
+        if isinstance(output, dict):
+            choices = output.get("choices") or []
+            if not choices:
+                return ""
+            return (choices[0].get("message") or {}).get("content") or ""
+        choices = getattr(output, "choices", None) or []
+        if not choices:
+            return ""
+        return choices[0].message.content or ""
+
+    def stream_text(self, prompt: str, context_cache_id: Optional[str] = None) -> Iterator[str]:
+        """流式生成（incremental_output 模式，每段只包含新增文本）"""
+        model_config = settings.get_model_config("dashscope")
+        params = self._prepare_params(prompt, context_cache_id=context_cache_id)
+        started = time.perf_counter()
+        stream = dashscope.Generation.call(
+            **params, stream=True, incremental_output=True,
+            request_timeout=call_timeout_seconds(model_config.timeout),
+        )
+        usage = None
+        for resp in stream:
+            if resp.status_code != 200:
+                raise status_error(f"DashScope API failed with status {resp.status_code}: {resp.message}", resp.status_code)
+            # 每个事件携带截至当前的累计用量，以最后一个为准
+            usage = resp.usage or usage
+            delta = self._delta_content(resp.output)
+            if delta:
+                yield delta
+        self._record_usage(usage, started)
+
+    async def astream_text(self, prompt: str, context_cache_id: Optional[str] = None) -> AsyncIterator[str]:
+        """异步流式生成：通过 SSE 接收 DashScope 增量输出"""
+        model_config = settings.get_model_config("dashscope")
+        params = self._prepare_params(prompt, context_cache_id=context_cache_id)
+        params["incremental_output"] = True
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Accept": "text/event-stream",
+            "X-DashScope-SSE": "enable",
+        }
+        started = time.perf_counter()
+        usage = None
+        try:
+            async with self._async_client().stream(
+                "POST",
+                GENERATION_PATH,
+                json=self._build_http_payload(params),
+                headers=headers,
+                timeout=call_timeout(model_config.timeout),
+            ) as resp:
+                if resp.status_code != 200:
+                    await resp.aread()
+                    # 非 200 响应体为普通 JSON，复用统一的错误归类逻辑抛出
+                    self._process_http_response(resp)
+                async for line in resp.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = json.loads(line[len("data:"):])
+                    if "output" not in data:
+                        # SSE 流中的错误事件：{"code": ..., "message": ...}
+                        raise LLMCallError(f"DashScope API stream error: {data.get('code', '')} {data.get('message', '')}")
+                    usage = data.get("usage") or usage
+                    delta = self._delta_content(data["output"])
+                    if delta:
+                        yield delta
+        except httpx.HTTPError as e:
+            raise self._wrap_http_error(e) from e
+        except json.JSONDecodeError as e:
+            raise LLMCallError(f"DashScope API response format error: {str(e)}") from e
+        self._record_usage(usage, started)
 
     def create_context_cache(self, text: str, ttl_seconds: int = 3600) -> Optional[str]:
         """
@@ -102,6 +266,7 @@ class DashScopeAdapter(BaseAdapter):
             # 这里的逻辑假设 dashscope.ContextCache 可用
             if hasattr(dashscope, 'ContextCache'):
                 resp = dashscope.ContextCache.create(
+                    api_key=self.api_key,
                     model=self.model,
                     messages=messages,
                     ttl=ttl_seconds
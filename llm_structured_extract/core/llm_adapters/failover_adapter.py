@@ -0,0 +1,159 @@
+# core/llm_adapters/failover_adapter.py
+from contextlib import aclosing, closing
+from typing import AsyncIterator, Iterator, List, Optional, Tuple
+from llm_structured_extract.core.llm_adapters.base_adapter import BaseAdapter, register_adapter
+from llm_structured_extract.config.settings import FailoverConfig, settings
+from llm_structured_extract.core.circuit_breaker import OPEN, CircuitBreaker, get_circuit_breaker, is_provider_failure
+from llm_structured_extract.core.exceptions import ConfigurationError, TransientLLMError
+from llm_structured_extract.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+@register_adapter("failover")
+class FailoverAdapter(BaseAdapter):
+    """
+    多提供商路由适配器：按 llm.failover.providers 的顺序尝试，每个提供商配有独立熔断器。
+    熔断打开的提供商直接跳过，失败时切换到下一个，熔断恢复期后自动放行探测请求。
+    """
+
+    # 组合型适配器：子提供商各自带限流与并发控制，由 adapter_manager 只在外层叠加重试
+    is_composite = True
+
+    def __init__(self, providers: Optional[List[str]] = None, config: Optional[FailoverConfig] = None):
+        from llm_structured_extract.core.adapter_manager import get_adapter
+
+        config = config or settings.yaml_config.llm.failover
+        providers = [p.lower() for p in (providers or config.providers)]
+        if not providers:
+            raise ConfigurationError("Failover provider list is empty. Set llm.failover.providers in config.yaml.")
+        if "failover" in providers:
+            raise ConfigurationError("Failover provider list cannot contain 'failover' itself.")
+
+        # 子适配器不带重试：失败应尽快切换到下一个提供商，整体重试由外层负责
+        self.routes: List[Tuple[str, BaseAdapter, CircuitBreaker]] = [
+            (p, get_adapter(p, with_retry=False), get_circuit_breaker(p, config))
+            for p in providers
+        ]
+        self.model = getattr(self.routes[0][1], "model", "")
+
+    def _candidates(self):
+        for provider, adapter, breaker in self.routes:
+            if breaker.allow_request():
+                yield provider, adapter, breaker
+            else:
+                logger.debug(f"Skipping provider '{provider}': circuit {breaker.state}")
+
+    @staticmethod
+    def _on_error(provider: str, breaker: CircuitBreaker, exc: Exception) -> None:
+        if not is_provider_failure(exc):
+            # 非服务商故障（如本地参数错误）不触发切换，也不计入熔断统计
+            breaker.release_probe()
+            raise exc
+        breaker.record_failure()
+        logger.warning(f"Provider '{provider}' failed, failing over: {exc}")
+
+    @staticmethod
+    def _on_cancel(breaker: CircuitBreaker) -> None:
+        # 取消（截止时间、对冲落败、客户端断开）或流被提前关闭：结果未知，不计入熔断统计，
+        # 但必须归还半开探测名额，否则熔断器停留在半开状态、该提供商被永久跳过
+        breaker.release_probe()
+
+    @staticmethod
+    def _exhausted(last_error: Optional[Exception]) -> Exception:
+        if last_error is not None:
+            return last_error
+        return TransientLLMError("All LLM providers are unavailable (circuits open)")
+
+    def generate_text(self, prompt: str, context_cache_id: Optional[str] = None) -> str:
+        last_error = None
+        for provider, adapter, breaker in self._candidates():
+            try:
+                result = adapter.generate_text(prompt, context_cache_id=context_cache_id)
+            except Exception as e:
+                self._on_error(provider, breaker, e)
+                last_error = e
+                continue
+            except BaseException:
+                self._on_cancel(breaker)
+                raise
+            breaker.record_success()
+            return result
+        raise self._exhausted(last_error)
+
+    async def agenerate_text(self, prompt: str, context_cache_id: Optional[str] = None) -> str:
+        last_error = None
+        for provider, adapter, breaker in self._candidates():
+            try:
+                result = await adapter.agenerate_text(prompt, context_cache_id=context_cache_id)
+            except Exception as e:
+                self._on_error(provider, breaker, e)
+                last_error = e
+                continue
+            except BaseException:
+                self._on_cancel(breaker)
+                raise
+            breaker.record_success()
+            return result
+        raise self._exhausted(last_error)
+
+    def stream_text(self, prompt: str, context_cache_id: Optional[str] = None) -> Iterator[str]:
+        """流式调用只在首个分片产出前切换提供商"""
+        last_error = None
+        for provider, adapter, breaker in self._candidates():
+            emitted = False
+            try:
+                with closing(adapter.stream_text(prompt, context_cache_id=context_cache_id)) as chunks:
+                    for chunk in chunks:
+                        emitted = True
+                        yield chunk
+            except Exception as e:
+                if emitted:
+                    # 已向调用方产出内容，无法再切换提供商
+                    if is_provider_failure(e):
+                        breaker.record_failure()
+                    else:
+                        breaker.release_probe()
+                    raise
+                self._on_error(provider, breaker, e)
+                last_error = e
+                continue
+            except BaseException:
+                self._on_cancel(breaker)
+                raise
+            breaker.record_success()
+            return
+        raise self._exhausted(last_error)
+
+    async def astream_text(self, prompt: str, context_cache_id: Optional[str] = None) -> AsyncIterator[str]:
+        last_error = None
+        for provider, adapter, breaker in self._candidates():
+            emitted = False
+            try:
+                async with aclosing(adapter.astream_text(prompt, context_cache_id=context_cache_id)) as chunks:
+                    async for chunk in chunks:
+                        emitted = True
+                        yield chunk
+            except Exception as e:
+                if emitted:
+                    if is_provider_failure(e):
+                        breaker.record_failure()
+                    else:
+                        breaker.release_probe()
+                    raise
+                self._on_error(provider, breaker, e)
+                last_error = e
+                continue
+            except BaseException:
+                self._on_cancel(breaker)
+                raise
+            breaker.record_success()
+            return
+        raise self._exhausted(last_error)
+
+    def create_context_cache(self, text: str, ttl_seconds: int = 3600) -> Optional[str]:
+        """上下文缓存与提供商绑定，只在首个可用提供商上创建"""
+        for provider, adapter, breaker in self.routes:
+            if breaker.state != OPEN:
+                return adapter.create_context_cache(text, ttl_seconds=ttl_seconds)
+        return None
@@ -0,0 +1,242 @@
+# core/llm_adapters/mock_adapter.py
+import asyncio
+import glob
+import hashlib
+import math
+import random
+import threading
+import time
+from pathlib import Path
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+from llm_structured_extract.core.llm_adapters.base_adapter import BaseAdapter, register_adapter, status_error
+from llm_structured_extract.config.settings import MockConfig, settings
+from llm_structured_extract.core.request_context import current_schema
+from llm_structured_extract.core.usage import record_usage
+from llm_structured_extract.utils.tokens import estimate_tokens
+from llm_structured_extract.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_SCHEMA_KEY = "_default"
+FALLBACK_RESPONSE = "# 模拟输出\n"
+
+
+def prompt_hash(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:16]
+
+
+def _resolve(path: str) -> Path:
+    p = Path(path)
+    return p if p.is_absolute() else settings.PROJECT_ROOT / p
+
+
+class _CallPlan:
+    """一次模拟调用的预定行为：总延迟与注入的错误"""
+
+    def __init__(self, latency: float, error: Optional[Exception]):
+        self.latency = latency
+        self.error = error
+
+
+@register_adapter("mock")
+class MockAdapter(BaseAdapter):
+    """
+    录制 / 回放模拟适配器，用于在本地无成本地压测吞吐、并发与容错逻辑。
+    - 回放：优先按 (schema, 提示词哈希) 查找录制结果，其次按 schema 回放历史输出（replay_globs），都没有时返回占位内容
+    - 录制：mode=record 时调用 record_provider 的真实适配器并把响应写入 recordings_dir
+    - 注入按分布采样的延迟、错误率、服务端容量限制与流式分片；随机序列由 seed 与调用顺序确定
+    """
+
+    def __init__(self, config: Optional[MockConfig] = None, model: Optional[str] = None):
+        self.config = config or settings.yaml_config.llm.mock
+        self.model = model or settings.get_model_config("mock").name or "mock"
+        self._lock = threading.Lock()
+        self._call_counts: Dict[Tuple[str, str], int] = {}
+        self._inflight = 0
+        self._by_schema = self._load_replays()
+        self._recorder: Optional[BaseAdapter] = None
+
+    # ---- 录制数据 ----
+    def _load_replays(self) -> Dict[str, str]:
+        replays: Dict[str, str] = {}
+        for pattern in self.config.replay_globs:
+            # 按路径排序，较新的输出目录（时间戳在后）覆盖较旧的
+            for directory in sorted(glob.glob(str(_resolve(pattern)))):
+                for file in sorted(Path(directory).glob("*.md")):
+                    replays[file.stem] = file.read_text(encoding="utf-8")
+        if replays:
+            logger.debug(f"Mock adapter loaded replay outputs for {len(replays)} schemas")
+        return replays
+
+    def _recording_path(self, schema: str, key: str) -> Path:
+        return _resolve(self.config.recordings_dir) / schema / f"{key}.md"
+
+    def _lookup(self, schema: str, key: str) -> str:
+        recorded = self._recording_path(schema, key)
+        if recorded.exists():
+            return recorded.read_text(encoding="utf-8")
+        return self._by_schema.get(schema, FALLBACK_RESPONSE)
+
+    def _record(self, schema: str, key: str, output: str) -> None:
+        path = self._recording_path(schema, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(output, encoding="utf-8")
+        logger.debug(f"Recorded response for schema {schema} -> {path}")
+
+    @property
+    def recorder(self) -> BaseAdapter:
+        if self._recorder is None:
+            from llm_structured_extract.core.adapter_manager import get_adapter
+            # 录制的必须是提供商的真实响应：不叠加重试（外层模拟适配器已有）、对冲与响应缓存
+            self._recorder = get_adapter(self.config.record_provider, with_retry=False)
+        return self._recorder
+
+    # ---- 模拟行为 ----
+    def _sample_latency(self, rng: random.Random) -> float:
+        c = self.config
+        kind = c.latency_distribution.lower()
+        if kind == "constant":
+            value = c.latency_mean
+        elif kind == "uniform":
+            value = rng.uniform(c.latency_min, c.latency_max)
+        elif kind == "normal":
+            value = rng.gauss(c.latency_mean, c.latency_stddev)
+        elif kind == "exponential":
+            value = rng.expovariate(1.0 / c.latency_mean) if c.latency_mean > 0 else 0.0
+        elif kind == "lognormal":
+            # 按目标均值与标准差换算对数正态参数
+            if c.latency_mean <= 0:
+                value = 0.0
+            else:
+                sigma2 = math.log(1 + (c.latency_stddev / c.latency_mean) ** 2)
+                value = rng.lognormvariate(math.log(c.latency_mean) - sigma2 / 2, math.sqrt(sigma2))
+        else:
+            raise ValueError(f"Unsupported mock latency distribution: {c.latency_distribution}")
+        return min(max(value, c.latency_min), c.latency_max)
+
+    def _plan(self, schema: str, key: str) -> _CallPlan:
+        with self._lock:
+            index = self._call_counts.get((schema, key), 0)
+            self._call_counts[(schema, key)] = index + 1
+        # 每次调用的随机数只取决于 (种子, schema, 提示词, 第几次调用)，与并发交错无关
+        rng = random.Random(f"{self.config.seed}:{schema}:{key}:{index}")
+        latency = self._sample_latency(rng)
+        roll = rng.random()
+        error = None
+        if roll < self.config.rate_limit_rate:
+            error = status_error("Mock provider rate limit exceeded", 429)
+        elif roll < self.config.rate_limit_rate + self.config.error_rate:
+            error = status_error("Mock provider internal error", 503)
+        return _CallPlan(latency, error)
+
+    def _enter(self) -> None:
+        with self._lock:
+            if self.config.capacity and self._inflight >= self.config.capacity:
+                raise status_error(f"Mock provider over capacity ({self.config.capacity} in flight)", 429)
+            self._inflight += 1
+
+    def _exit(self) -> None:
+        with self._lock:
+            self._inflight -= 1
+
+    def _chunks(self, output: str) -> List[str]:
+        size = max(1, self.config.stream_chunk_size)
+        return [output[i:i + size] for i in range(0, len(output), size)] or [""]
+
+    def _chunk_delays(self, plan: _CallPlan, count: int) -> List[float]:
+        first = plan.latency * self.config.first_chunk_ratio
+        if count <= 1:
+            return [plan.latency]
+        rest = (plan.latency - first) / (count - 1)
+        return [first] + [rest] * (count - 1)
+
+    def _record_usage(self, prompt: str, output: str, latency: float) -> None:
+        # 模拟调用没有真实计费，按预估 Token 数上报，便于压测时核对用量汇总链路
+        record_usage(
+            "mock",
+            self.model,
+            prompt_tokens=estimate_tokens(settings.get_system_prompt()) + estimate_tokens(prompt),
+            completion_tokens=estimate_tokens(output),
+            latency=latency,
+        )
+
+    # ---- 适配器接口 ----
+    def generate_text(self, prompt: str, context_cache_id: Optional[str] = None) -> str:
+        schema, key = current_schema() or DEFAULT_SCHEMA_KEY, prompt_hash(prompt)
+        if self.config.mode == "record":
+            output = self.recorder.generate_text(prompt, context_cache_id=context_cache_id)
+            self._record(schema, key, output)
+            return output
+
+        plan = self._plan(schema, key)
+        self._enter()
+        try:
+            time.sleep(plan.latency)
+        finally:
+            self._exit()
+        if plan.error:
+            raise plan.error
+        output = self._lookup(schema, key).strip()
+        self._record_usage(prompt, output, plan.latency)
+        return output
+
+    async def agenerate_text(self, prompt: str, context_cache_id: Optional[str] = None) -> str:
+        schema, key = current_schema() or DEFAULT_SCHEMA_KEY, prompt_hash(prompt)
+        if self.config.mode == "record":
+            output = await self.recorder.agenerate_text(prompt, context_cache_id=context_cache_id)
+            await asyncio.to_thread(self._record, schema, key, output)
+            return output
+
+        plan = self._plan(schema, key)
+        self._enter()
+        try:
+            await asyncio.sleep(plan.latency)
+        finally:
+            self._exit()
+        if plan.error:
+            raise plan.error
+        # 回放文件读取放到工作线程，不阻塞事件循环
+        output = (await asyncio.to_thread(self._lookup, schema, key)).strip()
+        self._record_usage(prompt, output, plan.latency)
+        return output
+
+    def stream_text(self, prompt: str, context_cache_id: Optional[str] = None) -> Iterator[str]:
+        schema, key = current_schema() or DEFAULT_SCHEMA_KEY, prompt_hash(prompt)
+        if self.config.mode == "record":
+            yield self.generate_text(prompt, context_cache_id=context_cache_id)
+            return
+
+        plan = self._plan(schema, key)
+        output = self._lookup(schema, key).strip()
+        chunks = self._chunks(output)
+        self._enter()
+        try:
+            for i, (chunk, delay) in enumerate(zip(chunks, self._chunk_delays(plan, len(chunks)))):
+                time.sleep(delay)
+                # 注入的错误在首个分片前抛出
+                if i == 0 and plan.error:
+                    raise plan.error
+                yield chunk
+        finally:
+            self._exit()
+        self._record_usage(prompt, output, plan.latency)
+
+    async def astream_text(self, prompt: str, context_cache_id: Optional[str] = None) -> AsyncIterator[str]:
+        schema, key = current_schema() or DEFAULT_SCHEMA_KEY, prompt_hash(prompt)
+        if self.config.mode == "record":
+            yield await self.agenerate_text(prompt, context_cache_id=context_cache_id)
+            return
+
+        plan = self._plan(schema, key)
+        output = (await asyncio.to_thread(self._lookup, schema, key)).strip()
+        chunks = self._chunks(output)
+        self._enter()
+        try:
+            for i, (chunk, delay) in enumerate(zip(chunks, self._chunk_delays(plan, len(chunks)))):
+                await asyncio.sleep(delay)
+                if i == 0 and plan.error:
+                    raise plan.error
+                yield chunk
+        finally:
+            self._exit()
+        self._record_usage(prompt, output, plan.latency)
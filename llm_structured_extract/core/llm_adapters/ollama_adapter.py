@@ -0,0 +1,252 @@
+# core/llm_adapters/ollama_adapter.py
+import asyncio
+import json
+import threading
+import time
+import weakref
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Tuple
+import httpx
+from llm_structured_extract.core.llm_adapters.base_adapter import BaseAdapter, register_adapter, status_error
+from llm_structured_extract.config.settings import settings
+from llm_structured_extract.core.exceptions import DeadlineExceededError, LLMCallError, TransientLLMError
+from llm_structured_extract.core.deadline import call_timeout, remaining, timeout_error
+from llm_structured_extract.core.usage import record_usage
+from llm_structured_extract.utils.http_pool import get_async_client, get_sync_client
+from llm_structured_extract.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+CHAT_PATH = "/api/chat"
+GENERATE_PATH = "/api/generate"
+
+# 并发闸门按服务地址共享，与 Ollama 服务端的并行槽位数（OLLAMA_NUM_PARALLEL）对齐；
+# 超出槽位的请求在客户端排队，而不是堆积在服务端队列中
+_lock = threading.Lock()
+_sync_slots: Dict[Tuple[str, int], threading.BoundedSemaphore] = {}
+_async_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple[str, int], asyncio.Semaphore]]" = weakref.WeakKeyDictionary()
+
+
+@register_adapter("ollama")
+class OllamaAdapter(BaseAdapter):
+    """本地 Ollama 推理服务适配器，异步路径使用原生流式接口"""
+
+    def __init__(self, model: Optional[str] = None, host: Optional[str] = None):
+        model_config = settings.get_model_config("ollama")
+        self.model = model or model_config.name
+        self.host = (host or settings.OLLAMA_HOST).rstrip("/")
+
+    def _pool_kwargs(self) -> Dict[str, Any]:
+        model_config = settings.get_model_config("ollama")
+        max_connections = model_config.max_concurrency or model_config.max_connections
+        return {
+            "max_connections": max_connections,
+            "max_keepalive_connections": min(model_config.max_keepalive_connections, max_connections),
+            "keepalive_expiry": model_config.keepalive_expiry,
+        }
+
+    def _sync_slot(self) -> Optional[threading.BoundedSemaphore]:
+        slots = settings.get_model_config("ollama").max_concurrency
+        if not slots:
+            return None
+        with _lock:
+            # 按 (地址, 槽位数) 区分，配置变更后使用新的上限
+            return _sync_slots.setdefault((self.host, slots), threading.BoundedSemaphore(slots))
+
+    @staticmethod
+    def _acquire_sync_slot(slot: Optional[threading.BoundedSemaphore]) -> None:
+        """占用并行槽位，等待不超过调用方剩余截止时间"""
+        if not slot:
+            return
+        left = remaining()
+        if not slot.acquire(timeout=None if left is None else max(left, 0.0)):
+            raise DeadlineExceededError("Deadline exceeded while waiting for an Ollama parallel slot")
+
+    def _async_slot(self) -> Optional[asyncio.Semaphore]:
+        slots = settings.get_model_config("ollama").max_concurrency
+        if not slots:
+            return None
+        loop = asyncio.get_running_loop()
+        with _lock:
+            return _async_slots.setdefault(loop, {}).setdefault((self.host, slots), asyncio.Semaphore(slots))
+
+    def _prepare_params(self, prompt: str, stream: bool, context_cache_id: Optional[str] = None) -> Dict[str, Any]:
+        """准备 API 调用参数"""
+        model_config = settings.get_model_config("ollama")
+        if context_cache_id:
+            logger.debug("Ollama adapter ignores context_cache_id; the server reuses KV cache for loaded models")
+
+        params = {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": settings.get_system_prompt()},
+                {"role": "user", "content": prompt},
+            ],
+            "stream": stream,
+            "options": {
+                "temperature": model_config.temperature,
+                "num_predict": model_config.max_tokens,
+            },
+        }
+        if model_config.keep_alive is not None:
+            # 让模型在请求间保持加载，避免冷启动
+            params["keep_alive"] = model_config.keep_alive
+        return params
+
+    def warmup(self) -> None:
+        """预加载模型：不带 prompt 的 generate 请求会让服务端加载模型并按 keep_alive 驻留"""
+        model_config = settings.get_model_config("ollama")
+        payload: Dict[str, Any] = {"model": self.model}
+        if model_config.keep_alive is not None:
+            payload["keep_alive"] = model_config.keep_alive
+        client = get_sync_client(self.host, **self._pool_kwargs())
+        try:
+            resp = client.post(GENERATE_PATH, json=payload, timeout=call_timeout(model_config.timeout))
+        except httpx.HTTPError as e:
+            raise LLMCallError(f"Ollama warmup failed: {str(e)}") from e
+        if resp.status_code != 200:
+            raise LLMCallError(f"Ollama warmup failed with status {resp.status_code}: {self._error_message(resp)}")
+        logger.info(f"Ollama model {self.model} loaded on {self.host}")
+
+    @staticmethod
+    def _error_message(resp: httpx.Response) -> str:
+        try:
+            return resp.json().get("error", "")
+        except ValueError:
+            return resp.text
+
+    def _record_usage(self, data: Optional[Dict[str, Any]], started: float) -> None:
+        """上报用量：取自最终响应的 prompt_eval_count / eval_count（本地推理不计缓存 Token）"""
+        if not data:
+            return
+        record_usage(
+            "ollama",
+            self.model,
+            prompt_tokens=data.get("prompt_eval_count"),
+            completion_tokens=data.get("eval_count"),
+            latency=time.perf_counter() - started,
+        )
+
+    def _finalize(self, content: str, is_async: bool = False) -> str:
+        if not content:
+            raise LLMCallError("LLM returned empty response")
+        mode = "Async" if is_async else "Sync"
+        logger.debug(f"LLM Raw {mode} Response from {self.model}:\n{content}")
+        return content.strip()
+
+    def generate_text(self, prompt: str, context_cache_id: Optional[str] = None) -> str:
+        """生成纯净 Markdown 响应"""
+        model_config = settings.get_model_config("ollama")
+        params = self._prepare_params(prompt, stream=False, context_cache_id=context_cache_id)
+        client = get_sync_client(self.host, **self._pool_kwargs())
+        slot = self._sync_slot()
+
+        self._acquire_sync_slot(slot)
+        started = time.perf_counter()
+        try:
+            resp = client.post(CHAT_PATH, json=params, timeout=call_timeout(model_config.timeout))
+        except httpx.TimeoutException as e:
+            raise timeout_error(f"Ollama API call timed out: {str(e)}") from e
+        except httpx.TransportError as e:
+            raise TransientLLMError(f"Ollama API call failed: {str(e)}") from e
+        except httpx.HTTPError as e:
+            raise LLMCallError(f"Ollama API call failed: {str(e)}") from e
+        finally:
+            if slot:
+                slot.release()
+
+        if resp.status_code != 200:
+            raise status_error(f"Ollama API failed with status {resp.status_code}: {self._error_message(resp)}", resp.status_code)
+        try:
+            data = resp.json()
+            content = data["message"]["content"]
+        except (ValueError, KeyError, TypeError) as e:
+            raise LLMCallError(f"Ollama API response format error: {str(e)}") from e
+        content = self._finalize(content)
+        self._record_usage(data, started)
+        return content
+
+    async def agenerate_text(self, prompt: str, context_cache_id: Optional[str] = None) -> str:
+        """异步生成纯净 Markdown 响应（基于 NDJSON 流式输出拼接）"""
+        parts = [chunk async for chunk in self.astream_text(prompt, context_cache_id=context_cache_id)]
+        return self._finalize("".join(parts), is_async=True)
+
+    @staticmethod
+    def _parse_line(line: str) -> Optional[Dict[str, Any]]:
+        if not line.strip():
+            return None
+        try:
+            chunk = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise LLMCallError(f"Ollama API response format error: {str(e)}") from e
+        if chunk.get("error"):
+            raise LLMCallError(f"Ollama API stream error: {chunk['error']}")
+        return chunk
+
+    @staticmethod
+    def _wrap_http_error(e: httpx.HTTPError) -> LLMCallError:
+        if isinstance(e, httpx.TimeoutException):
+            return timeout_error(f"Ollama API call timed out: {str(e)}")
+        if isinstance(e, httpx.TransportError):
+            return TransientLLMError(f"Ollama API call failed: {str(e)}")
+        return LLMCallError(f"Ollama API call failed: {str(e)}")
+
+    def stream_text(self, prompt: str, context_cache_id: Optional[str] = None) -> Iterator[str]:
+        """流式生成：逐行读取 NDJSON，产出增量文本"""
+        model_config = settings.get_model_config("ollama")
+        params = self._prepare_params(prompt, stream=True, context_cache_id=context_cache_id)
+        client = get_sync_client(self.host, **self._pool_kwargs())
+        slot = self._sync_slot()
+
+        self._acquire_sync_slot(slot)
+        started = time.perf_counter()
+        try:
+            with client.stream("POST", CHAT_PATH, json=params, timeout=call_timeout(model_config.timeout)) as resp:
+                if resp.status_code != 200:
+                    resp.read()
+                    raise status_error(f"Ollama API failed with status {resp.status_code}: {self._error_message(resp)}", resp.status_code)
+                for line in resp.iter_lines():
+                    chunk = self._parse_line(line)
+                    if chunk is None:
+                        continue
+                    delta = chunk.get("message", {}).get("content", "")
+                    if delta:
+                        yield delta
+                    if chunk.get("done"):
+                        self._record_usage(chunk, started)
+                        break
+        except httpx.HTTPError as e:
+            raise self._wrap_http_error(e) from e
+        finally:
+            if slot:
+                slot.release()
+
+    async def astream_text(self, prompt: str, context_cache_id: Optional[str] = None) -> AsyncIterator[str]:
+        """异步流式生成：在并行槽位内逐行读取 NDJSON，产出增量文本"""
+        model_config = settings.get_model_config("ollama")
+        params = self._prepare_params(prompt, stream=True, context_cache_id=context_cache_id)
+        client = get_async_client(self.host, **self._pool_kwargs())
+        slot = self._async_slot()
+
+        if slot:
+            await slot.acquire()
+        started = time.perf_counter()
+        try:
+            async with client.stream("POST", CHAT_PATH, json=params, timeout=call_timeout(model_config.timeout)) as resp:
+                if resp.status_code != 200:
+                    await resp.aread()
+                    raise status_error(f"Ollama API failed with status {resp.status_code}: {self._error_message(resp)}", resp.status_code)
+                async for line in resp.aiter_lines():
+                    chunk = self._parse_line(line)
+                    if chunk is None:
+                        continue
+                    delta = chunk.get("message", {}).get("content", "")
+                    if delta:
+                        yield delta
+                    if chunk.get("done"):
+                        self._record_usage(chunk, started)
+                        break
+        except httpx.HTTPError as e:
+            raise self._wrap_http_error(e) from e
+        finally:
+            if slot:
+                slot.release()
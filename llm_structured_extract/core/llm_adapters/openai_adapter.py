@@ -0,0 +1,228 @@
+# core/llm_adapters/openai_adapter.py
+import asyncio
+import ipaddress
+import os
+import threading
+import time
+import weakref
+from typing import AsyncIterator, Dict, Iterator, Optional, Tuple
+from urllib.parse import urlparse
+import openai
+from llm_structured_extract.core.llm_adapters.base_adapter import BaseAdapter, register_adapter, status_error
+from llm_structured_extract.config.settings import settings
+from llm_structured_extract.core.exceptions import ConfigurationError, LLMCallError, TransientLLMError
+from llm_structured_extract.core.deadline import call_timeout, timeout_error
+from llm_structured_extract.core.usage import record_usage, usage_field
+from llm_structured_extract.utils.http_pool import get_async_client, get_sync_client
+from llm_structured_extract.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 本地 OpenAI 兼容服务（vLLM 等）通常不校验 Key，但 SDK 要求非空
+LOCAL_PLACEHOLDER_API_KEY = "EMPTY"
+
+DEFAULT_OPENAI_BASE_URL = "https://api.openai.com/v1"
+
+# 流式响应的最后一个分片携带整次调用的用量（choices 为空）
+STREAM_OPTIONS = {"include_usage": True}
+
+_LOCAL_HOSTNAMES = {"localhost", "host.docker.internal"}
+
+# SDK 客户端按 (base_url, api_key, 超时, 连接池参数) 进程内共享；异步客户端额外按事件循环隔离。
+# 同时记录构建时传入的 http_client：共享连接池被关闭重建后随之重建 SDK 客户端
+_ClientKey = Tuple[str, str, float, Tuple]
+
+_clients_lock = threading.Lock()
+_sync_clients: Dict[_ClientKey, Tuple[object, openai.OpenAI]] = {}
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[_ClientKey, Tuple[object, openai.AsyncOpenAI]]]" = weakref.WeakKeyDictionary()
+
+
+def _is_local(base_url: Optional[str]) -> bool:
+    """base_url 是否明确指向本机或内网服务（仅此时允许使用占位 Key）"""
+    if not base_url:
+        return False
+    host = (urlparse(base_url).hostname or "").lower()
+    if host in _LOCAL_HOSTNAMES or host.endswith(".localhost") or host.endswith(".local"):
+        return True
+    try:
+        addr = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return addr.is_loopback or addr.is_private
+
+
+@register_adapter("openai")
+class OpenAIAdapter(BaseAdapter):
+    """
+    OpenAI 兼容协议适配器。
+    通过 base_url 可指向 OpenAI、vLLM / 本地兼容服务，或 DashScope 兼容模式。
+    """
+
+    def __init__(self, model: Optional[str] = None, api_key: Optional[str] = None, base_url: Optional[str] = None):
+        model_config = settings.get_model_config("openai")
+        self.base_url = base_url or settings.OPENAI_BASE_URL or model_config.base_url or None
+
+        key = api_key or settings.OPENAI_API_KEY or os.getenv("OPENAI_API_KEY", "")
+        if not key:
+            if not _is_local(self.base_url):
+                raise ConfigurationError("OpenAI API key is required. Set OPENAI_API_KEY in env or settings.")
+            key = LOCAL_PLACEHOLDER_API_KEY
+        self.api_key = key
+        self.model = model or model_config.name
+
+    def _pool_kwargs(self):
+        model_config = settings.get_model_config("openai")
+        return dict(
+            base_url=self.base_url or DEFAULT_OPENAI_BASE_URL,
+            max_connections=model_config.max_connections,
+            max_keepalive_connections=model_config.max_keepalive_connections,
+            keepalive_expiry=model_config.keepalive_expiry,
+        )
+
+    def _client_key(self, pool_kwargs) -> _ClientKey:
+        timeout = settings.get_model_config("openai").timeout
+        return (self.base_url or "", self.api_key, timeout, tuple(sorted(pool_kwargs.items())))
+
+    def _build_client(self, client_cls, http_client):
+        return client_cls(
+            api_key=self.api_key,
+            base_url=self.base_url,
+            timeout=settings.get_model_config("openai").timeout,
+            # 重试由 core/retry.py 统一负责，避免 SDK 内置重试叠加放大流量
+            max_retries=0,
+            http_client=http_client,
+        )
+
+    def _get_client(self) -> openai.OpenAI:
+        """获取进程内共享的同步客户端，底层连接复用 utils/http_pool 的共享连接池"""
+        pool_kwargs = self._pool_kwargs()
+        http_client = get_sync_client(**pool_kwargs)
+        key = self._client_key(pool_kwargs)
+        with _clients_lock:
+            cached = _sync_clients.get(key)
+            if cached is None or cached[0] is not http_client:
+                cached = _sync_clients[key] = (http_client, self._build_client(openai.OpenAI, http_client))
+            return cached[1]
+
+    def _get_async_client(self) -> openai.AsyncOpenAI:
+        """获取当前事件循环内共享的异步客户端，底层连接复用共享连接池"""
+        pool_kwargs = self._pool_kwargs()
+        http_client = get_async_client(**pool_kwargs)
+        key = self._client_key(pool_kwargs)
+        with _clients_lock:
+            clients = _async_clients.setdefault(asyncio.get_running_loop(), {})
+            cached = clients.get(key)
+            if cached is None or cached[0] is not http_client:
+                cached = clients[key] = (http_client, self._build_client(openai.AsyncOpenAI, http_client))
+            return cached[1]
+
+    def _prepare_params(self, prompt: str, context_cache_id: Optional[str] = None):
+        """准备 API 调用参数"""
+        model_config = settings.get_model_config("openai")
+        if context_cache_id:
+            logger.debug("OpenAI-compatible adapter ignores context_cache_id; relying on server-side prefix caching")
+
+        return {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": settings.get_system_prompt()},
+                {"role": "user", "content": prompt},
+            ],
+            "temperature": model_config.temperature,
+            "max_tokens": model_config.max_tokens,
+            # 单次请求超时不超过调用方剩余的截止时间
+            "timeout": call_timeout(model_config.timeout),
+        }
+
+    def _process_response(self, resp, is_async=False) -> str:
+        """统一处理 API 响应"""
+        try:
+            content = resp.choices[0].message.content
+        except (AttributeError, IndexError) as e:
+            raise LLMCallError(f"OpenAI-compatible API response format error: {str(e)}") from e
+        if not content:
+            raise LLMCallError("LLM returned empty response")
+
+        mode = "Async" if is_async else "Sync"
+        logger.debug(f"LLM Raw {mode} Response from {self.model}:\n{content}")
+        return content.strip()
+
+    def _record_usage(self, usage, started: float) -> None:
+        """上报用量：prompt_tokens 已包含服务端前缀缓存命中的 cached_tokens"""
+        if usage is None:
+            return
+        record_usage(
+            "openai",
+            self.model,
+            prompt_tokens=usage_field(usage, "prompt_tokens"),
+            completion_tokens=usage_field(usage, "completion_tokens"),
+            cached_tokens=usage_field(usage_field(usage, "prompt_tokens_details"), "cached_tokens"),
+            latency=time.perf_counter() - started,
+        )
+
+    @staticmethod
+    def _wrap_error(e: openai.OpenAIError) -> LLMCallError:
+        if isinstance(e, openai.APIStatusError):
+            return status_error(f"OpenAI-compatible API failed with status {e.status_code}: {e.message}", e.status_code)
+        if isinstance(e, openai.APITimeoutError):
+            return timeout_error(f"OpenAI-compatible API call timed out: {str(e)}")
+        if isinstance(e, openai.APIConnectionError):
+            return TransientLLMError(f"OpenAI-compatible API call failed: {str(e)}")
+        return LLMCallError(f"OpenAI-compatible API call failed: {str(e)}")
+
+    def generate_text(self, prompt: str, context_cache_id: Optional[str] = None) -> str:
+        """生成纯净 Markdown 响应"""
+        params = self._prepare_params(prompt, context_cache_id=context_cache_id)
+        started = time.perf_counter()
+        try:
+            resp = self._get_client().chat.completions.create(**params)
+        except openai.OpenAIError as e:
+            raise self._wrap_error(e) from e
+        content = self._process_response(resp)
+        self._record_usage(resp.usage, started)
+        return content
+
+    async def agenerate_text(self, prompt: str, context_cache_id: Optional[str] = None) -> str:
+        """异步生成纯净 Markdown 响应"""
+        params = self._prepare_params(prompt, context_cache_id=context_cache_id)
+        started = time.perf_counter()
+        try:
+            resp = await self._get_async_client().chat.completions.create(**params)
+        except openai.OpenAIError as e:
+            raise self._wrap_error(e) from e
+        content = self._process_response(resp, is_async=True)
+        self._record_usage(resp.usage, started)
+        return content
+
+    @staticmethod
+    def _delta(chunk) -> str:
+        if not chunk.choices:
+            return ""
+        return chunk.choices[0].delta.content or ""
+
+    def stream_text(self, prompt: str, context_cache_id: Optional[str] = None) -> Iterator[str]:
+        """流式生成，逐段产出增量文本"""
+        params = self._prepare_params(prompt, context_cache_id=context_cache_id)
+        started = time.perf_counter()
+        try:
+            for chunk in self._get_client().chat.completions.create(**params, stream=True, stream_options=STREAM_OPTIONS):
+                delta = self._delta(chunk)
+                if delta:
+                    yield delta
+                self._record_usage(getattr(chunk, "usage", None), started)
+        except openai.OpenAIError as e:
+            raise self._wrap_error(e) from e
+
+    async def astream_text(self, prompt: str, context_cache_id: Optional[str] = None) -> AsyncIterator[str]:
+        """异步流式生成，逐段产出增量文本"""
+        params = self._prepare_params(prompt, context_cache_id=context_cache_id)
+        started = time.perf_counter()
+        try:
+            stream = await self._get_async_client().chat.completions.create(**params, stream=True, stream_options=STREAM_OPTIONS)
+            async for chunk in stream:
+                delta = self._delta(chunk)
+                if delta:
+                    yield delta
+                self._record_usage(getattr(chunk, "usage", None), started)
+        except openai.OpenAIError as e:
+            raise self._wrap_error(e) from e
@@ -79,6 +79,16 @@ def _extract_specs(model: Type[BaseModel], prefix: str = "", level: int = 0) ->
             lines.extend(_extract_specs(unwrapped_type, path, level + 1))
     return lines
 
+def count_fields(model: Type[BaseModel]) -> int:
+    """计算总字段数（包括嵌套的）"""
+    count = 0
+    for f in model.model_fields.values():
+        count += 1
+        ut, _ = _unwrap_annotation(f.annotation)
+        if hasattr(ut, "model_fields"):
+            count += count_fields(ut)
+    return count
+
 def build_prompt(
     text: str, 
     model_cls: Type[BaseModel],
@@ -95,16 +105,6 @@ def build_prompt(
     specs_list = _extract_specs(model_cls)
     field_specs = "\n".join(specs_list)
     
-    # 计算总字段数（包括嵌套的）
-    def count_fields(m):
-        count = 0
-        for f in m.model_fields.values():
-            count += 1
-            ut, _ = _unwrap_annotation(f.annotation)
-            if hasattr(ut, "model_fields"):
-                count += count_fields(ut)
-        return count
-    
     total_fields = count_fields(model_cls)
     
     try:
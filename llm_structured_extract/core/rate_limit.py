@@ -0,0 +1,161 @@
+# llm_structured_extract/core/rate_limit.py
+import asyncio
+import threading
+import time
+from contextlib import aclosing
+from typing import AsyncIterator, Dict, Iterator, Optional, Tuple
+from llm_structured_extract.config.settings import settings
+from llm_structured_extract.core.deadline import remaining
+from llm_structured_extract.core.exceptions import DeadlineExceededError
+from llm_structured_extract.core.llm_adapters.base_adapter import AdapterWrapper, BaseAdapter
+from llm_structured_extract.utils.logger import get_logger
+from llm_structured_extract.utils.tokens import estimate_tokens
+
+logger = get_logger(__name__)
+
+
+class TokenBucket:
+    """
+    预约式令牌桶：预约时立即扣减（允许透支），返回需要等待的秒数。
+    透支量决定后续请求的等待时间，从而让调用按到达顺序排队而不是失败。
+    """
+
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self._tokens = capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.refill_per_second)
+        self._updated = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        # 单次需求超过桶容量时按容量计，避免永远无法满足
+        amount = min(amount, self.capacity)
+        self._refill(now)
+        self._tokens -= amount
+        if self._tokens >= 0:
+            return 0.0
+        return -self._tokens / self.refill_per_second
+
+    def refund(self, amount: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + min(amount, self.capacity))
+
+
+class RateLimiter:
+    """按每分钟请求数（RPM）与每分钟 Token 数（TPM）双维度限流，线程与协程共用"""
+
+    def __init__(self, rpm: Optional[int] = None, tpm: Optional[int] = None):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._requests = TokenBucket(rpm, rpm / 60.0) if rpm else None
+        self._tokens = TokenBucket(tpm, tpm / 60.0) if tpm else None
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: int) -> float:
+        """预约一次调用的配额，返回需要等待的秒数"""
+        with self._lock:
+            now = time.monotonic()
+            wait = 0.0
+            if self._requests:
+                wait = max(wait, self._requests.reserve(1, now))
+            if self._tokens:
+                wait = max(wait, self._tokens.reserve(tokens, now))
+            return wait
+
+    def refund(self, tokens: int) -> None:
+        """归还未实际使用的配额（如排队期间被取消）"""
+        with self._lock:
+            if self._requests:
+                self._requests.refund(1)
+            if self._tokens:
+                self._tokens.refund(tokens)
+
+    def _reserve_within(self, tokens: int, max_wait: Optional[float]) -> Optional[float]:
+        wait = self.reserve(tokens)
+        if max_wait is not None and wait > max_wait:
+            self.refund(tokens)
+            return None
+        return wait
+
+    def acquire(self, tokens: int, max_wait: Optional[float] = None) -> Optional[float]:
+        """申请配额并等待，返回等待秒数；需要等待超过 max_wait 时立即归还配额并返回 None"""
+        wait = self._reserve_within(tokens, max_wait)
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    async def aacquire(self, tokens: int, max_wait: Optional[float] = None) -> Optional[float]:
+        wait = self._reserve_within(tokens, max_wait)
+        if wait:
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                self.refund(tokens)
+                raise
+        return wait
+
+
+_lock = threading.Lock()
+_LIMITERS: Dict[Tuple[str, str, Optional[int], Optional[int]], RateLimiter] = {}
+
+
+def get_rate_limiter(provider: str, model: str) -> Optional[RateLimiter]:
+    """获取 (提供商, 模型) 维度进程内共享的限流器；未配置 rpm / tpm 时返回 None"""
+    model_config = settings.get_model_config(provider)
+    if not model_config.rpm and not model_config.tpm:
+        return None
+    key = (provider, model, model_config.rpm, model_config.tpm)
+    with _lock:
+        limiter = _LIMITERS.get(key)
+        if limiter is None:
+            limiter = RateLimiter(model_config.rpm, model_config.tpm)
+            _LIMITERS[key] = limiter
+        return limiter
+
+
+class RateLimitedAdapter(AdapterWrapper):
+    """调用前按预估 Token（提示词 + max_tokens）申请配额，超出配额时排队等待"""
+
+    def __init__(self, inner: BaseAdapter, provider: str, limiter: Optional[RateLimiter] = None):
+        super().__init__(inner)
+        self.provider = provider
+        self.limiter = limiter or get_rate_limiter(provider, getattr(inner, "model", "") or "")
+
+    def _estimate(self, prompt: str) -> int:
+        model_config = settings.get_model_config(self.provider)
+        return estimate_tokens(settings.get_system_prompt()) + estimate_tokens(prompt) + model_config.max_tokens
+
+    def _on_acquired(self, waited: Optional[float]) -> None:
+        if waited is None:
+            # 排队时长会超过调用方截止时间：直接放弃，不占用配额
+            raise DeadlineExceededError(f"Rate limit wait on {self.provider} exceeds remaining deadline")
+        if waited:
+            logger.debug(f"Rate limited on {self.provider}, waited {waited:.2f}s")
+
+    def _acquire(self, prompt: str) -> None:
+        if self.limiter:
+            self._on_acquired(self.limiter.acquire(self._estimate(prompt), max_wait=remaining()))
+
+    async def _aacquire(self, prompt: str) -> None:
+        if self.limiter:
+            self._on_acquired(await self.limiter.aacquire(self._estimate(prompt), max_wait=remaining()))
+
+    def generate_text(self, prompt: str, context_cache_id: Optional[str] = None) -> str:
+        self._acquire(prompt)
+        return self.inner.generate_text(prompt, context_cache_id=context_cache_id)
+
+    async def agenerate_text(self, prompt: str, context_cache_id: Optional[str] = None) -> str:
+        await self._aacquire(prompt)
+        return await self.inner.agenerate_text(prompt, context_cache_id=context_cache_id)
+
+    def stream_text(self, prompt: str, context_cache_id: Optional[str] = None) -> Iterator[str]:
+        self._acquire(prompt)
+        yield from super().stream_text(prompt, context_cache_id=context_cache_id)
+
+    async def astream_text(self, prompt: str, context_cache_id: Optional[str] = None) -> AsyncIterator[str]:
+        await self._aacquire(prompt)
+        async with aclosing(super().astream_text(prompt, context_cache_id=context_cache_id)) as chunks:
+            async for chunk in chunks:
+                yield chunk
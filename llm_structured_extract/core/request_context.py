@@ -0,0 +1,29 @@
+# llm_structured_extract/core/request_context.py
+from contextlib import contextmanager
+from contextvars import ContextVar
+from types import MappingProxyType
+from typing import Any, Iterator, Mapping, Optional
+
+# 当前调用的请求元数据（如 schema 名称），通过 contextvars 随协程 / 任务传递到适配器层，
+# 供按 schema 统计延迟、成本等横切逻辑使用，而无需改动适配器接口签名
+_context: ContextVar[Mapping[str, Any]] = ContextVar("llm_request_context", default=MappingProxyType({}))
+
+
+def get_request_value(key: str, default: Any = None) -> Any:
+    return _context.get().get(key, default)
+
+
+def current_schema() -> Optional[str]:
+    """当前调用对应的 schema 名称"""
+    return get_request_value("schema")
+
+
+@contextmanager
+def request_scope(**values: Any) -> Iterator[Mapping[str, Any]]:
+    """在当前上下文内追加请求元数据，值为 None 的键沿用外层设置"""
+    merged = {**_context.get(), **{k: v for k, v in values.items() if v is not None}}
+    token = _context.set(MappingProxyType(merged))
+    try:
+        yield _context.get()
+    finally:
+        _context.reset(token)
@@ -0,0 +1,276 @@
+# llm_structured_extract/core/response_cache.py
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import aclosing, closing
+from pathlib import Path
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+from llm_structured_extract.config.settings import ResponseCacheConfig, settings
+from llm_structured_extract.core.llm_adapters.base_adapter import AdapterWrapper, BaseAdapter
+from llm_structured_extract.utils.logger import get_logger
+from llm_structured_extract.utils.metrics import metrics
+
+logger = get_logger(__name__)
+
+
+def response_cache_key(model: str, temperature: float, max_tokens: int, system_prompt: str, prompt: str) -> str:
+    """响应指纹：模型、生成参数、系统提示词与提示词任一变化都会产生新的键"""
+    payload = json.dumps(
+        [model, temperature, max_tokens, system_prompt, prompt],
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _size(value: str) -> int:
+    return len(value.encode("utf-8"))
+
+
+class MemoryCacheTier:
+    """进程内 LRU 缓存，按总字节数淘汰最久未访问的条目"""
+
+    def __init__(self, max_bytes: int, ttl_seconds: Optional[float] = None):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[str, Optional[float]]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, expires_at: Optional[float] = None) -> None:
+        size = _size(value)
+        if size > self.max_bytes:
+            return
+        if expires_at is None and self.ttl_seconds:
+            expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, expires_at)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: str) -> None:
+        value, _ = self._entries.pop(key)
+        self._bytes -= _size(value)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+
+class SQLiteCacheTier:
+    """SQLite 磁盘缓存，跨进程与多次运行复用；按总字节数淘汰最久未访问的条目"""
+
+    def __init__(self, path: str, max_bytes: int, ttl_seconds: Optional[float] = None):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL,"
+                " created_at REAL NOT NULL, expires_at REAL, last_access REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses(last_access)")
+
+    def get(self, key: str) -> Optional[Tuple[str, Optional[float]]]:
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT value, expires_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            value, expires_at = row
+            if expires_at is not None and expires_at <= now:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            return value, expires_at
+
+    def set(self, key: str, value: str) -> Optional[float]:
+        size = _size(value)
+        if size > self.max_bytes:
+            return None
+        now = time.time()
+        expires_at = now + self.ttl_seconds if self.ttl_seconds else None
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created_at, expires_at, last_access)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (key, value, size, now, expires_at, now),
+            )
+            self._evict(now)
+        return expires_at
+
+    def _evict(self, now: float) -> None:
+        self._conn.execute("DELETE FROM responses WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = 0
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY last_access").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            evicted += 1
+        logger.debug(f"Response cache evicted {evicted} entries from {self.path}")
+
+    @property
+    def size_bytes(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class ResponseCache:
+    """两级响应缓存：先查内存层，未命中再查磁盘层并回填内存层"""
+
+    def __init__(self, memory: MemoryCacheTier, disk: Optional[SQLiteCacheTier] = None):
+        self.memory = memory
+        self.disk = disk
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.memory.get(key)
+        if value is not None:
+            metrics.inc("llm_response_cache_hits_total", tier="memory")
+            return value
+        if self.disk is not None:
+            entry = self.disk.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                self.memory.set(key, value, expires_at=expires_at)
+                metrics.inc("llm_response_cache_hits_total", tier="disk")
+                return value
+        metrics.inc("llm_response_cache_misses_total")
+        return None
+
+    def set(self, key: str, value: str) -> None:
+        expires_at = self.disk.set(key, value) if self.disk is not None else None
+        self.memory.set(key, value, expires_at=expires_at)
+
+    async def aget(self, key: str) -> Optional[str]:
+        # 内存命中无需切换线程；磁盘查询放到工作线程，避免阻塞事件循环
+        value = self.memory.get(key)
+        if value is not None:
+            metrics.inc("llm_response_cache_hits_total", tier="memory")
+            return value
+        if self.disk is None:
+            metrics.inc("llm_response_cache_misses_total")
+            return None
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key: str, value: str) -> None:
+        if self.disk is None:
+            self.set(key, value)
+        else:
+            await asyncio.to_thread(self.set, key, value)
+
+
+_lock = threading.Lock()
+_CACHES: Dict[Optional[str], ResponseCache] = {}
+
+
+def get_response_cache(config: Optional[ResponseCacheConfig] = None) -> ResponseCache:
+    """获取按磁盘路径共享的进程级响应缓存"""
+    config = config or settings.response_cache_config
+    path = str(Path(config.path) if Path(config.path).is_absolute() else settings.PROJECT_ROOT / config.path) if config.path else None
+    with _lock:
+        cache = _CACHES.get(path)
+        if cache is None:
+            memory = MemoryCacheTier(config.memory_max_bytes, config.ttl_seconds)
+            disk = SQLiteCacheTier(path, config.disk_max_bytes, config.ttl_seconds) if path else None
+            cache = _CACHES[path] = ResponseCache(memory, disk)
+    return cache
+
+
+class CachingAdapter(AdapterWrapper):
+    """
+    响应缓存层：以 (模型, temperature, max_tokens, 系统提示词, 提示词) 的指纹为键，
+    命中时直接返回历史响应，不再调用服务商；上下文缓存 ID 只影响计费，不参与指纹。
+    """
+
+    def __init__(self, inner: BaseAdapter, provider: str, cache: Optional[ResponseCache] = None):
+        super().__init__(inner)
+        self.provider = provider
+        self.cache = cache or get_response_cache()
+
+    def _key(self, prompt: str) -> str:
+        model_config = settings.get_model_config(self.provider)
+        model = getattr(self.inner, "model", "") or model_config.name
+        return response_cache_key(
+            f"{self.provider}:{model}",
+            model_config.temperature,
+            model_config.max_tokens,
+            settings.get_system_prompt(),
+            prompt,
+        )
+
+    def generate_text(self, prompt: str, context_cache_id: Optional[str] = None) -> str:
+        key = self._key(prompt)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        result = self.inner.generate_text(prompt, context_cache_id=context_cache_id)
+        self.cache.set(key, result)
+        return result
+
+    async def agenerate_text(self, prompt: str, context_cache_id: Optional[str] = None) -> str:
+        key = self._key(prompt)
+        cached = await self.cache.aget(key)
+        if cached is not None:
+            return cached
+        result = await self.inner.agenerate_text(prompt, context_cache_id=context_cache_id)
+        await self.cache.aset(key, result)
+        return result
+
+    def stream_text(self, prompt: str, context_cache_id: Optional[str] = None) -> Iterator[str]:
+        key = self._key(prompt)
+        cached = self.cache.get(key)
+        if cached is not None:
+            yield cached
+            return
+        parts: List[str] = []
+        with closing(super().stream_text(prompt, context_cache_id=context_cache_id)) as chunks:
+            for chunk in chunks:
+                parts.append(chunk)
+                yield chunk
+        # 只缓存完整结束的流
+        self.cache.set(key, "".join(parts).strip())
+
+    async def astream_text(self, prompt: str, context_cache_id: Optional[str] = None) -> AsyncIterator[str]:
+        key = self._key(prompt)
+        cached = await self.cache.aget(key)
+        if cached is not None:
+            yield cached
+            return
+        parts: List[str] = []
+        async with aclosing(super().astream_text(prompt, context_cache_id=context_cache_id)) as chunks:
+            async for chunk in chunks:
+                parts.append(chunk)
+                yield chunk
+        await self.cache.aset(key, "".join(parts).strip())
@@ -0,0 +1,186 @@
+# llm_structured_extract/core/retry.py
+import asyncio
+import random
+import threading
+import time
+from contextlib import aclosing, closing
+from typing import AsyncIterator, Iterator, Optional
+import httpx
+from tenacity import AsyncRetrying, Retrying, RetryCallState, stop_after_attempt
+from llm_structured_extract.config.settings import RetryConfig, settings
+from llm_structured_extract.core.deadline import expired, remaining
+from llm_structured_extract.core.exceptions import TransientLLMError
+from llm_structured_extract.core.llm_adapters.base_adapter import AdapterWrapper, BaseAdapter
+from llm_structured_extract.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """错误分类：限流、5xx、网络中断与超时可重试，其余（鉴权、参数、解析错误等）直接失败"""
+    return isinstance(exc, (
+        TransientLLMError,
+        httpx.TransportError,
+        ConnectionError,
+        TimeoutError,
+        asyncio.TimeoutError,
+    ))
+
+
+class RetryBudget:
+    """
+    全局重试预算（令牌桶）。
+    每个请求存入 ratio 个令牌、每秒保底补充 min_per_second 个，每次重试消耗 1 个；
+    令牌耗尽时放弃重试，使限流风暴期间的重试流量被限制在请求量的固定比例内。
+    """
+
+    def __init__(self, ratio: float = 0.2, min_per_second: float = 1.0, max_tokens: float = 20.0):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.max_tokens, self._tokens + (now - self._updated) * self.min_per_second)
+        self._updated = now
+
+    def record_request(self) -> None:
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return True
+            return False
+
+    @property
+    def available(self) -> float:
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+
+_budget_lock = threading.Lock()
+_global_budget: Optional[RetryBudget] = None
+
+
+def get_retry_budget() -> RetryBudget:
+    """获取进程级共享的全局重试预算"""
+    global _global_budget
+    with _budget_lock:
+        if _global_budget is None:
+            config = settings.retry_config
+            _global_budget = RetryBudget(config.budget_ratio, config.budget_min_per_second, config.budget_max_tokens)
+        return _global_budget
+
+
+class RetryingAdapter(AdapterWrapper):
+    """为内部适配器叠加重试策略：错误分类 + 指数退避全抖动 + 单请求与全局重试预算"""
+
+    def __init__(self, inner: BaseAdapter, config: Optional[RetryConfig] = None, budget: Optional[RetryBudget] = None):
+        super().__init__(inner)
+        self.config = config or settings.retry_config
+        self.budget = budget or get_retry_budget()
+
+    def _can_retry(self, exc: Optional[BaseException], attempt_number: int) -> bool:
+        if exc is None or not is_retryable(exc):
+            return False
+        # 单请求预算在此处判断，避免在最后一次失败后仍消耗全局预算
+        if attempt_number >= self.config.max_attempts:
+            return False
+        if expired():
+            return False
+        if not self.budget.try_acquire():
+            logger.warning(f"Global retry budget exhausted, giving up after attempt {attempt_number}: {exc}")
+            return False
+        return True
+
+    def _should_retry(self, retry_state: RetryCallState) -> bool:
+        return self._can_retry(retry_state.outcome.exception(), retry_state.attempt_number)
+
+    def _backoff(self, attempt_number: int) -> float:
+        """指数退避全抖动（同 tenacity.wait_random_exponential），且不超过剩余截止时间"""
+        high = min(self.config.max_backoff, self.config.initial_backoff * 2 ** (attempt_number - 1))
+        delay = random.uniform(0, high)
+        left = remaining()
+        if left is not None:
+            delay = min(delay, max(left, 0.0))
+        return delay
+
+    def _wait(self, retry_state: RetryCallState) -> float:
+        return self._backoff(retry_state.attempt_number)
+
+    @staticmethod
+    def _log_retry(retry_state: RetryCallState) -> None:
+        exc = retry_state.outcome.exception()
+        logger.warning(
+            f"LLM call failed (attempt {retry_state.attempt_number}), "
+            f"retrying in {retry_state.next_action.sleep:.2f}s: {exc}"
+        )
+
+    def _retry_kwargs(self):
+        return {
+            "retry": self._should_retry,
+            "stop": stop_after_attempt(self.config.max_attempts),
+            "wait": self._wait,
+            "before_sleep": self._log_retry,
+            "reraise": True,
+        }
+
+    def generate_text(self, prompt: str, context_cache_id: Optional[str] = None) -> str:
+        self.budget.record_request()
+        return Retrying(**self._retry_kwargs())(
+            self.inner.generate_text, prompt, context_cache_id=context_cache_id
+        )
+
+    async def agenerate_text(self, prompt: str, context_cache_id: Optional[str] = None) -> str:
+        self.budget.record_request()
+        return await AsyncRetrying(**self._retry_kwargs())(
+            self.inner.agenerate_text, prompt, context_cache_id=context_cache_id
+        )
+
+    def stream_text(self, prompt: str, context_cache_id: Optional[str] = None) -> Iterator[str]:
+        """流式调用只在首个分片产出前重试，已产出内容后的失败直接抛出"""
+        self.budget.record_request()
+        attempt = 0
+        while True:
+            attempt += 1
+            emitted = False
+            try:
+                with closing(super().stream_text(prompt, context_cache_id=context_cache_id)) as chunks:
+                    for chunk in chunks:
+                        emitted = True
+                        yield chunk
+                return
+            except Exception as e:
+                if emitted or not self._can_retry(e, attempt):
+                    raise
+                delay = self._backoff(attempt)
+                logger.warning(f"LLM stream failed (attempt {attempt}), retrying in {delay:.2f}s: {e}")
+                time.sleep(delay)
+
+    async def astream_text(self, prompt: str, context_cache_id: Optional[str] = None) -> AsyncIterator[str]:
+        self.budget.record_request()
+        attempt = 0
+        while True:
+            attempt += 1
+            emitted = False
+            try:
+                async with aclosing(super().astream_text(prompt, context_cache_id=context_cache_id)) as chunks:
+                    async for chunk in chunks:
+                        emitted = True
+                        yield chunk
+                return
+            except Exception as e:
+                if emitted or not self._can_retry(e, attempt):
+                    raise
+                delay = self._backoff(attempt)
+                logger.warning(f"LLM stream failed (attempt {attempt}), retrying in {delay:.2f}s: {e}")
+                await asyncio.sleep(delay)
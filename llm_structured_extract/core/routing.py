@@ -0,0 +1,49 @@
+# llm_structured_extract/core/routing.py
+from typing import NamedTuple, Optional
+from llm_structured_extract.config.settings import RoutingConfig, settings
+from llm_structured_extract.utils.logger import get_logger
+from llm_structured_extract.utils.tokens import estimate_tokens
+
+logger = get_logger(__name__)
+
+DEFAULT_ROUTE = "default"
+
+
+class Route(NamedTuple):
+    """一次提取选定的路由：model 为空表示使用该提供商配置的默认模型"""
+    name: str
+    provider: str
+    model: Optional[str] = None
+
+    @property
+    def is_default(self) -> bool:
+        return self.name == DEFAULT_ROUTE
+
+
+def estimate_input_tokens(prompt: str) -> int:
+    """预估一次调用的输入 Token：系统提示词 + 渲染后的提示词"""
+    return estimate_tokens(settings.get_system_prompt()) + estimate_tokens(prompt)
+
+
+def default_route() -> Route:
+    return Route(DEFAULT_ROUTE, settings.LLM_PROVIDER.lower())
+
+
+def select_route(schema_name: str, prompt: str, config: Optional[RoutingConfig] = None) -> Route:
+    """按 schema 与预估输入 Token 数匹配路由规则，首条命中生效；未启用或都不匹配时返回默认路由"""
+    config = config or settings.routing_config
+    if not config.enabled or not config.rules:
+        return default_route()
+
+    input_tokens = estimate_input_tokens(prompt)
+    for rule in config.rules:
+        if rule.schemas and schema_name not in rule.schemas:
+            continue
+        if rule.min_input_tokens is not None and input_tokens < rule.min_input_tokens:
+            continue
+        if rule.max_input_tokens is not None and input_tokens > rule.max_input_tokens:
+            continue
+        route = Route(rule.name, (rule.provider or settings.LLM_PROVIDER).lower(), rule.model)
+        logger.debug(f"Schema {schema_name} (~{input_tokens} input tokens) routed to {route.name}: {route.provider}/{route.model or 'default'}")
+        return route
+    return default_route()
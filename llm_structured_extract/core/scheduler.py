@@ -0,0 +1,301 @@
+# llm_structured_extract/core/scheduler.py
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from contextlib import aclosing, contextmanager
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Mapping, Optional, Tuple, Union
+from llm_structured_extract.config.settings import SchedulerConfig, settings
+from llm_structured_extract.core.concurrency import get_concurrency_limiter
+from llm_structured_extract.core.deadline import check_deadline, expired, remaining
+from llm_structured_extract.core.exceptions import DeadlineExceededError
+from llm_structured_extract.core.llm_adapters.base_adapter import AdapterWrapper, BaseAdapter
+from llm_structured_extract.core.request_context import get_request_value, request_scope
+from llm_structured_extract.utils.metrics import metrics
+
+# 优先级类别，按先后顺序严格优先
+INTERACTIVE = "interactive"
+BATCH = "batch"
+PRIORITIES = (INTERACTIVE, BATCH)
+
+DEFAULT_TENANT = "default"
+
+
+def _check_priority(priority: str) -> str:
+    if priority not in PRIORITIES:
+        raise ValueError(f"Unknown priority '{priority}', expected one of {list(PRIORITIES)}")
+    return priority
+
+
+def current_priority() -> str:
+    """当前调用的优先级，未设置时为 scheduler.default_priority"""
+    return _check_priority(get_request_value("priority") or settings.scheduler_config.default_priority)
+
+
+def current_tenant() -> str:
+    """当前调用所属的租户（批量任务以任务名作为租户）"""
+    return get_request_value("tenant") or DEFAULT_TENANT
+
+
+@contextmanager
+def scheduling_scope(priority: Optional[str] = None, tenant: Optional[str] = None) -> Iterator[None]:
+    """为上下文内的 LLM 调用指定优先级与租户；值为 None 时沿用外层设置"""
+    if priority is not None:
+        _check_priority(priority)
+    with request_scope(priority=priority, tenant=tenant or None):
+        yield
+
+
+class _Waiter:
+    """一次排队中的获取请求：异步等待方持有 future，同步等待方持有 Event"""
+
+    __slots__ = ("priority", "flow", "start", "enqueued_at", "loop", "future", "event", "granted", "abandoned")
+
+    def __init__(self, priority: str, flow: Tuple[str, str], start: float, loop=None, future=None, event=None):
+        self.priority = priority
+        self.flow = flow
+        self.start = start
+        self.enqueued_at = time.monotonic()
+        self.loop = loop
+        self.future = future
+        self.event = event
+        self.granted = False
+        self.abandoned = False
+
+
+class FairScheduler:
+    """
+    提供商维度的优先级 + 加权公平调度器，线程与协程共用：
+    - 固定数量的并发槽位（可随自适应并发窗口变化），空闲时任何请求立即获得
+    - 槽位不足时按优先级严格排序：交互请求总是先于批量请求放行；
+      批量请求最多占用 容量 - reserved_slots 个槽位，保证突发的交互请求不必等待批量调用结束
+    - 同一优先级内按租户做加权公平排队（WFQ）：每个租户是一条流，请求的虚拟完成时间为
+      max(类别虚拟时间, 该流上一请求的完成时间) + 1 / 权重，按完成时间先后放行，
+      因此积压大量请求的租户不会饿死其他租户，各租户的放行比例接近权重之比
+    """
+
+    def __init__(
+        self,
+        capacity: Union[int, Callable[[], int]],
+        reserved_slots: int = 1,
+        weights: Optional[Mapping[str, float]] = None,
+        default_weight: float = 1.0,
+    ):
+        self._capacity = capacity if callable(capacity) else (lambda: capacity)
+        self.reserved_slots = max(0, reserved_slots)
+        self.weights = dict(weights or {})
+        self.default_weight = default_weight
+
+        self._lock = threading.Lock()
+        self._heap: List[Tuple[int, float, int, _Waiter]] = []
+        self._seq = itertools.count()
+        self._inflight = {p: 0 for p in PRIORITIES}
+        self._waiting = {p: 0 for p in PRIORITIES}
+        # 各优先级类别的虚拟时间，与每条流（优先级, 租户）最近一个请求的虚拟完成时间
+        self._virtual = {p: 0.0 for p in PRIORITIES}
+        self._finish: Dict[Tuple[str, str], float] = {}
+
+    # ---- 指标 ----
+    @property
+    def capacity(self) -> int:
+        return max(1, int(self._capacity()))
+
+    def inflight(self, priority: Optional[str] = None) -> int:
+        return sum(self._inflight.values()) if priority is None else self._inflight[priority]
+
+    def queue_depth(self, priority: Optional[str] = None) -> int:
+        return sum(self._waiting.values()) if priority is None else self._waiting[priority]
+
+    def weight(self, tenant: str) -> float:
+        return max(self.weights.get(tenant, self.default_weight), 1e-6)
+
+    # ---- 排队与放行 ----
+    def _limit(self, priority: str) -> int:
+        capacity = self.capacity
+        if priority == INTERACTIVE:
+            return capacity
+        return max(1, capacity - self.reserved_slots)
+
+    def _abandon(self, waiter: _Waiter) -> None:
+        """在持有锁时调用：等待方超时或被取消，惰性地留在堆中，轮到时直接丢弃"""
+        waiter.abandoned = True
+        self._waiting[waiter.priority] -= 1
+        self._dispatch()
+
+    def _enqueue(self, priority: str, tenant: str, **wait) -> _Waiter:
+        """在持有锁时调用：为请求打上虚拟时间标签并入队"""
+        flow = (priority, tenant)
+        start = max(self._virtual[priority], self._finish.get(flow, 0.0))
+        finish = start + 1.0 / self.weight(tenant)
+        self._finish[flow] = finish
+        waiter = _Waiter(priority, flow, start, **wait)
+        heapq.heappush(self._heap, (PRIORITIES.index(priority), finish, next(self._seq), waiter))
+        self._waiting[priority] += 1
+        return waiter
+
+    def _dispatch(self) -> None:
+        """在持有锁时调用：按优先级与虚拟完成时间放行，直到队首请求所在类别没有可用槽位"""
+        while self._heap:
+            waiter = self._heap[0][3]
+            if not waiter.abandoned and self.inflight() >= self._limit(waiter.priority):
+                # 队首即最高优先级中最早完成的请求；它无法放行时其后的请求同样不能
+                break
+            heapq.heappop(self._heap)
+            if waiter.abandoned:
+                continue
+            self._waiting[waiter.priority] -= 1
+            self._virtual[waiter.priority] = max(self._virtual[waiter.priority], waiter.start)
+            if self._finish.get(waiter.flow, 0.0) <= self._virtual[waiter.priority]:
+                # 已追上类别虚拟时间的流无需再记住，新请求会从虚拟时间开始计
+                self._finish.pop(waiter.flow, None)
+            self._inflight[waiter.priority] += 1
+            waiter.granted = True
+            if waiter.event is not None:
+                waiter.event.set()
+            else:
+                waiter.loop.call_soon_threadsafe(self._resolve, waiter)
+
+    def _resolve(self, waiter: _Waiter) -> None:
+        # 放行与取消可能交错：等待方已被取消时归还槽位
+        if waiter.future.cancelled():
+            self.release(waiter.priority)
+        else:
+            waiter.future.set_result(time.monotonic() - waiter.enqueued_at)
+
+    def acquire(self, priority: str, tenant: str, timeout: Optional[float] = None) -> Optional[float]:
+        """获取一个槽位，返回排队秒数；timeout 内未获得时返回 None"""
+        with self._lock:
+            waiter = self._enqueue(priority, tenant, event=threading.Event())
+            self._dispatch()
+        if waiter.event.wait(timeout):
+            return time.monotonic() - waiter.enqueued_at
+        with self._lock:
+            if waiter.granted:
+                return time.monotonic() - waiter.enqueued_at
+            self._abandon(waiter)
+        return None
+
+    async def aacquire(self, priority: str, tenant: str) -> float:
+        """获取一个槽位，返回排队秒数"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            waiter = self._enqueue(priority, tenant, loop=loop, future=loop.create_future())
+            self._dispatch()
+        try:
+            return await waiter.future
+        except asyncio.CancelledError:
+            with self._lock:
+                if not waiter.granted:
+                    self._abandon(waiter)
+                granted = waiter.future.done() and not waiter.future.cancelled()
+            if granted:
+                self.release(priority)
+            raise
+
+    def release(self, priority: str) -> None:
+        with self._lock:
+            self._inflight[priority] -= 1
+            self._dispatch()
+
+    def snapshot(self) -> Dict[str, float]:
+        result: Dict[str, float] = {"capacity": self.capacity}
+        for priority in PRIORITIES:
+            result[f"{priority}_inflight"] = self._inflight[priority]
+            result[f"{priority}_queue_depth"] = self._waiting[priority]
+        return result
+
+
+_lock = threading.Lock()
+_SCHEDULERS: Dict[str, FairScheduler] = {}
+
+
+def get_scheduler(provider: str, config: Optional[SchedulerConfig] = None) -> FairScheduler:
+    """
+    获取提供商维度进程内共享的调度器，并注册各优先级的在途数与排队深度指标。
+    scheduler.max_concurrency 为 0 时槽位数跟随该提供商的自适应并发窗口，
+    使排队发生在调度器而不是并发限制器的先进先出队列中。
+    """
+    with _lock:
+        scheduler = _SCHEDULERS.get(provider)
+        if scheduler is not None:
+            return scheduler
+
+        config = config or settings.scheduler_config
+        if config.max_concurrency:
+            capacity: Union[int, Callable[[], int]] = config.max_concurrency
+        elif settings.adaptive_concurrency_config.enabled:
+            limiter = get_concurrency_limiter(provider)
+            capacity = lambda: limiter.limit
+        else:
+            capacity = settings.get_model_config(provider).max_concurrency or settings.adaptive_concurrency_config.initial_limit
+        scheduler = FairScheduler(capacity, config.reserved_slots, config.tenant_weights, config.default_weight)
+        _SCHEDULERS[provider] = scheduler
+
+    for priority in PRIORITIES:
+        metrics.register_gauge("llm_scheduler_inflight", lambda p=priority: scheduler.inflight(p), provider=provider, priority=priority)
+        metrics.register_gauge("llm_scheduler_queue_depth", lambda p=priority: scheduler.queue_depth(p), provider=provider, priority=priority)
+    return scheduler
+
+
+class SchedulingAdapter(AdapterWrapper):
+    """按请求上下文中的优先级与租户，经公平调度器获取槽位后再调用内层适配器"""
+
+    def __init__(self, inner: BaseAdapter, provider: str, scheduler: Optional[FairScheduler] = None):
+        super().__init__(inner)
+        self.provider = provider
+        self.scheduler = scheduler or get_scheduler(provider)
+
+    def _admitted(self, priority: str, waited: float) -> None:
+        metrics.inc("llm_scheduler_admitted_total", provider=self.provider, priority=priority)
+        metrics.inc("llm_scheduler_wait_seconds_total", waited, provider=self.provider, priority=priority)
+
+    def _acquire(self) -> str:
+        priority, tenant = current_priority(), current_tenant()
+        check_deadline(f"scheduling {priority} request on {self.provider}")
+        waited = self.scheduler.acquire(priority, tenant, timeout=remaining())
+        if waited is None:
+            raise DeadlineExceededError(f"Deadline exceeded while waiting for {self.provider} {priority} slot")
+        self._admitted(priority, waited)
+        return priority
+
+    async def _aacquire(self) -> str:
+        priority, tenant = current_priority(), current_tenant()
+        check_deadline(f"scheduling {priority} request on {self.provider}")
+        waited = await self.scheduler.aacquire(priority, tenant)
+        if expired():
+            self.scheduler.release(priority)
+            raise DeadlineExceededError(f"Deadline exceeded while waiting for {self.provider} {priority} slot")
+        self._admitted(priority, waited)
+        return priority
+
+    def generate_text(self, prompt: str, context_cache_id: Optional[str] = None) -> str:
+        priority = self._acquire()
+        try:
+            return self.inner.generate_text(prompt, context_cache_id=context_cache_id)
+        finally:
+            self.scheduler.release(priority)
+
+    async def agenerate_text(self, prompt: str, context_cache_id: Optional[str] = None) -> str:
+        priority = await self._aacquire()
+        try:
+            return await self.inner.agenerate_text(prompt, context_cache_id=context_cache_id)
+        finally:
+            self.scheduler.release(priority)
+
+    def stream_text(self, prompt: str, context_cache_id: Optional[str] = None) -> Iterator[str]:
+        # 流式调用在整个生成期间占用槽位
+        priority = self._acquire()
+        try:
+            yield from super().stream_text(prompt, context_cache_id=context_cache_id)
+        finally:
+            self.scheduler.release(priority)
+
+    async def astream_text(self, prompt: str, context_cache_id: Optional[str] = None) -> AsyncIterator[str]:
+        priority = await self._aacquire()
+        try:
+            async with aclosing(super().astream_text(prompt, context_cache_id=context_cache_id)) as chunks:
+                async for chunk in chunks:
+                    yield chunk
+        finally:
+            self.scheduler.release(priority)
@@ -0,0 +1,86 @@
+# llm_structured_extract/core/singleflight.py
+import asyncio
+import hashlib
+import threading
+import weakref
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+from llm_structured_extract.core.deadline import detached_deadline
+from llm_structured_extract.utils.logger import get_logger
+from llm_structured_extract.utils.metrics import metrics
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+
+def text_fingerprint(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class _Flight:
+    def __init__(self, task: "asyncio.Task[Any]"):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    异步单飞（请求合并）：同一键上并发的调用只执行一次，其余调用等待并共享同一结果或异常。
+    共享任务在发起者的上下文（用量汇总等）中执行，但不继承发起者的截止时间：
+    每个调用方只对自己的等待施加截止时间（如外层的 run_with_deadline），可以各自超时或被取消，
+    所有调用方都离开后才取消共享任务，因此截止时间较短的发起者不会让后到的调用方一起失败。
+    """
+
+    def __init__(self, name: str = "singleflight"):
+        self.name = name
+        self._flights: Dict[Hashable, _Flight] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]], **labels: str) -> T:
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(self._run_detached(fn)))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _, k=key, f=flight: self._forget(k, f))
+        else:
+            metrics.inc(f"{self.name}_coalesced_total", **labels)
+            logger.debug(f"Coalesced in-flight call {self.name} {labels}")
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if not flight.task.done() and flight.waiters == 1:
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+
+    @staticmethod
+    async def _run_detached(fn: Callable[[], Awaitable[T]]) -> T:
+        with detached_deadline():
+            return await fn()
+
+    def _forget(self, key: Hashable, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        # 所有调用方都已离开时避免 "exception was never retrieved" 警告
+        if not flight.task.cancelled():
+            flight.task.exception()
+
+    def inflight(self) -> int:
+        return len(self._flights)
+
+
+_lock = threading.Lock()
+_groups: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, SingleFlight]]" = weakref.WeakKeyDictionary()
+
+
+def get_singleflight(name: str) -> SingleFlight:
+    """获取当前事件循环内共享的单飞分组（asyncio 任务不能跨事件循环共享）"""
+    loop = asyncio.get_running_loop()
+    with _lock:
+        groups = _groups.setdefault(loop, {})
+        group = groups.get(name)
+        if group is None:
+            group = groups[name] = SingleFlight(name)
+        return group
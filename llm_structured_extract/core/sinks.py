@@ -0,0 +1,316 @@
+# llm_structured_extract/core/sinks.py
+import asyncio
+import json
+import os
+import time
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Union, get_args, get_origin
+from pydantic import BaseModel
+from llm_structured_extract.config.settings import ResultSinkConfig, settings
+from llm_structured_extract.core.exceptions import ConfigurationError, SchemaError
+from llm_structured_extract.core.schema_registry import get_model
+from llm_structured_extract.utils.logger import get_logger
+from llm_structured_extract.utils.metrics import metrics
+
+logger = get_logger(__name__)
+
+
+class ResultRecord(NamedTuple):
+    """一条提取结果；data 为空表示解析失败，只保留原始输出"""
+    doc_id: str
+    schema: str
+    data: Optional[Dict[str, Any]]
+    raw_markdown: Optional[str] = None
+    created_at: float = 0.0
+    # 调用方的投递标识，供落盘回调关联对应的投递，不写入结果文件
+    delivery: Optional[str] = None
+
+    def as_dict(self, include_raw: bool = True) -> Dict[str, Any]:
+        row = {"doc_id": self.doc_id, "schema": self.schema, "created_at": self.created_at, "data": self.data}
+        if include_raw:
+            row["raw_markdown"] = self.raw_markdown
+        return row
+
+
+FlushListener = Callable[[List[ResultRecord]], None]
+
+
+def _run_id() -> str:
+    # 文件名中的运行标识：多个进程写同一目录时互不覆盖
+    return f"{time.strftime('%Y%m%d%H%M%S')}-{os.getpid()}"
+
+
+class ResultSink(ABC):
+    """
+    结果写入器基类：write() 只把结果放入内存缓冲，攒满 batch_size 条或每隔 flush_interval 秒
+    由工作线程批量写出，事件循环中不做任何文件 IO。写出失败时结果留在缓冲区，write() 不抛出，
+    由下次 flush / close() 重试（close() 的失败会抛给调用方）。
+    flush 监听器在一批结果写出后（于工作线程中）被调用，用于在结果落盘后再标记任务完成。
+    """
+
+    name = "sink"
+
+    def __init__(self, batch_size: int = 100, flush_interval: Optional[float] = 5.0):
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.written = 0
+        self._buffer: List[ResultRecord] = []
+        self._listeners: List[FlushListener] = []
+        self._flush_lock = asyncio.Lock()
+        self._flusher: Optional["asyncio.Task[None]"] = None
+
+    def add_flush_listener(self, listener: FlushListener) -> None:
+        self._listeners.append(listener)
+
+    async def write(self, record: ResultRecord) -> None:
+        if not record.created_at:
+            record = record._replace(created_at=time.time())
+        self._buffer.append(record)
+        if self._flusher is None and self.flush_interval:
+            self._flusher = asyncio.ensure_future(self._flush_periodically())
+        if len(self._buffer) >= self.batch_size:
+            try:
+                await self.flush()
+            except Exception as e:
+                # 记录已在缓冲区中，由定期 flush 或 close() 重试；不让调用方把已接收的结果当作失败重做
+                logger.error(f"Flush of {self.name} sink failed, keeping {len(self._buffer)} records buffered: {str(e)}")
+
+    async def flush(self) -> None:
+        # 串行写出，保证批次顺序与轮转状态一致
+        async with self._flush_lock:
+            batch, self._buffer = self._buffer, []
+            if not batch:
+                return
+            try:
+                await asyncio.to_thread(self._write_timed, batch)
+            except Exception:
+                # 写出失败：结果放回缓冲区由下次 flush 重试，对应任务也不会被标记完成（可能重复写出，不会丢失）
+                self._buffer[:0] = batch
+                metrics.inc("result_sink_flush_failures_total", sink=self.name)
+                raise
+            await asyncio.to_thread(self._notify, batch)
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Periodic flush of {self.name} sink failed: {str(e)}")
+
+    def _write_timed(self, batch: List[ResultRecord]) -> None:
+        started = time.monotonic()
+        self._write_batch(batch)
+        self.written += len(batch)
+        metrics.inc("result_sink_records_total", len(batch), sink=self.name)
+        metrics.inc("result_sink_flushes_total", sink=self.name)
+        logger.debug(f"{self.name} sink wrote {len(batch)} records in {time.monotonic() - started:.3f}s")
+
+    def _notify(self, batch: List[ResultRecord]) -> None:
+        for listener in self._listeners:
+            listener(batch)
+
+    async def close(self) -> None:
+        if self._flusher is not None:
+            self._flusher.cancel()
+            self._flusher = None
+        await self.flush()
+        await asyncio.to_thread(self._close)
+
+    async def __aenter__(self) -> "ResultSink":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    @abstractmethod
+    def _write_batch(self, batch: List[ResultRecord]) -> None:
+        """在工作线程中写出一批结果"""
+
+    def _close(self) -> None:
+        pass
+
+
+class FileSink(ResultSink):
+    """
+    兼容原有目录结构：每条结果写 raw_markdown/<schema>.md 与 parsed_json/<schema>.json。
+    per_document 为 True 时位于 <root>/<doc_id>/ 下（多文档模式），否则直接位于 <root>/ 下（单文件模式）。
+    """
+
+    name = "files"
+
+    def __init__(self, root: Union[str, Path], per_document: bool = True, **kwargs):
+        super().__init__(**kwargs)
+        self.root = Path(root)
+        self.per_document = per_document
+
+    def _write_batch(self, batch: List[ResultRecord]) -> None:
+        for record in batch:
+            base = self.root / record.doc_id if self.per_document else self.root
+            if record.raw_markdown is not None:
+                (base / "raw_markdown").mkdir(parents=True, exist_ok=True)
+                (base / "raw_markdown" / f"{record.schema}.md").write_text(record.raw_markdown, encoding="utf-8")
+            if record.data is not None:
+                (base / "parsed_json").mkdir(parents=True, exist_ok=True)
+                with open(base / "parsed_json" / f"{record.schema}.json", "w", encoding="utf-8") as f:
+                    json.dump(record.data, f, ensure_ascii=False, indent=2)
+
+
+class JsonlSink(ResultSink):
+    """每条结果一行 JSON，追加写入 <root>/<prefix>-<运行标识>-<序号>.jsonl，单个文件超过 max_bytes 后轮转"""
+
+    name = "jsonl"
+
+    def __init__(
+        self,
+        root: Union[str, Path],
+        prefix: str = "results",
+        max_bytes: int = 256 * 1024 * 1024,
+        include_raw: bool = True,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self.root = Path(root)
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.include_raw = include_raw
+        self.files: List[Path] = []
+        self._run_id = _run_id()
+        self._file = None
+        self._size = 0
+
+    def _open_next(self) -> None:
+        self._close()
+        self.root.mkdir(parents=True, exist_ok=True)
+        path = self.root / f"{self.prefix}-{self._run_id}-{len(self.files):05d}.jsonl"
+        self._file = open(path, "ab")
+        self._size = 0
+        self.files.append(path)
+
+    def _write_batch(self, batch: List[ResultRecord]) -> None:
+        for record in batch:
+            line = (json.dumps(record.as_dict(self.include_raw), ensure_ascii=False) + "\n").encode("utf-8")
+            if self._file is None or (self._size and self._size + len(line) > self.max_bytes):
+                self._open_next()
+            self._file.write(line)
+            self._size += len(line)
+        self._file.flush()
+
+    def _close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def _arrow_type(annotation: Any):
+    """pydantic 字段注解 -> Arrow 类型；无法映射时返回 None"""
+    import pyarrow as pa
+
+    origin, args = get_origin(annotation), get_args(annotation)
+    if origin is Union:
+        args = [arg for arg in args if arg is not type(None)]
+        return _arrow_type(args[0]) if len(args) == 1 else None
+    if origin in (list, List):
+        item = _arrow_type(args[0]) if args else None
+        return pa.list_(item) if item is not None else None
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        fields = []
+        for name, field in annotation.model_fields.items():
+            field_type = _arrow_type(field.annotation)
+            if field_type is None:
+                return None
+            fields.append(pa.field(name, field_type))
+        return pa.struct(fields)
+    # bool 须先于 int 判断
+    for py_type, arrow_type in ((bool, pa.bool_()), (int, pa.int64()), (float, pa.float64()), (str, pa.string())):
+        if annotation is py_type:
+            return arrow_type
+    return None
+
+
+@lru_cache(maxsize=128)
+def _data_type(schema: str):
+    """schema 对应模型的 Arrow 结构类型，保证同一 schema 的所有分片文件结构一致；无法映射时为 None"""
+    try:
+        return _arrow_type(get_model(schema))
+    except SchemaError:
+        return None
+
+
+class ParquetSink(ResultSink):
+    """
+    列式输出，便于分析：每批结果按 schema 写入 <root>/schema=<schema>/part-<运行标识>-<序号>.parquet，
+    列为 doc_id、created_at、data 与可选的 raw_markdown。需要安装 pyarrow。
+    data 的结构由 schema 对应的 pydantic 模型显式确定（而不是按每批数据推断），某字段在一批中全为空时
+    各分片文件的结构仍然一致，可以作为一个数据集整体读取；模型含无法映射的字段类型时 data 为 JSON 字符串。
+    """
+
+    name = "parquet"
+
+    def __init__(self, root: Union[str, Path], include_raw: bool = True, **kwargs):
+        try:
+            import pyarrow  # noqa: F401
+            import pyarrow.parquet  # noqa: F401
+        except ImportError as e:
+            raise ConfigurationError("ParquetSink requires pyarrow: pip install 'llm_structured_extract[parquet]'") from e
+        super().__init__(**kwargs)
+        self.root = Path(root)
+        self.include_raw = include_raw
+        self.files: List[Path] = []
+        self._run_id = _run_id()
+
+    def _write_batch(self, batch: List[ResultRecord]) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        by_schema: Dict[str, List[Dict[str, Any]]] = {}
+        for record in batch:
+            # 解析失败的结果没有结构化数据，不进入分析表
+            if record.data is None:
+                continue
+            row = record.as_dict(self.include_raw)
+            del row["schema"]
+            by_schema.setdefault(record.schema, []).append(row)
+
+        for schema, rows in by_schema.items():
+            data_type = _data_type(schema)
+            if data_type is None:
+                data_type = pa.string()
+                for row in rows:
+                    row["data"] = json.dumps(row["data"], ensure_ascii=False)
+            columns = [pa.field("doc_id", pa.string()), pa.field("created_at", pa.float64()), pa.field("data", data_type)]
+            if self.include_raw:
+                columns.append(pa.field("raw_markdown", pa.string()))
+            directory = self.root / f"schema={schema}"
+            directory.mkdir(parents=True, exist_ok=True)
+            path = directory / f"part-{self._run_id}-{len(self.files):05d}.parquet"
+            pq.write_table(pa.Table.from_pylist(rows, schema=pa.schema(columns)), path)
+            self.files.append(path)
+
+
+SINK_TYPES = {
+    FileSink.name: FileSink,
+    JsonlSink.name: JsonlSink,
+    ParquetSink.name: ParquetSink,
+}
+
+
+def create_sink(
+    output_dir: Union[str, Path],
+    kind: Optional[str] = None,
+    config: Optional[ResultSinkConfig] = None,
+    per_document: bool = True,
+) -> ResultSink:
+    """按配置创建结果写入器，kind 覆盖 config.type"""
+    config = config or settings.result_sink_config
+    kind = (kind or config.type).lower()
+    common = {"batch_size": config.batch_size, "flush_interval": config.flush_interval}
+    if kind == FileSink.name:
+        return FileSink(output_dir, per_document=per_document, **common)
+    if kind == JsonlSink.name:
+        return JsonlSink(output_dir, max_bytes=config.jsonl_max_bytes, include_raw=config.include_raw, **common)
+    if kind == ParquetSink.name:
+        return ParquetSink(output_dir, include_raw=config.include_raw, **common)
+    raise ConfigurationError(f"Unknown result sink '{kind}', expected one of {sorted(SINK_TYPES)}")
@@ -0,0 +1,142 @@
+# llm_structured_extract/core/streaming.py
+import time
+from typing import AsyncIterator, Dict, Iterator, List, Optional
+from llm_structured_extract.utils.logger import get_logger
+from llm_structured_extract.utils.metrics import metrics
+
+logger = get_logger(__name__)
+
+
+class StreamStats:
+    """流式调用的时延统计：首字时间（TTFT）与分片间隔（inter-token latency）"""
+
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.first_chunk_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.chunks = 0
+        self.chars = 0
+        self.inter_chunk_latencies: List[float] = []
+        self._last_chunk_at: Optional[float] = None
+
+    def start(self) -> None:
+        """以开始消费流的时刻作为请求起点（生成器在首次迭代时才真正发起调用）"""
+        self.started_at = time.monotonic()
+
+    def on_chunk(self, chunk: str) -> None:
+        now = time.monotonic()
+        if self.first_chunk_at is None:
+            self.first_chunk_at = now
+        else:
+            self.inter_chunk_latencies.append(now - self._last_chunk_at)
+        self._last_chunk_at = now
+        self.chunks += 1
+        self.chars += len(chunk)
+
+    def finish(self) -> None:
+        if self.finished_at is None:
+            self.finished_at = time.monotonic()
+
+    @property
+    def time_to_first_token(self) -> Optional[float]:
+        if self.first_chunk_at is None:
+            return None
+        return self.first_chunk_at - self.started_at
+
+    @property
+    def mean_inter_token_latency(self) -> Optional[float]:
+        if not self.inter_chunk_latencies:
+            return None
+        return sum(self.inter_chunk_latencies) / len(self.inter_chunk_latencies)
+
+    @property
+    def max_inter_token_latency(self) -> Optional[float]:
+        return max(self.inter_chunk_latencies) if self.inter_chunk_latencies else None
+
+    @property
+    def total_time(self) -> Optional[float]:
+        if self.finished_at is None:
+            return None
+        return self.finished_at - self.started_at
+
+    def as_dict(self) -> Dict[str, Optional[float]]:
+        return {
+            "ttft": self.time_to_first_token,
+            "mean_itl": self.mean_inter_token_latency,
+            "max_itl": self.max_inter_token_latency,
+            "total_time": self.total_time,
+            "chunks": self.chunks,
+            "chars": self.chars,
+        }
+
+
+def _record(stats: StreamStats, schema_name: str) -> None:
+    stats.finish()
+    ttft = stats.time_to_first_token
+    if ttft is not None:
+        metrics.inc("llm_stream_ttft_seconds_sum", ttft, schema=schema_name)
+        metrics.inc("llm_stream_ttft_seconds_count", 1, schema=schema_name)
+    if stats.inter_chunk_latencies:
+        metrics.inc("llm_stream_itl_seconds_sum", sum(stats.inter_chunk_latencies), schema=schema_name)
+        metrics.inc("llm_stream_itl_seconds_count", len(stats.inter_chunk_latencies), schema=schema_name)
+    logger.debug(f"Stream finished for schema {schema_name}: {stats.as_dict()}")
+
+
+class TextStream:
+    """同步流式结果：迭代得到增量文本，结束后可通过 stats 读取时延统计"""
+
+    def __init__(self, chunks: Iterator[str], schema_name: str = ""):
+        self._chunks = chunks
+        self.schema_name = schema_name
+        self.stats = StreamStats()
+        self._parts: List[str] = []
+
+    def __iter__(self) -> Iterator[str]:
+        self.stats.start()
+        try:
+            for chunk in self._chunks:
+                if not chunk:
+                    continue
+                self.stats.on_chunk(chunk)
+                self._parts.append(chunk)
+                yield chunk
+        finally:
+            # 调用方提前结束迭代时关闭底层生成器，及时释放其占用的并发槽位与连接
+            close = getattr(self._chunks, "close", None)
+            if close is not None:
+                close()
+            _record(self.stats, self.schema_name)
+
+    @property
+    def text(self) -> str:
+        """已接收的全部文本"""
+        return "".join(self._parts)
+
+
+class AsyncTextStream:
+    """异步流式结果：async for 得到增量文本，结束后可通过 stats 读取时延统计"""
+
+    def __init__(self, chunks: AsyncIterator[str], schema_name: str = ""):
+        self._chunks = chunks
+        self.schema_name = schema_name
+        self.stats = StreamStats()
+        self._parts: List[str] = []
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        self.stats.start()
+        try:
+            async for chunk in self._chunks:
+                if not chunk:
+                    continue
+                self.stats.on_chunk(chunk)
+                self._parts.append(chunk)
+                yield chunk
+        finally:
+            aclose = getattr(self._chunks, "aclose", None)
+            if aclose is not None:
+                await aclose()
+            _record(self.stats, self.schema_name)
+
+    @property
+    def text(self) -> str:
+        return "".join(self._parts)
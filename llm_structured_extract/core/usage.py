@@ -0,0 +1,157 @@
+# llm_structured_extract/core/usage.py
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional, Tuple
+from llm_structured_extract.config.settings import settings
+from llm_structured_extract.core.request_context import current_schema, get_request_value
+from llm_structured_extract.core.routing import DEFAULT_ROUTE
+from llm_structured_extract.utils.metrics import metrics
+
+UNKNOWN_SCHEMA = "_unknown"
+
+
+class TokenUsage:
+    """一次或多次调用的 Token 用量、耗时与成本；prompt_tokens 包含 cached_tokens"""
+
+    def __init__(
+        self,
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0,
+        cached_tokens: int = 0,
+        latency: float = 0.0,
+        cost: float = 0.0,
+        calls: int = 0,
+    ):
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.cached_tokens = cached_tokens
+        self.latency = latency
+        self.cost = cost
+        self.calls = calls
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def add(self, other: "TokenUsage") -> None:
+        self.prompt_tokens += other.prompt_tokens
+        self.completion_tokens += other.completion_tokens
+        self.cached_tokens += other.cached_tokens
+        self.latency += other.latency
+        self.cost += other.cost
+        self.calls += other.calls
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cached_tokens": self.cached_tokens,
+            "total_tokens": self.total_tokens,
+            "latency_seconds": round(self.latency, 3),
+            "avg_latency_seconds": round(self.latency / self.calls, 3) if self.calls else 0.0,
+            "cost": round(self.cost, 6),
+        }
+
+
+def usage_field(obj: Any, name: str) -> Any:
+    """从 SDK 对象或 JSON 字典中读取用量字段，缺失时返回 None"""
+    if obj is None:
+        return None
+    if isinstance(obj, dict):
+        return obj.get(name)
+    return getattr(obj, name, None)
+
+
+def estimate_cost(
+    provider: str, prompt_tokens: int, completion_tokens: int, cached_tokens: int = 0, model: Optional[str] = None
+) -> float:
+    """
+    按模型配置的单价计算成本：优先使用 model_prices 中该模型的单价，否则使用提供商默认单价；
+    命中缓存的输入 Token 按 cached_input_price_per_1k 计（未配置时按普通输入价）。
+    """
+    model_config = settings.get_model_config(provider)
+    price = model_config.model_prices.get(model) if model else None
+    price = price or model_config
+    cached_price = price.cached_input_price_per_1k
+    if cached_price is None:
+        cached_price = price.input_price_per_1k
+    uncached = max(prompt_tokens - cached_tokens, 0)
+    return (
+        uncached / 1000 * price.input_price_per_1k
+        + cached_tokens / 1000 * cached_price
+        + completion_tokens / 1000 * price.output_price_per_1k
+    )
+
+
+class UsageTracker:
+    """用量汇总：总量、按 schema 与按路由分组，可在多个线程 / 协程间共享"""
+
+    def __init__(self, name: str = ""):
+        self.name = name
+        self._lock = threading.Lock()
+        self.total = TokenUsage()
+        self.by_schema: Dict[str, TokenUsage] = {}
+        self.by_route: Dict[str, TokenUsage] = {}
+
+    def add(self, usage: TokenUsage, schema: Optional[str] = None, route: Optional[str] = None) -> None:
+        with self._lock:
+            self.total.add(usage)
+            self.by_schema.setdefault(schema or UNKNOWN_SCHEMA, TokenUsage()).add(usage)
+            self.by_route.setdefault(route or DEFAULT_ROUTE, TokenUsage()).add(usage)
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "total": self.total.as_dict(),
+                "by_schema": {schema: usage.as_dict() for schema, usage in sorted(self.by_schema.items())},
+                "by_route": {route: usage.as_dict() for route, usage in sorted(self.by_route.items())},
+            }
+
+
+# 当前生效的用量汇总器，由外到内（如 批量任务 -> 文档 -> 单次提取）
+_trackers: ContextVar[Tuple[UsageTracker, ...]] = ContextVar("llm_usage_trackers", default=())
+
+
+@contextmanager
+def usage_scope(tracker: Optional[UsageTracker] = None, name: str = "") -> Iterator[UsageTracker]:
+    """在作用域内把每次 LLM 调用的用量同时计入外层与本层汇总器"""
+    tracker = tracker or UsageTracker(name)
+    token = _trackers.set(_trackers.get() + (tracker,))
+    try:
+        yield tracker
+    finally:
+        _trackers.reset(token)
+
+
+def record_usage(
+    provider: str,
+    model: str,
+    prompt_tokens: Optional[int] = 0,
+    completion_tokens: Optional[int] = 0,
+    cached_tokens: Optional[int] = 0,
+    latency: float = 0.0,
+) -> TokenUsage:
+    """由适配器在每次真实调用完成后上报用量：更新全局指标并计入当前所有汇总器"""
+    prompt_tokens, completion_tokens, cached_tokens = prompt_tokens or 0, completion_tokens or 0, cached_tokens or 0
+    usage = TokenUsage(
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens,
+        cached_tokens=cached_tokens,
+        latency=latency,
+        cost=estimate_cost(provider, prompt_tokens, completion_tokens, cached_tokens, model=model),
+        calls=1,
+    )
+    schema = current_schema() or UNKNOWN_SCHEMA
+    route = get_request_value("route") or DEFAULT_ROUTE
+    labels = {"provider": provider, "model": model, "schema": schema, "route": route}
+    metrics.inc("llm_prompt_tokens_total", prompt_tokens, **labels)
+    metrics.inc("llm_completion_tokens_total", completion_tokens, **labels)
+    metrics.inc("llm_cached_tokens_total", cached_tokens, **labels)
+    metrics.inc("llm_cost_total", usage.cost, **labels)
+    metrics.inc("llm_call_latency_seconds_sum", latency, **labels)
+    metrics.inc("llm_call_latency_seconds_count", 1, **labels)
+    for tracker in _trackers.get():
+        tracker.add(usage, schema, route)
+    return usage
@@ -0,0 +1,75 @@
+# llm_structured_extract/utils/http_pool.py
+import asyncio
+import threading
+import weakref
+from typing import Dict, Optional, Tuple
+import httpx
+
+# 连接池按 (base_url, 连接上限) 共享；异步客户端额外按事件循环隔离，
+# 因为 httpx.AsyncClient 的连接绑定在创建它的事件循环上
+_PoolKey = Tuple[str, int, int, float]
+
+_lock = threading.Lock()
+_sync_clients: Dict[_PoolKey, httpx.Client] = {}
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[_PoolKey, httpx.AsyncClient]]" = weakref.WeakKeyDictionary()
+
+
+def _limits(key: _PoolKey) -> httpx.Limits:
+    _, max_connections, max_keepalive_connections, keepalive_expiry = key
+    return httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_keepalive_connections,
+        keepalive_expiry=keepalive_expiry,
+    )
+
+
+def get_sync_client(
+    base_url: str,
+    max_connections: int = 100,
+    max_keepalive_connections: int = 20,
+    keepalive_expiry: float = 30.0,
+) -> httpx.Client:
+    """获取进程内共享的同步 HTTP 客户端（Keep-Alive 连接池）"""
+    key = (base_url.rstrip("/"), max_connections, max_keepalive_connections, keepalive_expiry)
+    with _lock:
+        client = _sync_clients.get(key)
+        if client is None or client.is_closed:
+            client = httpx.Client(base_url=key[0], limits=_limits(key))
+            _sync_clients[key] = client
+        return client
+
+
+def get_async_client(
+    base_url: str,
+    max_connections: int = 100,
+    max_keepalive_connections: int = 20,
+    keepalive_expiry: float = 30.0,
+) -> httpx.AsyncClient:
+    """获取当前事件循环内共享的异步 HTTP 客户端（Keep-Alive 连接池）"""
+    loop = asyncio.get_running_loop()
+    key = (base_url.rstrip("/"), max_connections, max_keepalive_connections, keepalive_expiry)
+    with _lock:
+        clients = _async_clients.setdefault(loop, {})
+        client = clients.get(key)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(base_url=key[0], limits=_limits(key))
+            clients[key] = client
+        return client
+
+
+def close_sync_clients() -> None:
+    """关闭所有共享的同步客户端"""
+    with _lock:
+        clients = list(_sync_clients.values())
+        _sync_clients.clear()
+    for client in clients:
+        client.close()
+
+
+async def aclose_async_clients() -> None:
+    """关闭当前事件循环内所有共享的异步客户端"""
+    loop = asyncio.get_running_loop()
+    with _lock:
+        clients = list(_async_clients.pop(loop, {}).values())
+    for client in clients:
+        await client.aclose()
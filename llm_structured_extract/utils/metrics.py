@@ -0,0 +1,54 @@
+# llm_structured_extract/utils/metrics.py
+import threading
+from typing import Callable, Dict, Tuple
+
+_LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _format_key(name: str, labels: _LabelKey) -> str:
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+class MetricsRegistry:
+    """
+    轻量级进程内指标注册表（计数器 + 回调式仪表）。
+    snapshot() 返回 Prometheus 风格的 `name{label="v"}` -> 数值映射，便于日志输出或对接外部采集。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, _LabelKey], float] = {}
+        self._gauges: Dict[Tuple[str, _LabelKey], Callable[[], float]] = {}
+
+    def inc(self, name: str, value: float = 1.0, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def register_gauge(self, name: str, fn: Callable[[], float], **labels: str) -> None:
+        """注册回调式仪表，读取快照时实时求值；同名同标签重复注册会覆盖"""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._gauges[key] = fn
+
+    def get(self, name: str, **labels: str) -> float:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            gauge = self._gauges.get(key)
+            value = self._counters.get(key, 0.0)
+        return float(gauge()) if gauge else value
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+        result = {_format_key(name, labels): value for (name, labels), value in counters.items()}
+        for (name, labels), fn in gauges.items():
+            result[_format_key(name, labels)] = float(fn())
+        return result
+
+
+# 全局指标实例
+metrics = MetricsRegistry()
@@ -0,0 +1,21 @@
+# llm_structured_extract/utils/tokens.py
+import re
+
+# 经验值：Qwen/GPT 系列分词器下，约 1.5 个汉字 ≈ 1 Token，约 4 个英文字符 ≈ 1 Token
+CJK_CHARS_PER_TOKEN = 1.5
+OTHER_CHARS_PER_TOKEN = 4.0
+
+_CJK_PATTERN = re.compile(r"[\u3000-\u303f\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff00-\uffef]")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    粗略估算文本的 Token 数（不依赖具体分词器）。
+    中日韩字符与全角标点按 CJK_CHARS_PER_TOKEN 折算，其余字符按 OTHER_CHARS_PER_TOKEN 折算。
+    仅用于容量规划、限流与路由，不可作为计费依据。
+    """
+    if not text:
+        return 0
+    cjk_count = len(_CJK_PATTERN.findall(text))
+    other_count = len(text) - cjk_count
+    return int(round(cjk_count / CJK_CHARS_PER_TOKEN + other_count / OTHER_CHARS_PER_TOKEN))
@@ -0,0 +1,8 @@
+# llm_structured_extract_service/__init__.py
+from .queue import QueuedTask, RedisTaskQueue, get_redis_client
+
+__all__ = [
+    "QueuedTask",
+    "RedisTaskQueue",
+    "get_redis_client",
+]
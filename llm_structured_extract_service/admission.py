@@ -0,0 +1,54 @@
+# llm_structured_extract_service/admission.py
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+from llm_structured_extract.utils.metrics import metrics
+
+
+class Saturated(Exception):
+    """服务已饱和，请求被拒绝（HTTP 429）；retry_after 为建议的重试等待秒数"""
+
+    def __init__(self, reason: str, retry_after: float = 1.0):
+        super().__init__(f"Service saturated: {reason}")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    请求准入：最多 max_concurrency 个请求同时执行，其余在有界队列中等待。
+    队列已满立即拒绝，排队超过 queue_timeout 也拒绝，避免请求在服务内无限堆积、拖垮上游。
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int, queue_timeout: float, name: str = "extract"):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self.name = name
+        self.active = 0
+        self.waiting = 0
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        metrics.register_gauge("service_requests_active", lambda: self.active, pool=name)
+        metrics.register_gauge("service_requests_waiting", lambda: self.waiting, pool=name)
+
+    def _reject(self, reason: str) -> Saturated:
+        metrics.inc("service_requests_rejected_total", pool=self.name, reason=reason)
+        return Saturated(reason, retry_after=max(1.0, self.queue_timeout / 2))
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        if self._slots.locked() and self.waiting >= self.max_queue:
+            raise self._reject("queue_full")
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise self._reject("queue_timeout") from None
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._slots.release()
@@ -0,0 +1,132 @@
+# llm_structured_extract_service/batches.py
+import asyncio
+import re
+import time
+import uuid
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from llm_structured_extract.config.settings import ServiceConfig, settings
+from llm_structured_extract.core.batch_runner import BatchRunner, Document
+from llm_structured_extract.core.exceptions import ConfigurationError
+from llm_structured_extract.utils.logger import get_logger
+from llm_structured_extract_service.admission import Saturated
+from llm_structured_extract_service.queue import RedisTaskQueue, get_redis_client
+
+logger = get_logger(__name__)
+
+_JOB_NAME = re.compile(r"^[A-Za-z0-9_.-]{1,128}$")
+
+
+def new_job_name() -> str:
+    return f"job_{time.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+
+
+def validate_job_name(job: str) -> str:
+    # 任务名用作输出目录与 Redis 键，只允许安全字符
+    if not _JOB_NAME.match(job) or job in (".", ".."):
+        raise ValueError(f"Invalid job name '{job}': use letters, digits, '_', '-' or '.'")
+    return job
+
+
+class BatchBackend(ABC):
+    """批量提交的执行后端：submit 返回任务名，status 返回任务状态（不存在时为 None）"""
+
+    name = "batch"
+
+    @abstractmethod
+    async def submit(self, job: str, documents: List[Document], schemas: List[str], timeout: Optional[float]) -> str:
+        """提交批量任务；任务名已存在时抛出 FileExistsError，无法再接收任务时抛出 Saturated"""
+
+    @abstractmethod
+    async def status(self, job: str) -> Optional[Dict[str, Any]]:
+        """任务状态，任务不存在时返回 None"""
+
+    async def close(self) -> None:
+        pass
+
+
+class LocalBatchBackend(BatchBackend):
+    """
+    进程内执行：每个批量任务一个 BatchRunner，结果写入 <output_dir>/<job>/；同时运行的任务数有上限。
+    任务结束后只保留状态摘要，BatchRunner 及其持有的文档正文随即释放。
+    """
+
+    name = "local"
+
+    def __init__(self, output_dir: Optional[str] = None, max_jobs: Optional[int] = None):
+        config = settings.service_config
+        output_dir = Path(output_dir or config.batch_output_dir)
+        self.output_dir = output_dir if output_dir.is_absolute() else settings.PROJECT_ROOT / output_dir
+        self.max_jobs = max_jobs or config.max_batch_jobs
+        self._running: Dict[str, Tuple[BatchRunner, "asyncio.Task[Dict[str, Any]]"]] = {}
+        self._finished: Dict[str, Dict[str, Any]] = {}
+
+    async def submit(self, job: str, documents: List[Document], schemas: List[str], timeout: Optional[float]) -> str:
+        if job in self._running or job in self._finished or (self.output_dir / job).exists():
+            raise FileExistsError(f"Job '{job}' already exists")
+        if len(self._running) >= self.max_jobs:
+            raise Saturated("batch_jobs", retry_after=30.0)
+        runner = BatchRunner(schemas, self.output_dir / job, timeout=timeout)
+        task = asyncio.ensure_future(runner.run(documents))
+        self._running[job] = (runner, task)
+        task.add_done_callback(lambda t, j=job: self._finish(j, t))
+        logger.info(f"Batch job {job} submitted: {len(documents)} documents")
+        return job
+
+    def _finish(self, job: str, task: "asyncio.Task[Dict[str, Any]]") -> None:
+        self._running.pop(job, None)
+        if task.cancelled():
+            self._finished[job] = {"job": job, "state": "failed", "error": "cancelled"}
+        elif task.exception() is not None:
+            logger.error(f"Batch job {job} failed: {str(task.exception())}")
+            self._finished[job] = {"job": job, "state": "failed", "error": str(task.exception())}
+        else:
+            self._finished[job] = {"job": job, "state": "done", **task.result()}
+
+    async def status(self, job: str) -> Optional[Dict[str, Any]]:
+        if job in self._finished:
+            return self._finished[job]
+        running = self._running.get(job)
+        if running is None:
+            return None
+        runner = running[0]
+        return {"job": job, "state": "running", **(runner.progress.as_dict() if runner.progress else {})}
+
+    async def close(self) -> None:
+        tasks = [task for _, task in self._running.values()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+class RedisBatchBackend(BatchBackend):
+    """入队给分布式 Worker（llm_structured_extract_service.worker），状态来自队列中的任务批次计数"""
+
+    name = "redis"
+
+    def __init__(self, queue: Optional[RedisTaskQueue] = None):
+        self.queue = queue or RedisTaskQueue(get_redis_client())
+
+    async def submit(self, job: str, documents: List[Document], schemas: List[str], timeout: Optional[float]) -> str:
+        if await asyncio.to_thread(self.queue.job_stats, job):
+            raise FileExistsError(f"Job '{job}' already exists")
+        for doc in documents:
+            await asyncio.to_thread(self.queue.enqueue, doc.read(), doc.schemas or schemas, job, doc.doc_id, timeout)
+        return job
+
+    async def status(self, job: str) -> Optional[Dict[str, Any]]:
+        stats = await asyncio.to_thread(self.queue.job_stats, job)
+        if not stats:
+            return None
+        finished = stats.get("done", 0) + stats.get("dead", 0)
+        return {"job": job, "state": "done" if finished >= stats.get("enqueued", 0) else "running", **stats}
+
+
+def create_batch_backend(config: Optional[ServiceConfig] = None) -> BatchBackend:
+    config = config or settings.service_config
+    if config.batch_backend == LocalBatchBackend.name:
+        return LocalBatchBackend()
+    if config.batch_backend == RedisBatchBackend.name:
+        return RedisBatchBackend()
+    raise ConfigurationError(f"Unknown service.batch_backend '{config.batch_backend}', expected 'local' or 'redis'")
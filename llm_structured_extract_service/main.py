@@ -0,0 +1,295 @@
+# llm_structured_extract_service/main.py
+# 异步 HTTP 提取服务：
+#   python -m llm_structured_extract_service.main serve --port 8000
+#   python -m llm_structured_extract_service.main --text "..." [--schema name]   # 单次提取并输出 JSON
+import argparse
+import asyncio
+import json
+import sys
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+from llm_structured_extract import async_extract, async_extract_to_model, async_stream_extract
+from llm_structured_extract.config.settings import ServiceConfig, settings
+from llm_structured_extract.core.batch_runner import Document
+from llm_structured_extract.core.deadline import deadline_scope, run_with_deadline
+from llm_structured_extract.core.exceptions import (
+    DeadlineExceededError, LLMExtractError, ParserError, PromptError, ProviderError, SchemaError
+)
+from llm_structured_extract.core.scheduler import INTERACTIVE, scheduling_scope
+from llm_structured_extract.core.schema_registry import list_available_schemas
+from llm_structured_extract.utils.logger import get_logger
+from llm_structured_extract.utils.metrics import metrics
+from llm_structured_extract_service.admission import AdmissionController, Saturated
+from llm_structured_extract_service.batches import BatchBackend, create_batch_backend, new_job_name, validate_job_name
+
+try:
+    from aiohttp import web
+except ImportError as e:
+    raise ImportError("The HTTP service requires aiohttp: pip install 'llm_structured_extract[service]'") from e
+
+logger = get_logger(__name__)
+
+ADMISSION_KEY = web.AppKey("admission", AdmissionController)
+BATCHES_KEY = web.AppKey("batches", BatchBackend)
+CONFIG_KEY = web.AppKey("config", ServiceConfig)
+
+
+# ---- 请求体 ----
+class ExtractRequest(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+
+    text: str = Field(min_length=1)
+    schema_name: str = Field(default="", alias="schema")
+    # 端到端截止时间（秒），默认 service.default_timeout
+    timeout: Optional[float] = Field(default=None, gt=0)
+    stream: bool = False
+
+
+class BatchDocument(BaseModel):
+    id: str
+    text: str = Field(min_length=1)
+    schemas: Optional[List[str]] = None
+
+
+class BatchRequest(BaseModel):
+    documents: List[BatchDocument] = Field(min_length=1)
+    schemas: List[str] = Field(default_factory=list)
+    job: Optional[str] = None
+    timeout: Optional[float] = Field(default=None, gt=0)
+
+
+def _error(status: int, message: str, headers: Optional[Dict[str, str]] = None, **extra: Any) -> web.Response:
+    return web.json_response({"error": message, **extra}, status=status, headers=headers)
+
+
+def _status_for(exc: Exception) -> int:
+    """异常 -> HTTP 状态码：调用方错误 4xx，上游 LLM 或解析失败 502，截止时间到 504"""
+    if isinstance(exc, (SchemaError, PromptError)):
+        return 400
+    if isinstance(exc, DeadlineExceededError):
+        return 504
+    if isinstance(exc, (ProviderError, ParserError)):
+        return 502
+    return 500
+
+
+async def _parse(request: web.Request, model: type) -> BaseModel:
+    try:
+        payload = await request.json()
+    except json.JSONDecodeError:
+        raise web.HTTPBadRequest(text=json.dumps({"error": "Request body must be JSON"}), content_type="application/json")
+    try:
+        return model.model_validate(payload)
+    except ValidationError as e:
+        raise web.HTTPBadRequest(text=json.dumps({"error": "Invalid request", "details": json.loads(e.json())}), content_type="application/json")
+
+
+def _schema(request: web.Request, body: ExtractRequest) -> str:
+    schema = body.schema_name or request.app[CONFIG_KEY].default_schema
+    if not schema:
+        raise web.HTTPBadRequest(text=json.dumps({"error": "'schema' is required"}), content_type="application/json")
+    return schema
+
+
+def _wants_stream(request: web.Request, body: ExtractRequest) -> bool:
+    return body.stream or "text/event-stream" in request.headers.get("Accept", "")
+
+
+def _tenant(request: web.Request) -> Optional[str]:
+    """公平调度中的租户，取自 X-Tenant 请求头"""
+    return request.headers.get("X-Tenant", "").strip()[:128] or None
+
+
+def _timeout(request: web.Request, requested: Optional[float]) -> float:
+    return requested or request.app[CONFIG_KEY].default_timeout
+
+
+# ---- 流式响应（Server-Sent Events）----
+async def _sse(request: web.Request, events: AsyncIterator[Tuple[str, Any]]) -> web.StreamResponse:
+    response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    await response.prepare(request)
+    try:
+        async for event, data in events:
+            if event == "":
+                # 注释行作为心跳，防止代理在长时间提取期间断开空闲连接
+                await response.write(b": keepalive\n\n")
+            else:
+                await response.write(f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8"))
+    except LLMExtractError as e:
+        await response.write(f"event: error\ndata: {json.dumps({'error': str(e), 'status': _status_for(e)}, ensure_ascii=False)}\n\n".encode("utf-8"))
+    await response.write_eof()
+    return response
+
+
+async def _stream_markdown(text: str, schema: str, timeout: float) -> AsyncIterator[Tuple[str, Any]]:
+    """逐段转发 LLM 输出；每个分片都受截止时间约束"""
+    with deadline_scope(timeout):
+        stream = await async_stream_extract(text, schema)
+        chunks = stream.__aiter__()
+        while True:
+            try:
+                chunk = await run_with_deadline(chunks.__anext__(), stage=f"streaming schema {schema}")
+            except StopAsyncIteration:
+                break
+            yield "chunk", {"text": chunk}
+    yield "done", {"schema": schema, "markdown": stream.text, "stats": stream.stats.as_dict()}
+
+
+async def _with_heartbeat(coro, interval: float) -> AsyncIterator[Tuple[str, Any]]:
+    """等待长时间的提取时定期产出心跳，最后产出 ("result", 结果)；客户端断开时取消提取"""
+    task = asyncio.ensure_future(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=interval)
+            if done:
+                break
+            yield "", None
+        yield "result", task.result()
+    finally:
+        task.cancel()
+
+
+# ---- 处理函数 ----
+async def healthz(request: web.Request) -> web.Response:
+    admission = request.app[ADMISSION_KEY]
+    return web.json_response({"status": "ok", "active": admission.active, "waiting": admission.waiting})
+
+
+async def metrics_handler(request: web.Request) -> web.Response:
+    return web.json_response(metrics.snapshot())
+
+
+async def schemas(request: web.Request) -> web.Response:
+    return web.json_response({"schemas": list_available_schemas()})
+
+
+async def extract_handler(request: web.Request) -> web.StreamResponse:
+    """POST /v1/extract：返回 LLM 生成的 Markdown；stream 时以 SSE 逐段返回。调用以交互优先级参与公平调度"""
+    body = await _parse(request, ExtractRequest)
+    schema, timeout = _schema(request, body), _timeout(request, body.timeout)
+    async with request.app[ADMISSION_KEY].slot():
+        with scheduling_scope(INTERACTIVE, _tenant(request)):
+            if _wants_stream(request, body):
+                return await _sse(request, _stream_markdown(body.text, schema, timeout))
+            markdown = await async_extract(body.text, schema, timeout=timeout)
+    return web.json_response({"schema": schema, "markdown": markdown})
+
+
+async def extract_to_model_handler(request: web.Request) -> web.StreamResponse:
+    """POST /v1/extract_to_model：返回结构化 JSON；stream 时先发心跳，完成后以 result 事件返回"""
+    body = await _parse(request, ExtractRequest)
+    schema, timeout = _schema(request, body), _timeout(request, body.timeout)
+    async with request.app[ADMISSION_KEY].slot():
+        with scheduling_scope(INTERACTIVE, _tenant(request)):
+            if _wants_stream(request, body):
+                async def events():
+                    async for event, data in _with_heartbeat(
+                        async_extract_to_model(body.text, schema, timeout=timeout), request.app[CONFIG_KEY].stream_heartbeat
+                    ):
+                        yield event, {"schema": schema, "result": data.model_dump(mode="json")} if event == "result" else data
+                return await _sse(request, events())
+            result = await async_extract_to_model(body.text, schema, timeout=timeout)
+    return web.json_response({"schema": schema, "result": result.model_dump(mode="json")})
+
+
+async def submit_batch(request: web.Request) -> web.Response:
+    """POST /v1/batch：提交多文档批量任务，立即返回 202 与任务名"""
+    body = await _parse(request, BatchRequest)
+    config = request.app[CONFIG_KEY]
+    schemas = body.schemas or ([config.default_schema] if config.default_schema else [])
+    if not schemas and any(not doc.schemas for doc in body.documents):
+        return _error(400, "'schemas' is required")
+    try:
+        job = validate_job_name(body.job or new_job_name())
+    except ValueError as e:
+        return _error(400, str(e))
+    documents = [Document(doc.id, text=doc.text, schemas=doc.schemas) for doc in body.documents]
+    if len({doc.doc_id for doc in documents}) != len(documents):
+        return _error(400, "Duplicate document id in batch")
+    try:
+        await request.app[BATCHES_KEY].submit(job, documents, schemas, _timeout(request, body.timeout))
+    except FileExistsError as e:
+        return _error(409, str(e))
+    return web.json_response({"job": job, "status_url": f"/v1/batch/{job}"}, status=202)
+
+
+async def batch_status(request: web.Request) -> web.Response:
+    status = await request.app[BATCHES_KEY].status(request.match_info["job"])
+    if status is None:
+        return _error(404, "Job not found")
+    return web.json_response(status)
+
+
+@web.middleware
+async def errors_middleware(request: web.Request, handler) -> web.StreamResponse:
+    """把饱和与提取异常转换为 JSON 错误响应，并按路由与状态码计数"""
+    try:
+        response = await handler(request)
+    except Saturated as e:
+        response = _error(429, str(e), reason=e.reason, headers={"Retry-After": str(int(e.retry_after))})
+    except LLMExtractError as e:
+        response = _error(_status_for(e), str(e))
+        if response.status >= 500:
+            logger.error(f"{request.method} {request.path} failed: {str(e)}")
+    resource = request.match_info.route.resource
+    metrics.inc("service_responses_total", route=resource.canonical if resource else "unmatched", status=str(response.status))
+    return response
+
+
+def create_app(config: Optional[ServiceConfig] = None, batch_backend: Optional[BatchBackend] = None) -> web.Application:
+    config = config or settings.service_config
+    app = web.Application(middlewares=[errors_middleware], client_max_size=config.max_body_bytes)
+    app[CONFIG_KEY] = config
+    app[ADMISSION_KEY] = AdmissionController(config.max_concurrency, config.max_queue, config.queue_timeout)
+    app[BATCHES_KEY] = batch_backend or create_batch_backend(config)
+
+    async def _close(app: web.Application) -> None:
+        await app[BATCHES_KEY].close()
+        from llm_structured_extract import aclose_adapters
+        await aclose_adapters()
+
+    app.on_cleanup.append(_close)
+    app.add_routes([
+        web.get("/healthz", healthz),
+        web.get("/metrics", metrics_handler),
+        web.get("/v1/schemas", schemas),
+        web.post("/v1/extract", extract_handler),
+        web.post("/v1/extract_to_model", extract_to_model_handler),
+        web.post("/v1/batch", submit_batch),
+        web.get("/v1/batch/{job}", batch_status),
+    ])
+    return app
+
+
+async def _extract_once(text: str, schema: str, timeout: float) -> Dict[str, Any]:
+    from llm_structured_extract import aclose_adapters
+    try:
+        result = await async_extract_to_model(text, schema, timeout=timeout)
+    finally:
+        await aclose_adapters()
+    return {"schema": schema, "result": result.model_dump(mode="json")}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    config = settings.service_config
+    parser = argparse.ArgumentParser(description="Async HTTP extraction service.")
+    parser.add_argument("command", nargs="?", choices=["serve"], default="serve")
+    parser.add_argument("--host", default=config.host)
+    parser.add_argument("--port", type=int, default=config.port)
+    parser.add_argument("--text", default=None, help="Run a single extract_to_model call and print the JSON result instead of serving.")
+    parser.add_argument("--schema", default=config.default_schema or None, help="Schema for --text (default: service.default_schema).")
+    args = parser.parse_args(argv)
+
+    if args.text is not None:
+        schema = args.schema or next(iter(list_available_schemas()), None)
+        if not schema:
+            print("Error: no schema available, pass --schema.")
+            sys.exit(1)
+        print(json.dumps(asyncio.run(_extract_once(args.text, schema, config.default_timeout)), ensure_ascii=False, indent=2))
+        return
+
+    web.run_app(create_app(config), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
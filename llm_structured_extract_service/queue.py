@@ -0,0 +1,268 @@
+# llm_structured_extract_service/queue.py
+import time
+import uuid
+from typing import Any, Dict, List, NamedTuple, Optional
+from llm_structured_extract.config.settings import WorkerConfig, settings
+from llm_structured_extract.core.exceptions import ConfigurationError
+from llm_structured_extract.core.singleflight import text_fingerprint
+from llm_structured_extract.core.usage import TokenUsage
+from llm_structured_extract.utils.logger import get_logger
+from llm_structured_extract.utils.metrics import metrics
+
+logger = get_logger(__name__)
+
+# 领取：取出一个已可见的任务，推迟可见时间并写入新回执；超过最大投递次数的转入死信。
+# KEYS: queue, dead；ARGV: now, visibility_timeout, max_attempts, receipt, 任务键前缀, 批次键前缀
+_CLAIM_SCRIPT = """
+local ids = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, 1)
+if #ids == 0 then
+  return false
+end
+local id = ids[1]
+local task = ARGV[5] .. id
+local attempts = redis.call('HGET', task, 'attempts')
+if not attempts then
+  redis.call('ZREM', KEYS[1], id)
+  return {id, 'missing'}
+end
+attempts = tonumber(attempts)
+if attempts >= tonumber(ARGV[3]) then
+  local err = redis.call('HGET', task, 'last_error')
+  if not err or err == '' then
+    err = 'visibility timeout exceeded'
+  end
+  redis.call('ZREM', KEYS[1], id)
+  redis.call('HSET', task, 'last_error', err, 'receipt', '')
+  redis.call('RPUSH', KEYS[2], id)
+  redis.call('HINCRBY', ARGV[6] .. redis.call('HGET', task, 'job'), 'dead', 1)
+  return {id, 'dead'}
+end
+redis.call('ZADD', KEYS[1], tonumber(ARGV[1]) + tonumber(ARGV[2]), id)
+redis.call('HSET', task, 'attempts', attempts + 1, 'receipt', ARGV[4], 'claimed_at', ARGV[1])
+return {id, 'claimed'}
+"""
+
+# 重投一个死信任务：弹出、清零投递次数并重新入队。返回 -1 表示死信为空，0 表示任务已不存在
+# KEYS: queue, dead；ARGV: now, 任务键前缀, 批次键前缀
+_REDRIVE_SCRIPT = """
+local id = redis.call('LPOP', KEYS[2])
+if not id then
+  return -1
+end
+local task = ARGV[2] .. id
+local job = redis.call('HGET', task, 'job')
+if not job then
+  return 0
+end
+redis.call('HSET', task, 'attempts', 0, 'receipt', '')
+redis.call('ZADD', KEYS[1], ARGV[1], id)
+redis.call('HINCRBY', ARGV[3] .. job, 'dead', -1)
+return 1
+"""
+
+# nack 的结果
+RETRY = "retry"
+DEAD = "dead"
+STALE = "stale"
+
+
+def get_redis_client(url: Optional[str] = None):
+    """按 REDIS_URL 创建 Redis 客户端（需要安装 service 可选依赖）"""
+    try:
+        import redis
+    except ImportError as e:
+        raise ConfigurationError("Redis workers require redis: pip install 'llm_structured_extract[service]'") from e
+    return redis.Redis.from_url(url or settings.REDIS_URL, decode_responses=True)
+
+
+class QueuedTask(NamedTuple):
+    """一次投递：receipt 标识本次领取，确认 / 续期 / 失败都必须携带，过期投递的操作会被忽略"""
+    task_id: str
+    job: str
+    doc_id: str
+    schema: str
+    doc_key: str
+    attempts: int
+    receipt: str
+    timeout: Optional[float] = None
+
+
+class RedisTaskQueue:
+    """
+    基于 Redis 的可靠任务队列（可见性超时语义）：
+    - <前缀>:queue       ZSET，任务 ID -> 可见时间；领取时把可见时间推迟 visibility_timeout，
+                         未确认的任务到期后自动重新可见，无需额外的回收进程
+    - <前缀>:task:<id>   HASH，任务内容、投递次数、本次回执与最近错误
+    - <前缀>:doc:<hash>  文档正文，同一文档的多个 schema 共享
+    - <前缀>:dead        LIST，超过最大投递次数的死信任务 ID
+    - <前缀>:job:<job>   HASH，各任务批次的入队 / 完成 / 重试 / 死信计数与用量
+    领取与死信重投通过 Lua 脚本原子完成（不 WATCH 整个队列，高并发领取不会反复冲突重试）；
+    确认、续期与失败通过 WATCH 任务 HASH 的乐观事务按回执校验，多个进程 / 节点并发消费时同一投递只会被一个 Worker 拿到。
+    """
+
+    def __init__(self, client, name: Optional[str] = None, config: Optional[WorkerConfig] = None):
+        self.client = client
+        self.config = config or settings.worker_config
+        self.name = name or settings.service_config.task_queue
+        self.prefix = f"{self.config.key_prefix}:{self.name}"
+        self._claim_script = client.register_script(_CLAIM_SCRIPT)
+        self._redrive_script = client.register_script(_REDRIVE_SCRIPT)
+
+    def _key(self, *parts: str) -> str:
+        return ":".join((self.prefix,) + parts)
+
+    @property
+    def _queue(self) -> str:
+        return self._key("queue")
+
+    @property
+    def _dead(self) -> str:
+        return self._key("dead")
+
+    def _task(self, task_id: str) -> str:
+        return self._key("task", task_id)
+
+    def _job(self, job: str) -> str:
+        return self._key("job", job)
+
+    # ---- 生产 ----
+    def enqueue(self, text: str, schemas: List[str], job: str, doc_id: str, timeout: Optional[float] = None) -> List[str]:
+        """把一份文档的每个 schema 作为独立任务入队，返回任务 ID"""
+        doc_key = text_fingerprint(text)
+        now = time.time()
+        task_ids = [uuid.uuid4().hex for _ in schemas]
+        pipe = self.client.pipeline()
+        pipe.set(self._key("doc", doc_key), text, ex=self.config.document_ttl)
+        for task_id, schema in zip(task_ids, schemas):
+            fields = {"job": job, "doc_id": doc_id, "schema": schema, "doc_key": doc_key, "attempts": 0, "enqueued_at": now}
+            if timeout is not None:
+                fields["timeout"] = timeout
+            pipe.hset(self._task(task_id), mapping=fields)
+            pipe.zadd(self._queue, {task_id: now})
+        pipe.hincrby(self._job(job), "enqueued", len(task_ids))
+        pipe.execute()
+        metrics.inc("worker_tasks_enqueued_total", len(task_ids), queue=self.name)
+        return task_ids
+
+    # ---- 消费 ----
+    def claim(self, visibility_timeout: Optional[float] = None) -> Optional[QueuedTask]:
+        """领取一个可见任务并使其在 visibility_timeout 内对其他 Worker 不可见；队列为空时返回 None"""
+        visibility_timeout = visibility_timeout or self.config.visibility_timeout
+        while True:
+            now = time.time()
+            receipt = uuid.uuid4().hex
+            claimed = self._claim_script(
+                keys=[self._queue, self._dead],
+                args=[now, visibility_timeout, self.config.max_attempts, receipt, self._task(""), self._job("")],
+            )
+            if not claimed:
+                return None
+            task_id, outcome = claimed
+            if outcome == "missing":
+                continue
+            fields = self.client.hgetall(self._task(task_id))
+            if outcome == "dead":
+                # 已投递 max_attempts 次仍未确认（多为处理中进程崩溃）：转入死信，避免毒消息反复拖垮 Worker
+                metrics.inc("worker_tasks_dead_total", queue=self.name)
+                logger.warning(f"Task {task_id} ({fields.get('doc_id')} / {fields.get('schema')}) dead-lettered: {fields.get('last_error')}")
+                continue
+            metrics.inc("worker_tasks_claimed_total", queue=self.name)
+            timeout = fields.get("timeout")
+            return QueuedTask(
+                task_id, fields["job"], fields["doc_id"], fields["schema"], fields["doc_key"],
+                int(fields["attempts"]), receipt, float(timeout) if timeout else None,
+            )
+
+    def _bury(self, pipe, task_id: str, job: str, error: str) -> None:
+        pipe.zrem(self._queue, task_id)
+        pipe.hset(self._task(task_id), mapping={"last_error": error, "receipt": ""})
+        pipe.rpush(self._dead, task_id)
+        pipe.hincrby(self._job(job), "dead", 1)
+        metrics.inc("worker_tasks_dead_total", queue=self.name)
+
+    def _transact(self, task: QueuedTask, fn) -> bool:
+        """在回执仍有效（未被重新投递）时执行 fn(pipe)，返回是否执行"""
+        from redis.exceptions import WatchError
+
+        while True:
+            with self.client.pipeline() as pipe:
+                try:
+                    pipe.watch(self._task(task.task_id))
+                    if pipe.hget(self._task(task.task_id), "receipt") != task.receipt:
+                        return False
+                    pipe.multi()
+                    fn(pipe)
+                    pipe.execute()
+                    return True
+                except WatchError:
+                    continue
+
+    def document(self, task: QueuedTask) -> Optional[str]:
+        return self.client.get(self._key("doc", task.doc_key))
+
+    def extend(self, task: QueuedTask, visibility_timeout: Optional[float] = None) -> bool:
+        """处理中续期，返回 False 表示回执已失效（超时后已被重新投递）"""
+        deadline = time.time() + (visibility_timeout or self.config.visibility_timeout)
+        return self._transact(task, lambda pipe: pipe.zadd(self._queue, {task.task_id: deadline}, xx=True))
+
+    def ack(self, task: QueuedTask, usage: Optional[TokenUsage] = None) -> bool:
+        """确认完成并删除任务；回执失效时返回 False（以最新一次投递为准）"""
+        def _ack(pipe):
+            pipe.zrem(self._queue, task.task_id)
+            pipe.delete(self._task(task.task_id))
+            pipe.hincrby(self._job(task.job), "done", 1)
+            if usage is not None:
+                pipe.hincrby(self._job(task.job), "prompt_tokens", usage.prompt_tokens)
+                pipe.hincrby(self._job(task.job), "completion_tokens", usage.completion_tokens)
+                pipe.hincrbyfloat(self._job(task.job), "cost", usage.cost)
+
+        acked = self._transact(task, _ack)
+        if acked:
+            metrics.inc("worker_tasks_acked_total", queue=self.name)
+        else:
+            logger.warning(f"Stale ack for task {task.task_id} ({task.doc_id} / {task.schema}), redelivered elsewhere")
+        return acked
+
+    def nack(self, task: QueuedTask, error: str) -> str:
+        """处理失败：未用尽投递次数时延迟 retry_delay × 投递次数 后重新可见，否则转入死信"""
+        if task.attempts >= self.config.max_attempts:
+            outcome, fn = DEAD, lambda pipe: self._bury(pipe, task.task_id, task.job, error)
+        else:
+            visible_at = time.time() + self.config.retry_delay * task.attempts
+
+            def fn(pipe):
+                pipe.zadd(self._queue, {task.task_id: visible_at})
+                pipe.hset(self._task(task.task_id), mapping={"last_error": error, "receipt": ""})
+                pipe.hincrby(self._job(task.job), "retried", 1)
+            outcome = RETRY
+        if not self._transact(task, fn):
+            return STALE
+        metrics.inc("worker_tasks_failed_total", queue=self.name, outcome=outcome)
+        return outcome
+
+    # ---- 运维 ----
+    def dead_letters(self, limit: int = 100) -> List[Dict[str, Any]]:
+        ids = self.client.lrange(self._dead, 0, limit - 1)
+        return [{"task_id": task_id, **self.client.hgetall(self._task(task_id))} for task_id in ids]
+
+    def redrive(self, limit: Optional[int] = None) -> int:
+        """把死信任务重新入队（投递次数清零），返回数量；每个任务的出队与重新入队原子完成"""
+        moved = 0
+        while limit is None or moved < limit:
+            result = self._redrive_script(keys=[self._queue, self._dead], args=[time.time(), self._task(""), self._job("")])
+            if result < 0:
+                break
+            moved += result
+        return moved
+
+    def stats(self) -> Dict[str, int]:
+        """visible：等待领取；invisible：处理中或等待重试；dead：死信"""
+        now = time.time()
+        return {
+            "visible": self.client.zcount(self._queue, "-inf", now),
+            "invisible": self.client.zcount(self._queue, f"({now}", "+inf"),
+            "dead": self.client.llen(self._dead),
+        }
+
+    def job_stats(self, job: str) -> Dict[str, float]:
+        return {k: float(v) if k == "cost" else int(v) for k, v in self.client.hgetall(self._job(job)).items()}
@@ -0,0 +1,235 @@
+# llm_structured_extract_service/worker.py
+# 分布式提取 Worker：从 Redis 队列领取（文档 × schema）任务，提取后经结果写入器落盘，写出后再确认。
+#   python -m llm_structured_extract_service.worker worker -l info -Q extract
+#   python -m llm_structured_extract_service.worker enqueue docs/ --job nightly
+#   python -m llm_structured_extract_service.worker stats --job nightly
+#   python -m llm_structured_extract_service.worker redrive
+import argparse
+import asyncio
+import json
+import logging
+import signal
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from llm_structured_extract import aclose_adapters, async_extract_result, warmup_adapters
+from llm_structured_extract.config.settings import WorkerConfig, settings
+from llm_structured_extract.core.batch_runner import load_documents
+from llm_structured_extract.core.scheduler import BATCH, scheduling_scope
+from llm_structured_extract.core.schema_registry import list_available_schemas
+from llm_structured_extract.core.sinks import SINK_TYPES, ResultRecord, ResultSink, create_sink
+from llm_structured_extract.core.usage import UsageTracker, usage_scope
+from llm_structured_extract.utils.logger import get_logger
+from llm_structured_extract_service.queue import QueuedTask, RedisTaskQueue, get_redis_client
+
+logger = get_logger(__name__)
+
+
+def _delivery(task: QueuedTask) -> str:
+    return f"{task.task_id}:{task.receipt}"
+
+
+class ExtractionWorker:
+    """
+    单个 Worker 进程：concurrency 个协程并发领取并处理任务。
+    - 处理期间每隔 visibility_timeout / 3 续期，长任务不会被重复投递
+    - 结果按任务批次写入 <output_dir>/<job>/，写入器落盘后才确认（ack），
+      进程在写出前退出时任务会在可见性超时后重新投递
+    - 失败的任务 nack：延迟重试，超过最大投递次数进入死信队列
+    - 调用以批量优先级、以任务批次名为租户参与公平调度
+    """
+
+    def __init__(
+        self,
+        queue: RedisTaskQueue,
+        concurrency: Optional[int] = None,
+        output_dir: Optional[str] = None,
+        sink_kind: Optional[str] = None,
+        config: Optional[WorkerConfig] = None,
+    ):
+        self.queue = queue
+        self.config = config or queue.config
+        self.concurrency = concurrency or self.config.concurrency
+        output_dir = Path(output_dir or self.config.output_dir)
+        self.output_dir = output_dir if output_dir.is_absolute() else settings.PROJECT_ROOT / output_dir
+        self.sink_kind = sink_kind
+        self.processed = 0
+        self.failed = 0
+        self._sinks: Dict[str, ResultSink] = {}
+        # 已交给写入器、等待落盘后确认的投递，按（任务 ID + 回执）登记，重新投递的同一任务不会覆盖或误确认旧投递
+        self._unacked: Dict[str, Tuple[QueuedTask, UsageTracker]] = {}
+        self._stopping: Optional[asyncio.Event] = None
+
+    def stop(self) -> None:
+        """停止领取新任务，处理中的任务完成并写出后退出"""
+        if self._stopping is not None:
+            self._stopping.set()
+
+    async def run(self, drain: bool = False) -> None:
+        """持续消费直到 stop()；drain 为 True 时队列中没有可见任务即退出（用于测试与一次性回填）"""
+        self._stopping = asyncio.Event()
+        logger.info(f"Worker started on queue {self.queue.name} with concurrency {self.concurrency}")
+        try:
+            await asyncio.gather(*(self._consume(drain) for _ in range(self.concurrency)))
+        finally:
+            for sink in self._sinks.values():
+                await sink.close()
+            self._sinks.clear()
+        logger.info(f"Worker stopped: {self.processed} processed, {self.failed} failed")
+
+    async def _consume(self, drain: bool) -> None:
+        while not self._stopping.is_set():
+            task = await asyncio.to_thread(self.queue.claim)
+            if task is None:
+                if drain:
+                    return
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), self.config.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._process(task)
+
+    def _sink(self, job: str) -> ResultSink:
+        sink = self._sinks.get(job)
+        if sink is None:
+            sink = self._sinks[job] = create_sink(self.output_dir / job, kind=self.sink_kind, per_document=True)
+            sink.add_flush_listener(lambda batch, job=job: self._ack_written(job, batch))
+        return sink
+
+    def _ack_written(self, job: str, batch: List[ResultRecord]) -> None:
+        """写入器落盘一批结果后（工作线程中）确认对应的投递"""
+        for record in batch:
+            pending = self._unacked.pop(record.delivery, None)
+            if pending is not None:
+                task, usage = pending
+                self.queue.ack(task, usage.total)
+
+    async def _heartbeat(self, task: QueuedTask) -> None:
+        while True:
+            await asyncio.sleep(self.config.visibility_timeout / 3)
+            if not await asyncio.to_thread(self.queue.extend, task):
+                logger.warning(f"Lost task {task.task_id} ({task.doc_id} / {task.schema}) to visibility timeout")
+                return
+
+    async def _process(self, task: QueuedTask) -> None:
+        logger.info(f"🚀 {task.job} / {task.doc_id} / {task.schema} (attempt {task.attempts})")
+        heartbeat = asyncio.ensure_future(self._heartbeat(task))
+        try:
+            text = await asyncio.to_thread(self.queue.document, task)
+            if text is None:
+                raise LookupError(f"Document {task.doc_key[:12]} expired from Redis")
+            with usage_scope(name=task.task_id) as usage, scheduling_scope(BATCH, task.job):
+                raw_output, result = await async_extract_result(
+                    text, task.schema, timeout=task.timeout or settings.service_config.default_timeout
+                )
+            delivery = _delivery(task)
+            self._unacked[delivery] = (task, usage)
+            await self._sink(task.job).write(
+                ResultRecord(task.doc_id, task.schema, result.model_dump(mode="json"), raw_output, delivery=delivery)
+            )
+            self.processed += 1
+            logger.info(f"✅ {task.job} / {task.doc_id} / {task.schema} done")
+        except Exception as e:
+            self.failed += 1
+            self._unacked.pop(_delivery(task), None)
+            outcome = await asyncio.to_thread(self.queue.nack, task, str(e))
+            logger.error(f"❌ {task.job} / {task.doc_id} / {task.schema} failed ({outcome}): {str(e)}")
+        finally:
+            heartbeat.cancel()
+
+
+def _set_log_level(level: str) -> None:
+    level = getattr(logging, level.upper(), logging.INFO)
+    for name in list(logging.root.manager.loggerDict):
+        if name.startswith("llm_structured_extract"):
+            logging.getLogger(name).setLevel(level)
+
+
+async def _run_worker(args) -> None:
+    queue = RedisTaskQueue(get_redis_client(args.redis_url), name=args.queue)
+    worker = ExtractionWorker(queue, concurrency=args.concurrency, output_dir=args.output_dir, sink_kind=args.sink)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, worker.stop)
+        except NotImplementedError:
+            pass
+    try:
+        await asyncio.to_thread(warmup_adapters)
+    except Exception as e:
+        logger.warning(f"Adapter warmup failed: {str(e)}")
+    try:
+        await worker.run(drain=args.drain)
+    finally:
+        await aclose_adapters()
+
+
+def _enqueue(args) -> None:
+    queue = RedisTaskQueue(get_redis_client(args.redis_url), name=args.queue)
+    schemas = args.schema or ([settings.service_config.default_schema] if settings.service_config.default_schema else list_available_schemas())
+    total = 0
+    for doc in load_documents(args.input):
+        total += len(queue.enqueue(doc.read(), doc.schemas or schemas, job=args.job, doc_id=doc.doc_id, timeout=args.timeout))
+    print(f"Enqueued {total} tasks for job {args.job} on queue {queue.name}")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Redis-backed distributed extraction workers.")
+    parser.add_argument("--redis-url", default=None, help="Redis URL (default: REDIS_URL).")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def add_queue(p):
+        p.add_argument("-Q", "--queue", default=settings.service_config.task_queue, help="Queue name (default: service.task_queue).")
+
+    p = sub.add_parser("worker", help="Consume tasks until SIGINT / SIGTERM.")
+    add_queue(p)
+    p.add_argument("-l", "--loglevel", default="info", help="Log level.")
+    p.add_argument("-c", "--concurrency", type=int, default=None, help="Concurrent tasks per process (default: worker.concurrency).")
+    p.add_argument("--output-dir", default=None, help="Result root directory (default: worker.output_dir).")
+    p.add_argument("--sink", choices=sorted(SINK_TYPES), default=None, help="Result format (default: result_sink.type).")
+    p.add_argument("--drain", action="store_true", help="Exit once no visible tasks are left.")
+
+    p = sub.add_parser("enqueue", help="Enqueue (document x schema) tasks from a file, directory, glob or JSONL manifest.")
+    add_queue(p)
+    p.add_argument("input")
+    p.add_argument("--job", required=True, help="Job name; results go to <output_dir>/<job>/.")
+    p.add_argument("--schema", action="append", help="Schema to extract. Repeatable (default: service.default_schema or all).")
+    p.add_argument("--timeout", type=float, default=None, help="Per-task deadline in seconds (default: service.default_timeout).")
+
+    p = sub.add_parser("stats", help="Show queue depth and per-job counters.")
+    add_queue(p)
+    p.add_argument("--job", default=None)
+
+    p = sub.add_parser("dead", help="List dead-lettered tasks.")
+    add_queue(p)
+    p.add_argument("--limit", type=int, default=20)
+
+    p = sub.add_parser("redrive", help="Move dead-lettered tasks back onto the queue.")
+    add_queue(p)
+    p.add_argument("--limit", type=int, default=None)
+
+    args = parser.parse_args(argv)
+    if args.command == "worker":
+        _set_log_level(args.loglevel)
+        asyncio.run(_run_worker(args))
+        return
+    if args.command == "enqueue":
+        _enqueue(args)
+        return
+
+    queue = RedisTaskQueue(get_redis_client(args.redis_url), name=args.queue)
+    if args.command == "stats":
+        report = {"queue": queue.name, **queue.stats()}
+        if args.job:
+            report["job"] = {args.job: queue.job_stats(args.job)}
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    elif args.command == "dead":
+        for item in queue.dead_letters(args.limit):
+            print(json.dumps(item, ensure_ascii=False))
+    elif args.command == "redrive":
+        print(f"Requeued {queue.redrive(args.limit)} dead-lettered tasks")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
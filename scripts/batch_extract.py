@@ -6,13 +6,19 @@ import json
 import argparse
 from datetime import datetime
 from pathlib import Path
-from typing import List
+from typing import Dict, List
 
 # 将项目根目录添加到 pythonpath
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from llm_structured_extract import async_extract_to_model
-from llm_structured_extract.core.extract import _get_adapter
+from llm_structured_extract import async_extract_result, warmup_adapters, aclose_adapters
+from llm_structured_extract.config.settings import settings
+from llm_structured_extract.core.batch_inference import BatchTask, run_batch_extraction
+from llm_structured_extract.core.batch_runner import MANIFEST_SUFFIX, BatchRunner, load_documents
+from llm_structured_extract.core.context_cache import ContextCacheLease, get_context_cache_manager
+from llm_structured_extract.core.job_manifest import DONE, JobManifest, renew_leases
+from llm_structured_extract.core.sinks import SINK_TYPES, ResultRecord, ResultSink, create_sink
+from llm_structured_extract.core.usage import UsageTracker, usage_scope
 from llm_structured_extract.utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -29,47 +35,208 @@ CORE_SCHEMAS = [
     "company_performance_and_valuation_view"
 ]
 
-async def process_schema(text: str, schema: str, output_dir: Path, cache_id: str = None):
-    """处理单个 Schema 的提取任务"""
+async def process_schema(text: str, schema: str, sink: ResultSink, cache: ContextCacheLease = None, timeout: float = None,
+                         manifest: JobManifest = None, doc_id: str = None):
+    """处理单个 Schema 的提取任务，结果交给写入器攒批写出；提供任务清单时先领取任务，已完成或被其他进程领取时返回 None"""
+    if manifest and not await asyncio.to_thread(manifest.claim, doc_id, schema):
+        logger.info(f"⏭️ Schema {schema} 已完成或正由其他进程处理，跳过")
+        return None
+
     logger.info(f"🚀 开始提取 Schema: {schema}")
     
-    # 准备输出文件路径
-    raw_md_path = output_dir / "raw_markdown" / f"{schema}.md"
-    json_path = output_dir / "parsed_json" / f"{schema}.json"
-    
     try:
+        # 每次调用前取缓存 ID，临近过期时由管理器先刷新
+        cache_id = await cache.acache_id() if cache else None
+
         # 执行异步提取
-        result_obj = await async_extract_to_model(
+        raw_output, result_obj = await async_extract_result(
             text, 
             schema, 
-            save_raw_to=str(raw_md_path),
-            context_cache_id=cache_id
+            context_cache_id=cache_id,
+            timeout=timeout
         )
         
-        # 保存解析后的 JSON
-        with open(json_path, "w", encoding="utf-8") as f:
-            json.dump(
-                result_obj.model_dump(mode='json'),
-                f,
-                ensure_ascii=False,
-                indent=2
-            )
+        # 原始输出与解析结果交给写入器，落盘后再在任务清单中标记完成
+        await sink.write(ResultRecord(doc_id, schema, result_obj.model_dump(mode='json'), raw_output))
         
         logger.info(f"✅ Schema {schema} 提取完成")
         return True
     except Exception as e:
         logger.error(f"❌ Schema {schema} 提取失败: {str(e)}")
+        if manifest:
+            await asyncio.to_thread(manifest.fail, doc_id, schema, str(e))
         return False
 
+async def save_batch_results(results, sink: ResultSink, manifest: JobManifest = None, doc_id: str = None) -> int:
+    """将离线批量结果交给与在线模式相同的写入器，返回成功数；解析失败的结果只保留原始输出"""
+    success = 0
+    for schema, item in results.items():
+        if not item.ok:
+            logger.error(f"❌ Schema {schema} 提取失败: {item.error}")
+            if manifest:
+                await asyncio.to_thread(manifest.fail, doc_id, schema, str(item.error))
+            if item.markdown is not None:
+                await sink.write(ResultRecord(doc_id, schema, None, item.markdown))
+            continue
+        await sink.write(ResultRecord(doc_id, schema, item.model.model_dump(mode='json'), item.markdown))
+        success += 1
+    return success
+
+def save_usage_report(usage: UsageTracker, output_dir: Path, document: str) -> Path:
+    """写入本次任务的用量报告：总量与各 schema 的 Token、耗时与成本"""
+    path = output_dir / "usage.json"
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"job": usage.name, "document": document, **usage.as_dict()}, f, ensure_ascii=False, indent=2)
+    return path
+
+async def run_batch_api(text: str, sink: ResultSink, job_name: str, manifest: JobManifest = None, doc_id: str = None) -> int:
+    """离线批量模式：整批提交到服务商 Batch 接口，轮询完成后统一解析；只提交清单中领取到的 schema"""
+    schemas = [s for s in CORE_SCHEMAS if not manifest or manifest.claim(doc_id, s)]
+    if not schemas:
+        return 0
+    tasks = [BatchTask(schema, schema, text) for schema in schemas]
+    print("⏳ 已切换到离线批量模式，等待服务商 Batch 任务完成...")
+    try:
+        results = await asyncio.to_thread(run_batch_extraction, tasks, job_name=job_name)
+    except Exception as e:
+        if manifest:
+            for schema in schemas:
+                manifest.fail(doc_id, schema, str(e))
+        raise
+    return await save_batch_results(results, sink, manifest, doc_id)
+
+async def run_online(text: str, sink: ResultSink, args, manifest: JobManifest = None, doc_id: str = None) -> int:
+    """在线模式：并行提取全部 schema，返回成功数"""
+    # 0. 预热适配器（复用同一实例与连接池）
+    try:
+        await asyncio.to_thread(warmup_adapters)
+    except Exception as e:
+        print(f"⚠️ 适配器预热失败: {e}")
+
+    # 1. 如果启用了缓存，按文档内容哈希复用（或创建）Context Cache，8 个 schema 共享同一缓存
+    manager = get_context_cache_manager() if args.use_cache else None
+    cache = None
+    if manager:
+        try:
+            print("⏳ 正在准备 Context Cache (首次创建可能需要几十秒)...")
+            cache = await asyncio.to_thread(manager.acquire, text)
+            cache_id = await cache.acache_id()
+            if cache_id:
+                print(f"✨ Cache 可用: {cache_id}")
+            else:
+                print("⚠️ 该适配器不支持 Context Cache，将按普通模式继续。")
+        except Exception as e:
+            print(f"⚠️ Cache 创建失败: {e}")
+
+    # 2. 并行执行 8 个模型的提取
+    tasks = [
+        process_schema(text, schema, sink, cache, timeout=args.timeout, manifest=manifest, doc_id=doc_id)
+        for schema in CORE_SCHEMAS
+    ]
+    
+    try:
+        results = await asyncio.gather(*tasks)
+    finally:
+        if cache:
+            manager.release(cache)
+        await aclose_adapters()
+    return sum(1 for r in results if r)
+
+def open_manifest(output_dir: Path) -> JobManifest:
+    """打开（或创建）输出目录中的任务清单，同一目录的重新运行与并行进程共享它"""
+    config = settings.batch_runner_config
+    return JobManifest.for_output_dir(output_dir, max_attempts=config.max_attempts, lease_seconds=config.lease_seconds)
+
+def complete_on_flush(sink: ResultSink, manifest: JobManifest) -> None:
+    """结果写出（落盘）后才在任务清单中标记完成，进程中途退出时未写出的任务会被重跑"""
+    def _mark(batch):
+        for record in batch:
+            if record.data is not None:
+                manifest.complete(record.doc_id, record.schema)
+    sink.add_flush_listener(_mark)
+
+def _manifest_line(counts: Dict[str, int]) -> str:
+    return "，".join(f"{status} {count}" for status, count in sorted(counts.items()))
+
+def _parse_limits(values: List[str]) -> Dict[str, int]:
+    limits = {}
+    for value in values or []:
+        provider, _, limit = value.partition("=")
+        limits[provider.strip().lower()] = int(limit)
+    return limits
+
+async def run_many(args) -> None:
+    """多文档模式：目录 / 通配符 / JSONL 清单中的每份文档 × 每个 schema 经有界工作池调度"""
+    documents = load_documents(args.input)
+    if not documents:
+        print(f"Error: No documents found for '{args.input}'.")
+        sys.exit(1)
+
+    config = settings.batch_runner_config.model_copy()
+    if args.concurrency:
+        config.concurrency = args.concurrency
+    config.provider_limits = {**config.provider_limits, **_parse_limits(args.provider_limit)}
+
+    output_dir = Path(args.job_dir) if args.job_dir else Path(args.output_root) / f"batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    manifest = open_manifest(output_dir)
+    print(f"\n{'='*80}")
+    print(f"📚 批量任务启动: {len(documents)} 份文档 × {len(CORE_SCHEMAS)} 个 Schema，全局并发 {config.concurrency}")
+    print(f"📁 输出目录: {output_dir}")
+    print(f"{'='*80}\n")
+
+    sink = create_sink(output_dir, kind=args.sink, per_document=True)
+    runner = BatchRunner(CORE_SCHEMAS, output_dir, config=config, timeout=args.timeout, use_cache=args.use_cache,
+                         manifest=manifest, sink=sink)
+    try:
+        await asyncio.to_thread(warmup_adapters)
+    except Exception as e:
+        print(f"⚠️ 适配器预热失败: {e}")
+    try:
+        summary = await runner.run(documents)
+    finally:
+        await aclose_adapters()
+        manifest.close()
+
+    total = runner.usage.total
+    print(f"\n{'='*80}")
+    print(f"📊 任务总结:")
+    print(f"✅ 任务: {summary['tasks_done'] - summary['tasks_failed']} / {summary['tasks']} 成功（{summary['tasks_skipped']} 个已完成或由其他进程处理），文档 {summary['documents_done']} 份")
+    print(f"🗂️ 任务清单: {_manifest_line(summary['manifest'])}")
+    print(f"⚡ 吞吐: {summary['docs_per_min']} docs/min，{summary['calls_per_min']} calls/min，耗时 {summary['elapsed_seconds']}s")
+    print(f"🧮 Token: 输入 {total.prompt_tokens}（缓存命中 {total.cached_tokens}） / 输出 {total.completion_tokens}，预估成本 {total.cost:.4f}")
+    print(f"📂 所有结果已保存至: {output_dir}")
+    print(f"{'='*80}\n")
+
 async def main():
-    parser = argparse.ArgumentParser(description="Batch extraction for multiple schemas from a single input file.")
-    parser.add_argument("input", help="Path to the input Markdown file.")
+    parser = argparse.ArgumentParser(description="Batch extraction for multiple schemas from one file, a directory, a glob or a JSONL manifest.")
+    parser.add_argument("input", help="Input Markdown file, directory, glob pattern or JSONL manifest.")
     parser.add_argument("--output-root", default="outputs", help="Root directory for outputs.")
     parser.add_argument("--use-cache", action="store_true", help="Enable context caching to save tokens.")
+    parser.add_argument("--timeout", type=float, default=settings.service_config.default_timeout,
+                        help="Per-schema deadline in seconds (default: service.default_timeout in config.yaml).")
+    parser.add_argument("--batch-api", action="store_true",
+                        help="Submit all schemas through the provider batch endpoint (cheaper, non-interactive).")
+    parser.add_argument("--concurrency", type=int, default=None,
+                        help="Global number of concurrent (document x schema) tasks (default: batch_runner.concurrency).")
+    parser.add_argument("--provider-limit", action="append", metavar="PROVIDER=N",
+                        help="Per-provider concurrency limit for multi-document runs, e.g. dashscope=8. Repeatable.")
+    parser.add_argument("--job-dir", default=None,
+                        help="Output directory of a resumable job. Reruns (and parallel processes) with the same directory "
+                             "skip completed tasks and retry failed ones, tracked in its manifest.sqlite3.")
+    parser.add_argument("--sink", choices=sorted(SINK_TYPES), default=None,
+                        help="Result format: per-schema files, rotated JSONL or Parquet (default: result_sink.type).")
     
     args = parser.parse_args()
     
     input_path = Path(args.input)
+    # 目录、通配符或 JSONL 清单：多文档模式
+    if input_path.is_dir() or input_path.suffix.lower() == MANIFEST_SUFFIX or not input_path.exists() and any(c in args.input for c in "*?["):
+        if args.batch_api:
+            print("Error: --batch-api only supports a single input file.")
+            sys.exit(1)
+        await run_many(args)
+        return
+
     if not input_path.exists():
         print(f"Error: Input file '{args.input}' not found.")
         sys.exit(1)
@@ -77,46 +244,53 @@ async def main():
     with open(input_path, 'r', encoding='utf-8') as f:
         text = f.read()
         
-    # 创建本次提取的专用文件夹
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    folder_name = f"extract_{input_path.stem}_{timestamp}"
-    output_dir = Path(args.output_root) / folder_name
+    # 创建本次提取的专用文件夹；--job-dir 指向已有目录时在其中续跑
+    if args.job_dir:
+        output_dir = Path(args.job_dir)
+        folder_name = output_dir.name
+    else:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        folder_name = f"extract_{input_path.stem}_{timestamp}"
+        output_dir = Path(args.output_root) / folder_name
     
-    (output_dir / "raw_markdown").mkdir(parents=True, exist_ok=True)
-    (output_dir / "parsed_json").mkdir(parents=True, exist_ok=True)
+    output_dir.mkdir(parents=True, exist_ok=True)
     
     print(f"\n{'='*80}")
     print(f"📂 任务启动: {input_path.name}")
     print(f"📁 输出目录: {output_dir}")
     print(f"{'='*80}\n")
 
-    # 1. 如果启用了缓存，先创建 Context Cache
-    cache_id = None
-    if args.use_cache:
+    manifest = open_manifest(output_dir)
+    doc_id = input_path.name
+    manifest.register((doc_id, schema) for schema in CORE_SCHEMAS)
+    sink = create_sink(output_dir, kind=args.sink, per_document=False)
+    complete_on_flush(sink, manifest)
+
+    # 所有 LLM 调用的用量（按 schema 分组）汇总到本次任务，结束后写入 usage.json
+    # 运行期间（包括等待 Batch 接口完成）定期为已领取的任务续期
+    heartbeat = asyncio.ensure_future(renew_leases(manifest))
+    with usage_scope(name=folder_name) as usage:
         try:
-            adapter = _get_adapter()
-            print("⏳ 正在创建 Context Cache (可能需要几十秒)...")
-            cache_id = adapter.create_context_cache(text)
-            if cache_id:
-                print(f"✨ Cache 创建成功: {cache_id}")
+            if args.batch_api:
+                success_count = await run_batch_api(text, sink, folder_name, manifest, doc_id)
             else:
-                print("⚠️ 该适配器不支持 Context Cache，将按普通模式继续。")
-        except Exception as e:
-            print(f"⚠️ Cache 创建失败: {e}")
+                success_count = await run_online(text, sink, args, manifest, doc_id)
+        finally:
+            await sink.close()
+            heartbeat.cancel()
+    manifest_counts = manifest.counts()
+    manifest.close()
+    save_usage_report(usage, output_dir, document=input_path.name)
+    total = usage.total
 
-    # 2. 并行执行 8 个模型的提取
-    tasks = [
-        process_schema(text, schema, output_dir, cache_id) 
-        for schema in CORE_SCHEMAS
-    ]
-    
-    results = await asyncio.gather(*tasks)
-    
     # 统计结果
-    success_count = sum(1 for r in results if r)
     print(f"\n{'='*80}")
     print(f"📊 任务总结:")
-    print(f"✅ 成功: {success_count} / {len(CORE_SCHEMAS)}")
+    print(f"✅ 成功: {success_count}（累计完成 {manifest_counts.get(DONE, 0)} / {len(CORE_SCHEMAS)}）")
+    print(f"🗂️ 任务清单: {_manifest_line(manifest_counts)}")
+    print(f"🧮 Token: 输入 {total.prompt_tokens}（缓存命中 {total.cached_tokens}） / 输出 {total.completion_tokens}，预估成本 {total.cost:.4f}")
+    for route, route_usage in sorted(usage.by_route.items()):
+        print(f"   ↳ 路由 {route}: {route_usage.calls} 次调用，平均耗时 {route_usage.as_dict()['avg_latency_seconds']}s，成本 {route_usage.cost:.4f}")
     print(f"📂 所有结果已保存至: {output_dir}")
     print(f"{'='*80}\n")
 
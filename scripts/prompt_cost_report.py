@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+from pathlib import Path
+from typing import Any, Dict, List
+
+# 将项目根目录添加到 pythonpath
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from llm_structured_extract.config.settings import settings
+from llm_structured_extract.core.schema_registry import get_model, list_available_schemas
+from llm_structured_extract.core.prompt_engine import build_prompt, count_fields
+from llm_structured_extract.utils.tokens import estimate_tokens
+
+
+def build_report(text: str, schemas: List[str]) -> List[Dict[str, Any]]:
+    """为每个 Schema 渲染提示词（不调用 LLM），统计体积、字段数、渲染耗时与各提供商的预估成本"""
+    system_tokens = estimate_tokens(settings.get_system_prompt())
+    models = settings.yaml_config.llm.models
+
+    rows = []
+    for schema in schemas:
+        model_cls = get_model(schema)
+
+        start = time.perf_counter()
+        prompt = build_prompt(text, model_cls)
+        render_ms = (time.perf_counter() - start) * 1000
+
+        prompt_tokens = system_tokens + estimate_tokens(prompt)
+        costs = {}
+        for provider, model_config in models.items():
+            # 输出按 max_tokens 计，得到单次调用的成本上限
+            costs[provider] = round(
+                prompt_tokens / 1000 * model_config.input_price_per_1k
+                + model_config.max_tokens / 1000 * model_config.output_price_per_1k,
+                6,
+            )
+
+        rows.append({
+            "schema": schema,
+            "prompt_chars": len(prompt),
+            "prompt_tokens": prompt_tokens,
+            "field_count": count_fields(model_cls),
+            "render_ms": round(render_ms, 2),
+            "cost": costs,
+        })
+    return rows
+
+
+def flag_outliers(rows: List[Dict[str, Any]], ratio: float) -> None:
+    """Token 数超过中位数 ratio 倍的 Schema 标记为异常昂贵"""
+    if not rows:
+        return
+    median = statistics.median(r["prompt_tokens"] for r in rows)
+    for r in rows:
+        r["expensive"] = median > 0 and r["prompt_tokens"] > median * ratio
+
+
+def print_table(rows: List[Dict[str, Any]]) -> None:
+    providers = sorted({p for r in rows for p in r["cost"]})
+    header = f"{'schema':<45}{'chars':>9}{'tokens':>9}{'fields':>8}{'render_ms':>11}"
+    header += "".join(f"{'cost:' + p:>18}" for p in providers)
+    print(header)
+    print("-" * len(header))
+    for r in rows:
+        line = f"{r['schema']:<45}{r['prompt_chars']:>9}{r['prompt_tokens']:>9}{r['field_count']:>8}{r['render_ms']:>11.2f}"
+        line += "".join(f"{r['cost'].get(p, 0.0):>18.4f}" for p in providers)
+        if r.get("expensive"):
+            line += "  ⚠️"
+        print(line)
+    print("-" * len(header))
+    total = f"{'TOTAL':<45}{sum(r['prompt_chars'] for r in rows):>9}{sum(r['prompt_tokens'] for r in rows):>9}"
+    total += f"{sum(r['field_count'] for r in rows):>8}{sum(r['render_ms'] for r in rows):>11.2f}"
+    total += "".join(f"{sum(r['cost'].get(p, 0.0) for r in rows):>18.4f}" for p in providers)
+    print(total)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render prompts for all schemas without calling the LLM and report size and projected cost.")
+    parser.add_argument("input", help="Path to the input Markdown file.")
+    parser.add_argument("--schemas", nargs="*", help="Schemas to include. Defaults to all registered top-level schemas.")
+    parser.add_argument("--sort", choices=["schema", "prompt_tokens", "render_ms"], default="prompt_tokens", help="Sort key for the report.")
+    parser.add_argument("--outlier-ratio", type=float, default=1.5, help="Flag schemas whose prompt tokens exceed the median by this ratio.")
+    parser.add_argument("--json", action="store_true", help="Output the report as JSON.")
+
+    args = parser.parse_args()
+
+    input_path = Path(args.input)
+    if not input_path.exists():
+        print(f"Error: Input file '{args.input}' not found.")
+        sys.exit(1)
+
+    text = input_path.read_text(encoding="utf-8")
+    # 注册表中也包含嵌套子模型，只有定义了业务骨架的顶层 Schema 才能构建提示词
+    schemas = args.schemas or [
+        name for name in list_available_schemas()
+        if getattr(get_model(name), "__business_architecture__", "").strip()
+    ]
+
+    rows = build_report(text, schemas)
+    flag_outliers(rows, args.outlier_ratio)
+    rows.sort(key=lambda r: r[args.sort], reverse=args.sort != "schema")
+
+    if args.json:
+        print(json.dumps(rows, ensure_ascii=False, indent=2))
+    else:
+        print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
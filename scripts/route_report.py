@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import glob
+import json
+import argparse
+from typing import Any, Dict, List
+
+# 将项目根目录添加到 pythonpath
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from llm_structured_extract.core.usage import TokenUsage
+
+
+def aggregate(paths: List[str]) -> Dict[str, TokenUsage]:
+    """合并多个 usage.json 的 by_route 统计：路由 -> 累计用量"""
+    routes: Dict[str, TokenUsage] = {}
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            report = json.load(f)
+        for route, u in report.get("by_route", {}).items():
+            routes.setdefault(route, TokenUsage()).add(TokenUsage(
+                prompt_tokens=u["prompt_tokens"],
+                completion_tokens=u["completion_tokens"],
+                cached_tokens=u["cached_tokens"],
+                latency=u["latency_seconds"],
+                cost=u["cost"],
+                calls=u["calls"],
+            ))
+    return routes
+
+
+def print_table(routes: Dict[str, TokenUsage]) -> None:
+    header = f"{'route':<28}{'calls':>8}{'prompt':>12}{'cached':>12}{'completion':>12}{'avg_s':>9}{'cost':>12}{'cost/call':>12}"
+    print(header)
+    print("-" * len(header))
+    total = TokenUsage()
+    for route, u in sorted(routes.items(), key=lambda kv: kv[1].cost, reverse=True):
+        total.add(u)
+        print(_row(route, u))
+    print("-" * len(header))
+    print(_row("TOTAL", total))
+
+
+def _row(name: str, u: TokenUsage) -> str:
+    d = u.as_dict()
+    per_call = u.cost / u.calls if u.calls else 0.0
+    return (
+        f"{name:<28}{u.calls:>8}{u.prompt_tokens:>12}{u.cached_tokens:>12}{u.completion_tokens:>12}"
+        f"{d['avg_latency_seconds']:>9.2f}{u.cost:>12.4f}{per_call:>12.4f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aggregate latency and cost by model route from batch_extract usage reports.")
+    parser.add_argument("reports", nargs="*", help="usage.json files. Defaults to outputs/*/usage.json.")
+    parser.add_argument("--json", action="store_true", help="Output the report as JSON.")
+
+    args = parser.parse_args()
+    paths = args.reports or sorted(glob.glob(os.path.join("outputs", "*", "usage.json")))
+    if not paths:
+        print("Error: no usage.json reports found.")
+        sys.exit(1)
+
+    routes = aggregate(paths)
+    if args.json:
+        print(json.dumps({route: u.as_dict() for route, u in routes.items()}, ensure_ascii=False, indent=2))
+    else:
+        print(f"📄 汇总 {len(paths)} 份用量报告\n")
+        print_table(routes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+from typing import Optional, Type
+
+import pytest
+
+from llm_structured_extract.config.settings import settings
+from llm_structured_extract.core import adapter_manager
+from llm_structured_extract.core.llm_adapters.base_adapter import ADAPTER_REGISTRY, BaseAdapter
+
+
+@pytest.fixture
+def fake_adapter(monkeypatch):
+    """把提供商（默认 LLM_PROVIDER）替换为测试替身适配器并关闭重试；前后清空已创建的适配器实例。
+    用法：fake_adapter(AdapterClass, provider=None)"""
+
+    def _install(adapter_cls: Type[BaseAdapter], provider: Optional[str] = None) -> Type[BaseAdapter]:
+        monkeypatch.setitem(ADAPTER_REGISTRY, (provider or settings.LLM_PROVIDER).lower(), adapter_cls)
+        adapter_manager.close_adapters()
+        return adapter_cls
+
+    monkeypatch.setattr(settings.retry_config, "enabled", False)
+    adapter_manager.close_adapters()
+    yield _install
+    adapter_manager.close_adapters()
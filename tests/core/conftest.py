@@ -0,0 +1,86 @@
+import json
+import threading
+import types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Tuple
+
+import pytest
+
+
+class StubServer:
+    """本地 HTTP 替身服务：handler(method, path, headers, body) -> (status, headers, body)，
+    body 为 bytes / str / dict，或 bytes 列表 / 生成器（分块逐段写出，用于流式响应）"""
+
+    def __init__(self, handler: Callable):
+        self.handler = handler
+        self.requests: List[Dict] = []
+        self.client_addresses: List[Tuple[str, int]] = []
+        stub = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _dispatch(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                stub.client_addresses.append(self.client_address)
+                stub.requests.append({"method": self.command, "path": self.path, "headers": {k.lower(): v for k, v in self.headers.items()}, "body": raw})
+                status, headers, body = stub.handler(self.command, self.path, self.headers, raw)
+
+                if isinstance(body, types.GeneratorType) or (isinstance(body, list) and body and isinstance(body[0], bytes)):
+                    self.send_response(status)
+                    for k, v in (headers or {}).items():
+                        self.send_header(k, v)
+                    self.send_header("Transfer-Encoding", "chunked")
+                    self.end_headers()
+                    for chunk in body:
+                        self.wfile.write(f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n")
+                        self.wfile.flush()
+                    self.wfile.write(b"0\r\n\r\n")
+                    return
+
+                if isinstance(body, (dict, list)):
+                    body = json.dumps(body).encode("utf-8")
+                    headers = {"Content-Type": "application/json", **(headers or {})}
+                elif isinstance(body, str):
+                    body = body.encode("utf-8")
+                self.send_response(status)
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_GET = _dispatch
+            do_POST = _dispatch
+            do_DELETE = _dispatch
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self._server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+@pytest.fixture
+def stub_http_server():
+    servers = []
+
+    def _start(handler: Callable) -> StubServer:
+        server = StubServer(handler).start()
+        servers.append(server)
+        return server
+
+    yield _start
+    for server in servers:
+        server.stop()
@@ -0,0 +1,43 @@
+import dashscope
+
+from llm_structured_extract.core import adapter_manager
+from llm_structured_extract.core.llm_adapters.base_adapter import ADAPTER_REGISTRY
+from llm_structured_extract.core.llm_adapters.dashscope_adapter import DashScopeAdapter
+
+
+class _CountingAdapter:
+    instances = 0
+
+    def __init__(self):
+        type(self).instances += 1
+        self.warmed = self.closed = False
+
+    def warmup(self):
+        self.warmed = True
+
+    def close(self):
+        self.closed = True
+
+
+def test_get_adapter_reuses_instance_until_closed(monkeypatch):
+    monkeypatch.setitem(ADAPTER_REGISTRY, "counting", _CountingAdapter)
+    adapter_manager.close_adapters()
+
+    first = adapter_manager.get_adapter("counting")
+    assert adapter_manager.get_adapter("COUNTING") is first
+    assert _CountingAdapter.instances == 1
+
+    adapter_manager.warmup_adapters(["counting"])
+    assert first.warmed
+
+    adapter_manager.close_adapters()
+    assert first.closed
+    assert adapter_manager.get_adapter("counting") is not first
+
+
+def test_dashscope_adapter_does_not_mutate_global_api_key(monkeypatch):
+    monkeypatch.setattr(dashscope, "api_key", "global-key")
+    adapter = DashScopeAdapter(model="qwen-test", api_key="instance-key")
+
+    assert dashscope.api_key == "global-key"
+    assert adapter._prepare_params("prompt")["api_key"] == "instance-key"
@@ -0,0 +1,77 @@
+import json
+import re
+
+from llm_structured_extract.config.settings import BatchInferenceConfig
+from llm_structured_extract.core.batch_inference import BatchInferenceClient, BatchTask, run_batch_extraction
+from llm_structured_extract.core.exceptions import RateLimitError
+
+
+class _BatchStub:
+    """模拟 OpenAI 兼容的 Files / Batches 接口：首次轮询返回 in_progress，之后 completed"""
+
+    def __init__(self):
+        self.uploaded = []
+        self.polls = 0
+
+    def _batch(self, status):
+        batch = {
+            "id": "batch_1", "object": "batch", "endpoint": "/v1/chat/completions",
+            "input_file_id": "file-in", "completion_window": "24h", "created_at": 0, "status": status,
+        }
+        if status == "completed":
+            batch["output_file_id"] = "file-out"
+        return batch
+
+    def __call__(self, method, path, headers, body):
+        if method == "POST" and path == "/v1/files":
+            self.uploaded = [json.loads(line) for line in re.findall(rb'^\{"custom_id".*$', body, re.M)]
+            return 200, {}, {"id": "file-in", "object": "file", "bytes": len(body), "created_at": 0,
+                             "filename": "input.jsonl", "purpose": "batch", "status": "processed"}
+        if method == "POST" and path == "/v1/batches":
+            return 200, {}, self._batch("validating")
+        if method == "GET" and path == "/v1/batches/batch_1":
+            self.polls += 1
+            return 200, {}, self._batch("in_progress" if self.polls == 1 else "completed")
+        if method == "GET" and path == "/v1/files/file-out/content":
+            lines = []
+            for request in self.uploaded:
+                custom_id = request["custom_id"]
+                if custom_id == "doc1:throttled":
+                    response = {"status_code": 429, "body": {"error": {"message": "rate limited"}}}
+                else:
+                    content = "```markdown\n# 公司基本信息\n```"
+                    response = {"status_code": 200, "body": {
+                        "choices": [{"message": {"role": "assistant", "content": content}}],
+                        "usage": {"prompt_tokens": 900, "completion_tokens": 120, "prompt_tokens_details": {"cached_tokens": 0}},
+                    }}
+                lines.append(json.dumps({"id": "r", "custom_id": custom_id, "response": response, "error": None}))
+            return 200, {"Content-Type": "application/jsonl"}, "\n".join(lines)
+        return 404, {}, {"error": {"message": f"unexpected {method} {path}"}}
+
+
+def test_batch_extraction_round_trip(stub_http_server, tmp_path):
+    stub = _BatchStub()
+    server = stub_http_server(stub)
+    client = BatchInferenceClient(
+        provider="openai", api_key="test-key", base_url=f"{server.url}/v1",
+        config=BatchInferenceConfig(provider="openai", poll_interval=0.0, max_wait=5.0),
+    )
+    tasks = [
+        BatchTask("doc1:company_basic_view", "company_basic_view", "某公司成立于2015年。"),
+        BatchTask("doc1:throttled", "company_basic_view", "某公司成立于2016年。"),
+    ]
+
+    results = run_batch_extraction(tasks, job_name="nightly", work_dir=tmp_path, client=client)
+
+    # 输入文件按 build_prompt 生成，一行一个 chat/completions 请求
+    assert [r["custom_id"] for r in stub.uploaded] == ["doc1:company_basic_view", "doc1:throttled"]
+    assert stub.uploaded[0]["url"] == "/v1/chat/completions"
+    assert "某公司成立于2015年。" in stub.uploaded[0]["body"]["messages"][-1]["content"]
+    assert (tmp_path / "nightly" / "input.jsonl").exists()
+    assert stub.polls == 2
+
+    ok = results["doc1:company_basic_view"]
+    assert ok.ok and ok.markdown.startswith("```markdown")
+    assert type(ok.model).__name__ == "CompanyBasicView"
+    assert (ok.usage.prompt_tokens, ok.usage.completion_tokens) == (900, 120)
+    assert isinstance(results["doc1:throttled"].error, RateLimitError)
@@ -0,0 +1,117 @@
+import asyncio
+import json
+
+from llm_structured_extract.config.settings import BatchRunnerConfig, ModelConfig, RouteRule, RoutingConfig, settings
+from llm_structured_extract.core import extract
+from llm_structured_extract.core.batch_runner import BatchRunner, Document, load_documents
+from llm_structured_extract.core.llm_adapters.base_adapter import BaseAdapter
+from llm_structured_extract.core.usage import record_usage
+
+
+class _PeakAdapter(BaseAdapter):
+    inflight = 0
+    peak = 0
+
+    def __init__(self, model=None):
+        self.model = model or "fake"
+
+    def generate_text(self, prompt, context_cache_id=None):
+        raise NotImplementedError
+
+    async def agenerate_text(self, prompt, context_cache_id=None):
+        cls = type(self)
+        cls.inflight += 1
+        cls.peak = max(cls.peak, cls.inflight)
+        try:
+            await asyncio.sleep(0.02)
+        finally:
+            cls.inflight -= 1
+        if "坏文档" in prompt:
+            raise RuntimeError("boom")
+        record_usage("fake", self.model, prompt_tokens=100, completion_tokens=10)
+        return "# 公司基本信息\n## 公司名称\n测试公司"
+
+
+def test_load_documents_from_directory_glob_and_manifest(tmp_path):
+    (tmp_path / "docs" / "sub").mkdir(parents=True)
+    (tmp_path / "docs" / "a.md").write_text("A", encoding="utf-8")
+    (tmp_path / "docs" / "sub" / "b.txt").write_text("B", encoding="utf-8")
+    (tmp_path / "docs" / "ignored.pdf").write_text("x", encoding="utf-8")
+    manifest = tmp_path / "manifest.jsonl"
+    manifest.write_text(
+        json.dumps({"id": "first", "path": "docs/a.md"}) + "\n\n"
+        + json.dumps({"id": "inline", "text": "内联文本", "schemas": ["company_basic_view"]}) + "\n",
+        encoding="utf-8",
+    )
+
+    assert [d.doc_id for d in load_documents(tmp_path / "docs")] == ["a", "sub__b"]
+    assert [d.doc_id for d in load_documents(str(tmp_path / "docs" / "*.md"))] == ["a"]
+    docs = load_documents(manifest)
+    assert [d.read() for d in docs] == ["A", "内联文本"]
+    assert docs[1].schemas == ["company_basic_view"]
+
+
+def test_runner_bounds_concurrency_and_reports_throughput(tmp_path, fake_adapter):
+    provider = settings.LLM_PROVIDER.lower()
+    fake_adapter(_PeakAdapter)
+    _PeakAdapter.peak = 0
+
+    docs_dir = tmp_path / "docs"
+    docs_dir.mkdir()
+    for i in range(4):
+        (docs_dir / f"doc{i}.md").write_text(f"第{i}家公司成立于201{i}年。", encoding="utf-8")
+    (docs_dir / "doc_bad.md").write_text("坏文档", encoding="utf-8")
+
+    schemas = ["company_basic_view", "company_industry_view"]
+    config = BatchRunnerConfig(concurrency=4, provider_limits={provider: 2}, report_interval=0.01)
+    runner = BatchRunner(schemas, tmp_path / "out", config=config)
+    summary = asyncio.run(runner.run(load_documents(docs_dir)))
+
+    assert _PeakAdapter.peak == 2
+    assert (summary["documents_done"], summary["tasks_done"], summary["tasks_failed"]) == (5, 10, 2)
+    assert summary["failed"] == {"doc_bad": schemas}
+    assert summary["docs_per_min"] > 0 and summary["calls_per_min"] > 0
+    assert summary["total"]["calls"] == 8
+    assert (tmp_path / "out" / "doc0" / "parsed_json" / "company_industry_view.json").exists()
+    doc_usage = json.loads((tmp_path / "out" / "doc0" / "usage.json").read_text(encoding="utf-8"))
+    assert doc_usage["total"]["prompt_tokens"] == 200
+
+
+def test_limited_provider_does_not_block_other_routes(tmp_path, monkeypatch, fake_adapter):
+    completed = []
+
+    class _Routed(BaseAdapter):
+        def __init__(self, model=None):
+            self.model = model or "fast"
+
+        def generate_text(self, prompt, context_cache_id=None):
+            raise NotImplementedError
+
+        async def agenerate_text(self, prompt, context_cache_id=None):
+            await asyncio.sleep(0.1 if self.model == "slow" else 0.01)
+            completed.append(self.model)
+            return "# 公司基本信息\n## 公司名称\n测试公司"
+
+    rules = [
+        RouteRule(name="slow", schemas=["company_financial_analysis_view"], provider="limited", model="slow"),
+        RouteRule(name="fast", provider="routed", model="fast"),
+    ]
+    fake_adapter(_Routed, provider="limited")
+    fake_adapter(_Routed, provider="routed")
+    monkeypatch.setitem(settings.yaml_config.llm.models, "limited", ModelConfig())
+    monkeypatch.setitem(settings.yaml_config.llm.models, "routed", ModelConfig())
+    monkeypatch.setattr(settings.yaml_config, "routing", RoutingConfig(enabled=True, rules=rules))
+
+    renders = []
+    monkeypatch.setattr(extract, "async_build_prompt", lambda *args: renders.append(args))
+
+    documents = [Document(f"doc{i}", text=f"第{i}家公司成立于201{i}年。") for i in range(3)]
+    schemas = ["company_financial_analysis_view", "company_basic_view"]
+    config = BatchRunnerConfig(concurrency=2, provider_limits={"limited": 1}, report_interval=60)
+    summary = asyncio.run(BatchRunner(schemas, tmp_path / "out", config=config).run(documents))
+
+    assert summary["tasks_done"] == 6 and not summary["failed"]
+    # 受限提供商排队时不占用全局槽位，其他路由的任务先全部完成
+    assert completed[:4] == ["fast", "fast", "fast", "slow"]
+    # 为路由渲染的提示词直接用于调用，不再重复渲染
+    assert renders == []
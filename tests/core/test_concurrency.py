@@ -0,0 +1,66 @@
+import asyncio
+
+from llm_structured_extract.config.settings import AdaptiveConcurrencyConfig
+from llm_structured_extract.core import concurrency
+from llm_structured_extract.core.concurrency import AdaptiveConcurrencyAdapter, AdaptiveConcurrencyLimiter, get_concurrency_limiter
+from llm_structured_extract.core.exceptions import RateLimitError
+from llm_structured_extract.utils.metrics import metrics
+
+
+def test_window_grows_on_healthy_calls_and_halves_on_throttling():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=4, max_limit=16, cooldown=0.0)
+
+    for _ in range(20):
+        limiter.record(0.1)
+    grown = limiter.limit
+    assert grown > 4
+
+    limiter.record(0.1, RateLimitError("429"))
+    assert limiter.limit == int(grown * 0.5)
+
+    # 延迟显著高于基线同样视为拥塞
+    before = limiter.limit
+    limiter.record(5.0)
+    assert limiter.limit < before
+
+
+def test_adapter_caps_inflight_and_exposes_queue_metrics(monkeypatch):
+    monkeypatch.setattr(concurrency, "_LIMITERS", {})
+    limiter = get_concurrency_limiter("test-aimd", AdaptiveConcurrencyConfig(initial_limit=2, max_limit=2))
+    gauge = 'llm_concurrency_queue_depth{provider="test-aimd"}'
+    peak = {"inflight": 0, "queue": 0}
+
+    class _SlowAdapter:
+        async def agenerate_text(self, prompt, context_cache_id=None):
+            peak["inflight"] = max(peak["inflight"], limiter.inflight)
+            peak["queue"] = max(peak["queue"], metrics.snapshot()[gauge])
+            await asyncio.sleep(0.02)
+            return prompt
+
+    # 不显式传入 limiter：适配器与上面取得的是同一个进程内共享限制器
+    adapter = AdaptiveConcurrencyAdapter(_SlowAdapter(), provider="test-aimd")
+    assert adapter.limiter is limiter
+
+    async def _run():
+        return await asyncio.gather(*[adapter.agenerate_text(str(i)) for i in range(6)])
+
+    assert asyncio.run(_run()) == [str(i) for i in range(6)]
+    assert peak["inflight"] == 2
+    assert peak["queue"] >= 1
+    assert limiter.inflight == 0
+    assert metrics.snapshot()[gauge] == 0
+
+
+def test_latency_baseline_is_kept_per_schema():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=4, max_limit=16, cooldown=0.0)
+    for _ in range(20):
+        limiter.record(0.1, key="small_view")
+    grown = limiter.limit
+
+    # 字段多的 schema 正常就慢，不应与小 schema 的基线比较而被视为拥塞
+    for _ in range(5):
+        limiter.record(3.0, key="large_view")
+    assert limiter.limit >= grown
+
+    limiter.record(3.0, key="small_view")
+    assert limiter.limit < grown
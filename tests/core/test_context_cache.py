@@ -0,0 +1,108 @@
+import asyncio
+import threading
+import time
+
+from llm_structured_extract.config.settings import ContextCacheConfig
+from llm_structured_extract.core.context_cache import ContextCacheManager
+from llm_structured_extract.core.llm_adapters.base_adapter import BaseAdapter
+
+
+class _CacheAdapter(BaseAdapter):
+    model = "qwen-test"
+
+    def __init__(self, delay=0.0):
+        self.created = []
+        self.delay = delay
+        self._lock = threading.Lock()
+
+    def generate_text(self, prompt, context_cache_id=None):
+        raise NotImplementedError
+
+    async def agenerate_text(self, prompt, context_cache_id=None):
+        raise NotImplementedError
+
+    def create_context_cache(self, text, ttl_seconds=3600):
+        time.sleep(self.delay)
+        with self._lock:
+            self.created.append(ttl_seconds)
+            return f"cache-{len(self.created)}"
+
+
+def _manager(tmp_path, adapter, **overrides):
+    config = ContextCacheConfig(**{"ttl_seconds": 3600, "refresh_margin": 300, **overrides})
+    return ContextCacheManager(adapter=adapter, provider="dashscope", config=config, path=str(tmp_path / "index.json"))
+
+
+def test_parallel_users_share_one_cache_and_reruns_reuse_it(tmp_path):
+    adapter = _CacheAdapter(delay=0.05)
+    manager = _manager(tmp_path, adapter)
+
+    async def _run():
+        async def _user():
+            async with manager.alease("同一份文档") as lease:
+                assert manager.refcount("同一份文档") >= 1
+                return await lease.acache_id()
+        return await asyncio.gather(*(_user() for _ in range(8)))
+
+    assert set(asyncio.run(_run())) == {"cache-1"}
+    assert len(adapter.created) == 1
+    assert manager.refcount("同一份文档") == 0
+
+    # 新进程从本地映射恢复，不再重新创建
+    rerun = _manager(tmp_path, adapter)
+    with rerun.lease("同一份文档") as lease:
+        assert lease.cache_id == "cache-1"
+    with rerun.lease("另一份文档") as lease:
+        assert lease.cache_id == "cache-2"
+    assert len(adapter.created) == 2
+
+
+def test_refreshes_before_expiry(tmp_path):
+    adapter = _CacheAdapter()
+    # 有效期小于提前刷新余量：每次读取都视为即将过期
+    manager = _manager(tmp_path, adapter, ttl_seconds=10, refresh_margin=30)
+    with manager.lease("文档") as lease:
+        assert lease.cache_id == "cache-2"
+        assert lease.cache_id == "cache-3"
+    assert adapter.created == [10, 10, 10]
+
+
+def test_unsupported_adapter_is_not_retried(tmp_path):
+    class _NoCache(_CacheAdapter):
+        def create_context_cache(self, text, ttl_seconds=3600):
+            self.created.append(ttl_seconds)
+            return None
+
+    adapter = _NoCache()
+    manager = _manager(tmp_path, adapter)
+    with manager.lease("文档") as lease:
+        assert lease.cache_id is None
+    assert len(adapter.created) == 1
+    assert not (tmp_path / "index.json").exists()
+
+
+def test_leased_caches_are_refreshed_and_released_ones_dropped(tmp_path, monkeypatch):
+    adapter = _CacheAdapter()
+    manager = _manager(tmp_path, adapter)
+    held = manager.acquire("使用中的文档")
+    with manager.lease("已释放的文档"):
+        pass
+    assert adapter.created == [3600, 3600]
+
+    now = time.time()
+    # 两个缓存都进入提前刷新余量：只有仍有使用者的会被主动刷新
+    monkeypatch.setattr(time, "time", lambda: now + 3400)
+    assert manager.refresh_leased() == 1
+    assert len(adapter.created) == 3
+    assert held.cache_id == "cache-3"
+
+    # 未刷新的缓存已过期且无使用者：登记新文档时从内存中移除
+    monkeypatch.setattr(time, "time", lambda: now + 3700)
+    with manager.lease("新文档"):
+        assert len(manager._entries) == 2
+    assert len(adapter.created) == 4
+
+    # 仍被使用的缓存过期后，最后一个使用者释放时随之移除
+    monkeypatch.setattr(time, "time", lambda: now + 7400)
+    manager.release(held)
+    assert len(manager._entries) == 1
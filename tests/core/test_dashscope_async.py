@@ -0,0 +1,34 @@
+import asyncio
+
+import pytest
+
+from llm_structured_extract.core.exceptions import LLMCallError
+from llm_structured_extract.core.llm_adapters.dashscope_adapter import DashScopeAdapter, GENERATION_PATH
+
+
+def _ok_handler(method, path, headers, body):
+    return 200, {}, {"output": {"choices": [{"message": {"role": "assistant", "content": "# 标题\n内容"}}]}}
+
+
+def test_agenerate_text_reuses_pooled_connection(stub_http_server):
+    server = stub_http_server(_ok_handler)
+    adapter = DashScopeAdapter(model="qwen-test", api_key="test-key", base_url=f"{server.url}/api/v1")
+
+    async def _run():
+        return [await adapter.agenerate_text("prompt") for _ in range(3)]
+
+    results = asyncio.run(_run())
+
+    assert results == ["# 标题\n内容"] * 3
+    assert server.requests[0]["path"] == f"/api/v1{GENERATION_PATH}"
+    assert server.requests[0]["headers"]["authorization"] == "Bearer test-key"
+    # Keep-Alive：三次请求复用同一条 TCP 连接
+    assert len(set(server.client_addresses)) == 1
+
+
+def test_agenerate_text_raises_on_error_status(stub_http_server):
+    server = stub_http_server(lambda *a: (429, {}, {"code": "Throttling", "message": "Requests rate limit exceeded"}))
+    adapter = DashScopeAdapter(model="qwen-test", api_key="test-key", base_url=server.url)
+
+    with pytest.raises(LLMCallError, match="429"):
+        asyncio.run(adapter.agenerate_text("prompt"))
@@ -0,0 +1,79 @@
+import asyncio
+import time
+
+import pytest
+
+from llm_structured_extract.config.settings import RetryConfig
+from llm_structured_extract.core.deadline import deadline_scope, remaining, run_with_deadline
+from llm_structured_extract.core.exceptions import DeadlineExceededError, TransientLLMError
+from llm_structured_extract.core.llm_adapters.base_adapter import BaseAdapter
+from llm_structured_extract.core.llm_adapters.dashscope_adapter import DashScopeAdapter
+from llm_structured_extract.core.rate_limit import RateLimitedAdapter, RateLimiter
+from llm_structured_extract.core.retry import RetryBudget, RetryingAdapter
+
+
+def test_nested_scope_cannot_extend_outer_deadline():
+    with deadline_scope(1.0):
+        with deadline_scope(10.0):
+            assert remaining() <= 1.0
+        with deadline_scope(0.1):
+            assert remaining() <= 0.1
+    assert remaining() is None
+
+
+def test_deadline_cancels_in_flight_http_request(stub_http_server):
+    def _slow_handler(method, path, headers, body):
+        time.sleep(1.5)
+        return 200, {}, {"output": {"choices": [{"message": {"content": "late"}}]}}
+
+    server = stub_http_server(_slow_handler)
+    adapter = DashScopeAdapter(model="qwen-test", api_key="test-key", base_url=server.url)
+
+    async def _run():
+        with deadline_scope(0.2):
+            return await run_with_deadline(adapter.agenerate_text("prompt"))
+
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceededError):
+        asyncio.run(_run())
+    assert time.monotonic() - start < 1.0
+
+
+class _AlwaysTransient(BaseAdapter):
+    def __init__(self):
+        self.calls = 0
+
+    def generate_text(self, prompt, context_cache_id=None):
+        self.calls += 1
+        raise TransientLLMError("503")
+
+    async def agenerate_text(self, prompt, context_cache_id=None):
+        raise NotImplementedError
+
+
+def test_retry_backoff_is_capped_by_deadline():
+    inner = _AlwaysTransient()
+    config = RetryConfig(max_attempts=10, initial_backoff=5.0, max_backoff=5.0)
+    adapter = RetryingAdapter(inner, config=config, budget=RetryBudget(max_tokens=10))
+
+    start = time.monotonic()
+    with deadline_scope(0.2), pytest.raises(TransientLLMError):
+        adapter.generate_text("prompt")
+    assert time.monotonic() - start < 1.0
+    assert inner.calls < 10
+
+
+def test_rate_limit_wait_beyond_deadline_is_dropped_and_refunded():
+    inner = _AlwaysTransient()
+    limiter = RateLimiter(rpm=60)  # 每秒补充 1 个请求配额
+    adapter = RateLimitedAdapter(inner, provider="dashscope", limiter=limiter)
+    for _ in range(60):
+        limiter.reserve(0)  # 耗尽请求配额，下一次需等待约 1 秒
+
+    start = time.monotonic()
+    with deadline_scope(0.3), pytest.raises(DeadlineExceededError):
+        adapter.generate_text("prompt")
+    assert time.monotonic() - start < 0.1
+    assert inner.calls == 0
+    # 被放弃的调用已归还配额，不影响后续请求的排队时间
+    assert limiter.reserve(0) <= 1.1
@@ -0,0 +1,76 @@
+import asyncio
+import time
+
+import pytest
+
+from llm_structured_extract.config.settings import FailoverConfig
+from llm_structured_extract.core.circuit_breaker import CLOSED, OPEN
+from llm_structured_extract.core.exceptions import TransientLLMError
+from llm_structured_extract.core.llm_adapters.base_adapter import ADAPTER_REGISTRY
+from llm_structured_extract.core.llm_adapters.failover_adapter import FailoverAdapter
+
+
+def _make_adapter(name, calls, fail):
+    class _Adapter:
+        model = name
+
+        def generate_text(self, prompt, context_cache_id=None):
+            calls.append(name)
+            if fail["on"]:
+                raise TransientLLMError(f"{name} 503")
+            return name
+
+    return _Adapter
+
+
+def test_failover_opens_circuit_and_probes_for_recovery(monkeypatch):
+    calls = []
+    primary_fail = {"on": True}
+    monkeypatch.setitem(ADAPTER_REGISTRY, "fo_primary", _make_adapter("fo_primary", calls, primary_fail))
+    monkeypatch.setitem(ADAPTER_REGISTRY, "fo_backup", _make_adapter("fo_backup", calls, {"on": False}))
+    config = FailoverConfig(failure_threshold=2, recovery_timeout=0.05)
+
+    router = FailoverAdapter(providers=["fo_primary", "fo_backup"], config=config)
+    primary_breaker = router.routes[0][2]
+
+    assert [router.generate_text("p") for _ in range(3)] == ["fo_backup"] * 3
+    # 两次失败后熔断，第三次请求直接走备用提供商
+    assert calls == ["fo_primary", "fo_backup", "fo_primary", "fo_backup", "fo_backup"]
+    assert primary_breaker.state == OPEN
+
+    primary_fail["on"] = False
+    time.sleep(0.06)
+    assert router.generate_text("p") == "fo_primary"
+    assert primary_breaker.state == CLOSED
+
+
+def test_cancelled_half_open_probe_releases_slot(monkeypatch):
+    state = {"hang": True}
+
+    class _Primary:
+        model = "fo_probe"
+
+        def generate_text(self, prompt, context_cache_id=None):
+            raise TransientLLMError("503")
+
+        async def agenerate_text(self, prompt, context_cache_id=None):
+            if state["hang"]:
+                await asyncio.sleep(10)
+            return "fo_probe"
+
+    monkeypatch.setitem(ADAPTER_REGISTRY, "fo_probe", _Primary)
+    monkeypatch.setitem(ADAPTER_REGISTRY, "fo_probe_backup", _make_adapter("fo_probe_backup", [], {"on": False}))
+    config = FailoverConfig(failure_threshold=1, recovery_timeout=0.01)
+    router = FailoverAdapter(providers=["fo_probe", "fo_probe_backup"], config=config)
+    breaker = router.routes[0][2]
+
+    assert router.generate_text("p") == "fo_probe_backup"
+    assert breaker.state == OPEN
+    time.sleep(0.02)
+
+    # 半开探测被取消（如截止时间到）后，下一次请求仍能获得探测名额
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(asyncio.wait_for(router.agenerate_text("p"), 0.01))
+    state["hang"] = False
+    assert asyncio.run(router.agenerate_text("p")) == "fo_probe"
+    assert breaker.state == CLOSED
@@ -0,0 +1,102 @@
+import asyncio
+import time
+
+from llm_structured_extract.config.settings import HedgingConfig
+from llm_structured_extract.core.hedging import HedgeBudget, HedgingAdapter, LatencyTracker
+from llm_structured_extract.core.llm_adapters.base_adapter import BaseAdapter
+from llm_structured_extract.core.request_context import request_scope
+
+
+class _DelayAdapter(BaseAdapter):
+    def __init__(self, name, delays):
+        self.name = name
+        self.delays = list(delays)
+        self.cancelled = 0
+
+    def generate_text(self, prompt, context_cache_id=None):
+        raise NotImplementedError
+
+    async def agenerate_text(self, prompt, context_cache_id=None):
+        delay = self.delays.pop(0) if self.delays else 0.01
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return self.name
+
+
+def _config(**overrides):
+    values = dict(enabled=True, percentile=0.9, min_samples=5, window_size=50, min_delay=0.05, max_hedge_ratio=0.5)
+    values.update(overrides)
+    return HedgingConfig(**values)
+
+
+def _run(adapter, calls):
+    async def _go():
+        results = []
+        with request_scope(schema="company_basic_view"):
+            for _ in range(calls):
+                results.append(await adapter.agenerate_text("prompt"))
+        return results
+    return asyncio.run(_go())
+
+
+def test_percentile_requires_min_samples():
+    tracker = LatencyTracker(window_size=10, min_samples=3)
+    tracker.record("s", 0.1)
+    tracker.record("s", 0.2)
+    assert tracker.percentile("s", 0.9) is None
+    tracker.record("s", 0.3)
+    assert tracker.percentile("s", 0.5) == 0.2
+    assert tracker.percentile("s", 0.99) == 0.3
+
+
+def test_slow_call_is_hedged_and_loser_cancelled():
+    primary = _DelayAdapter("primary", [0.01] * 5 + [2.0])
+    backup = _DelayAdapter("backup", [0.01])
+    adapter = HedgingAdapter(primary, "dashscope", config=_config(), hedge_adapter=backup)
+
+    start = time.monotonic()
+    results = _run(adapter, 6)
+
+    assert results[-1] == "backup"
+    assert time.monotonic() - start < 1.0
+    assert primary.cancelled == 1
+
+
+def test_hedges_are_capped_by_budget():
+    primary = _DelayAdapter("primary", [0.01] * 5 + [0.3])
+    backup = _DelayAdapter("backup", [0.01])
+    adapter = HedgingAdapter(
+        primary, "dashscope", config=_config(), hedge_adapter=backup, budget=HedgeBudget(max_ratio=0.0)
+    )
+
+    results = _run(adapter, 6)
+
+    # 配额耗尽时不补发副本，等待主请求完成
+    assert results[-1] == "primary"
+    assert backup.delays == [0.01]
+
+
+def test_budget_does_not_bank_quiet_period_requests():
+    budget = HedgeBudget(max_ratio=0.05, max_tokens=2)
+    for _ in range(10000):
+        budget.record_request()
+    # 空闲期只积累到桶容量，随后的突发不能对冲 500 次
+    hedges = 0
+    for _ in range(100):
+        budget.record_request()
+        hedges += budget.try_acquire()
+    assert 6 <= hedges <= 2 + 5
+
+
+def test_tracker_records_primary_latency_not_winning_hedge():
+    primary = _DelayAdapter("primary", [0.01] * 5 + [2.0])
+    backup = _DelayAdapter("backup", [0.01])
+    tracker = LatencyTracker(window_size=50, min_samples=5)
+    adapter = HedgingAdapter(primary, "dashscope", config=_config(), hedge_adapter=backup, tracker=tracker)
+
+    assert _run(adapter, 6)[-1] == "backup"
+    # 副本胜出时按主请求已耗时（不低于阈值）记录，而不是副本自身的延迟
+    assert max(tracker._windows["company_basic_view"]) >= 0.05
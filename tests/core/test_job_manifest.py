@@ -0,0 +1,157 @@
+import asyncio
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from llm_structured_extract.config.settings import BatchRunnerConfig
+from llm_structured_extract.core.batch_runner import BatchRunner, Document
+from llm_structured_extract.core.job_manifest import DONE, FAILED, RUNNING, JobManifest
+from llm_structured_extract.core.llm_adapters.base_adapter import BaseAdapter
+
+
+def test_claim_is_exclusive_across_processes(tmp_path):
+    path = tmp_path / "manifest.sqlite3"
+    manifests = [JobManifest(path) for _ in range(4)]
+    tasks = [(f"doc{i}", "company_basic_view") for i in range(20)]
+    for manifest in manifests:
+        manifest.register(tasks)
+
+    def claim_all(manifest):
+        return [task for task in tasks if manifest.claim(*task)]
+
+    with ThreadPoolExecutor(len(manifests)) as pool:
+        claimed = [task for result in pool.map(claim_all, manifests) for task in result]
+
+    assert sorted(claimed) == sorted(tasks)
+    assert manifests[0].counts() == {RUNNING: 20}
+
+
+def test_failed_tasks_retry_until_limit_and_done_is_final(tmp_path):
+    manifest = JobManifest(tmp_path / "manifest.sqlite3", max_attempts=2)
+    manifest.register([("a", "s1"), ("a", "s2")])
+
+    assert manifest.claim("a", "s1") and manifest.complete("a", "s1")
+    assert not manifest.claim("a", "s1")
+
+    assert manifest.claim("a", "s2") and manifest.fail("a", "s2", "boom")
+    assert manifest.claimable() == {("a", "s2")}
+    assert manifest.claim("a", "s2") and manifest.fail("a", "s2", "boom again")
+    assert manifest.claimable() == set()
+    assert not manifest.claim("a", "s2")
+    [record] = manifest.tasks(FAILED)
+    assert (record.attempts, record.error) == (2, "boom again")
+
+    # 重复登记不重置状态
+    manifest.register([("a", "s1"), ("a", "s2")])
+    assert manifest.counts() == {DONE: 1, FAILED: 1}
+
+
+def test_expired_lease_is_reclaimed_and_stale_owner_loses_result(tmp_path):
+    path = tmp_path / "manifest.sqlite3"
+    crashed = JobManifest(path, lease_seconds=0.05)
+    crashed.register([("a", "s")])
+    assert crashed.claim("a", "s")
+
+    other = JobManifest(path)
+    assert not other.claim("a", "s")
+    time.sleep(0.1)
+    assert other.claim("a", "s")
+
+    assert not crashed.complete("a", "s")
+    assert other.complete("a", "s")
+    assert other.counts() == {DONE: 1}
+
+
+def test_rerun_after_crash_reclaims_in_flight_tasks(tmp_path):
+    path = tmp_path / "manifest.sqlite3"
+    first = JobManifest(path)
+    first.register([("a", "s"), ("b", "s")])
+    assert first.claim("a", "s")
+    first.close()
+
+    # 中断后立即重新运行：上次运行中的任务无需等待租约过期
+    rerun = JobManifest(path)
+    assert rerun.claimable() == {("a", "s"), ("b", "s")}
+
+    # 其他主机上已退出的持有者只能等租约过期；过期且用尽重试次数的任务标记为失败
+    with rerun._conn:
+        rerun._conn.execute("UPDATE tasks SET status = ?, owner = ?, attempts = 3, lease_expires = ? WHERE doc_id = 'b'",
+                            (RUNNING, "elsewhere:1:abc", time.time() + 60))
+    assert JobManifest(path).claimable() == {("a", "s")}
+    with rerun._conn:
+        rerun._conn.execute("UPDATE tasks SET lease_expires = ? WHERE doc_id = 'b'", (time.time() - 1,))
+    assert rerun.claimable() == {("a", "s")}
+    assert rerun.counts() == {RUNNING: 1, FAILED: 1}
+    [record] = rerun.tasks(FAILED)
+    assert (record.doc_id, record.error) == ("b", "lease expired")
+
+
+def test_open_reclaims_tasks_of_exited_local_process(tmp_path):
+    path = tmp_path / "manifest.sqlite3"
+    manifest = JobManifest(path)
+    manifest.register([("a", "s")])
+    assert manifest.claim("a", "s")
+    exited = subprocess.Popen([sys.executable, "-c", "pass"])
+    exited.wait()
+    with manifest._conn:
+        manifest._conn.execute("UPDATE tasks SET owner = ?", (f"{socket.gethostname()}:{exited.pid}:dead",))
+
+    assert JobManifest(path).claim("a", "s")
+
+
+def test_renew_extends_own_leases(tmp_path):
+    manifest = JobManifest(tmp_path / "manifest.sqlite3", lease_seconds=0.05)
+    manifest.register([("a", "s")])
+    assert manifest.claim("a", "s")
+    other = JobManifest(tmp_path / "manifest.sqlite3")
+    for _ in range(4):
+        time.sleep(0.02)
+        assert manifest.renew() == 1
+        assert not other.claim("a", "s")
+    assert manifest.complete("a", "s")
+
+
+class _CountingAdapter(BaseAdapter):
+    calls = 0
+    fail = True
+
+    def generate_text(self, prompt, context_cache_id=None):
+        raise NotImplementedError
+
+    async def agenerate_text(self, prompt, context_cache_id=None):
+        type(self).calls += 1
+        if self.fail and "industry" in prompt.lower():
+            raise RuntimeError("boom")
+        return "# 公司基本信息\n## 公司名称\n测试公司"
+
+
+def test_runner_resumes_from_manifest(tmp_path, fake_adapter):
+    fake_adapter(_CountingAdapter)
+
+    schemas = ["company_basic_view", "company_industry_view"]
+    documents = [Document(f"doc{i}", text=f"第{i}家公司的资料。") for i in range(3)]
+    out = tmp_path / "job"
+
+    def run():
+        manifest = JobManifest.for_output_dir(out, max_attempts=2)
+        try:
+            runner = BatchRunner(schemas, out, config=BatchRunnerConfig(concurrency=4), manifest=manifest)
+            return asyncio.run(runner.run(documents))
+        finally:
+            manifest.close()
+
+    first = run()
+    assert first["manifest"] == {DONE: 3, FAILED: 3}
+    calls_after_first = _CountingAdapter.calls
+
+    # 重跑只执行失败的任务；修复后全部完成
+    _CountingAdapter.fail = False
+    second = run()
+    assert _CountingAdapter.calls - calls_after_first == 3
+    assert (second["tasks"], second["tasks_failed"]) == (3, 0)
+    assert second["manifest"] == {DONE: 6}
+
+    third = run()
+    assert third["tasks"] == 0 and _CountingAdapter.calls - calls_after_first == 3
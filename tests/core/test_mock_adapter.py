@@ -0,0 +1,132 @@
+import asyncio
+import threading
+
+import pytest
+
+from llm_structured_extract.config.settings import MockConfig
+from llm_structured_extract.core.exceptions import RateLimitError, TransientLLMError
+from llm_structured_extract.core.llm_adapters.base_adapter import ADAPTER_REGISTRY
+from llm_structured_extract.core.llm_adapters.mock_adapter import MockAdapter, prompt_hash
+from llm_structured_extract.core.request_context import request_scope
+
+
+def _config(tmp_path, **overrides):
+    replay_dir = tmp_path / "extract_doc_20250101_000000" / "raw_markdown"
+    replay_dir.mkdir(parents=True, exist_ok=True)
+    (replay_dir / "company_basic_view.md").write_text("# 公司基本信息\n回放内容\n", encoding="utf-8")
+    values = dict(
+        recordings_dir=str(tmp_path / "recordings"),
+        replay_globs=[str(tmp_path / "*" / "raw_markdown")],
+        latency_distribution="uniform", latency_min=0.0, latency_max=0.02, seed=7,
+    )
+    values.update(overrides)
+    return MockConfig(**values)
+
+
+def test_mock_is_registered():
+    assert ADAPTER_REGISTRY["mock"] is MockAdapter
+
+
+def test_replays_by_schema_then_exact_recording(tmp_path):
+    config = _config(tmp_path)
+    adapter = MockAdapter(config=config)
+
+    with request_scope(schema="company_basic_view"):
+        assert adapter.generate_text("prompt") == "# 公司基本信息\n回放内容"
+
+        recorded = tmp_path / "recordings" / "company_basic_view" / f"{prompt_hash('prompt')}.md"
+        recorded.parent.mkdir(parents=True)
+        recorded.write_text("# 精确录制\n", encoding="utf-8")
+        assert adapter.generate_text("prompt") == "# 精确录制"
+
+
+def test_latency_and_errors_are_deterministic(tmp_path):
+    config = _config(tmp_path, error_rate=0.3, rate_limit_rate=0.2)
+
+    def _outcomes():
+        adapter = MockAdapter(config=config)
+        plans = [adapter._plan("company_basic_view", f"p{i}") for i in range(50)]
+        return [(round(p.latency, 6), type(p.error).__name__) for p in plans]
+
+    first = _outcomes()
+    assert first == _outcomes()
+    errors = [e for _, e in first]
+    assert "RateLimitError" in errors and "TransientLLMError" in errors and "NoneType" in errors
+
+
+def test_injected_errors_and_capacity(tmp_path):
+    adapter = MockAdapter(config=_config(tmp_path, error_rate=1.0))
+    with pytest.raises(TransientLLMError):
+        adapter.generate_text("prompt")
+
+    adapter = MockAdapter(config=_config(tmp_path, latency_distribution="constant", latency_mean=0.05, capacity=1))
+
+    async def _run():
+        return await asyncio.gather(*(adapter.agenerate_text("prompt") for _ in range(2)), return_exceptions=True)
+
+    results = asyncio.run(_run())
+    assert sum(isinstance(r, RateLimitError) for r in results) == 1
+
+
+def test_stream_chunking(tmp_path):
+    adapter = MockAdapter(config=_config(tmp_path, stream_chunk_size=4))
+
+    async def _run():
+        with request_scope(schema="company_basic_view"):
+            return [chunk async for chunk in adapter.astream_text("prompt")]
+
+    chunks = asyncio.run(_run())
+    assert "".join(chunks) == "# 公司基本信息\n回放内容"
+    assert all(len(c) <= 4 for c in chunks) and len(chunks) > 1
+
+
+
+def test_async_replay_reads_recordings_off_the_event_loop(tmp_path, monkeypatch):
+    adapter = MockAdapter(config=_config(tmp_path))
+    lookup_threads = []
+    lookup = adapter._lookup
+
+    def _lookup(schema, key):
+        lookup_threads.append(threading.get_ident())
+        return lookup(schema, key)
+
+    monkeypatch.setattr(adapter, "_lookup", _lookup)
+
+    async def _run():
+        with request_scope(schema="company_basic_view"):
+            output = await adapter.agenerate_text("prompt")
+            chunks = [chunk async for chunk in adapter.astream_text("prompt")]
+        return output, chunks, threading.get_ident()
+
+    output, chunks, loop_thread = asyncio.run(_run())
+    assert output == "".join(chunks) == "# 公司基本信息\n回放内容"
+    assert len(lookup_threads) == 2 and loop_thread not in lookup_threads
+
+def test_record_mode_calls_unwrapped_provider(tmp_path, monkeypatch):
+    from llm_structured_extract.config.settings import settings
+    from llm_structured_extract.core import adapter_manager
+    from llm_structured_extract.core.response_cache import CachingAdapter
+    from llm_structured_extract.core.retry import RetryingAdapter
+
+    class _Provider:
+        calls = 0
+
+        def generate_text(self, prompt, context_cache_id=None):
+            type(self).calls += 1
+            return "# 真实响应\n"
+
+    monkeypatch.setitem(ADAPTER_REGISTRY, "mock_rec_provider", _Provider)
+    monkeypatch.setattr(settings.retry_config, "enabled", True)
+    monkeypatch.setattr(settings.response_cache_config, "enabled", True)
+    monkeypatch.setattr(settings.response_cache_config, "path", None)
+    adapter_manager.close_adapters()
+    try:
+        adapter = MockAdapter(_config(tmp_path, mode="record", record_provider="mock_rec_provider"))
+        assert not isinstance(adapter.recorder, (RetryingAdapter, CachingAdapter))
+        with request_scope(schema="company_basic_view"):
+            assert adapter.generate_text("prompt") == "# 真实响应\n"
+            assert adapter.generate_text("prompt") == "# 真实响应\n"
+        # 不经过响应缓存：每次录制都是提供商的真实调用
+        assert _Provider.calls == 2
+    finally:
+        adapter_manager.close_adapters()
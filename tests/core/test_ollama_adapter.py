@@ -0,0 +1,64 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+from llm_structured_extract.config.settings import ModelConfig, settings
+from llm_structured_extract.core.exceptions import LLMCallError
+from llm_structured_extract.core.llm_adapters.ollama_adapter import OllamaAdapter
+
+
+def test_agenerate_text_streams_and_respects_parallel_slots(stub_http_server, monkeypatch):
+    monkeypatch.setitem(
+        settings.yaml_config.llm.models, "ollama",
+        ModelConfig(name="qwen-local", keep_alive="10m", max_concurrency=2),
+    )
+    lock = threading.Lock()
+    state = {"inflight": 0, "peak": 0}
+
+    def _handler(method, path, headers, body):
+        payload = json.loads(body)
+        assert payload["stream"] is True and payload["keep_alive"] == "10m"
+
+        def _chunks():
+            with lock:
+                state["inflight"] += 1
+                state["peak"] = max(state["peak"], state["inflight"])
+            time.sleep(0.05)
+            yield json.dumps({"message": {"content": "# 标题"}, "done": False}).encode() + b"\n"
+            yield json.dumps({"message": {"content": "\n内容"}, "done": True}).encode() + b"\n"
+            with lock:
+                state["inflight"] -= 1
+
+        return 200, {"Content-Type": "application/x-ndjson"}, _chunks()
+
+    server = stub_http_server(_handler)
+    adapter = OllamaAdapter(host=server.url)
+
+    async def _run():
+        return await asyncio.gather(*[adapter.agenerate_text("prompt") for _ in range(5)])
+
+    assert asyncio.run(_run()) == ["# 标题\n内容"] * 5
+    assert server.requests[0]["path"] == "/api/chat"
+    assert state["peak"] <= 2
+
+
+def test_generate_text_reports_server_error(stub_http_server):
+    server = stub_http_server(lambda *a: (404, {}, {"error": "model 'x' not found"}))
+    adapter = OllamaAdapter(model="x", host=server.url)
+
+    with pytest.raises(LLMCallError, match="not found"):
+        adapter.generate_text("prompt")
+
+
+def test_sync_slots_follow_configured_max_concurrency(monkeypatch):
+    adapter = OllamaAdapter(host="http://ollama-slots.test:11434")
+    monkeypatch.setitem(settings.yaml_config.llm.models, "ollama", ModelConfig(max_concurrency=1))
+    narrow = adapter._sync_slot()
+    monkeypatch.setitem(settings.yaml_config.llm.models, "ollama", ModelConfig(max_concurrency=3))
+    wide = adapter._sync_slot()
+
+    assert wide is not narrow
+    assert all(wide.acquire(blocking=False) for _ in range(3))
@@ -0,0 +1,95 @@
+import asyncio
+import json
+
+import pytest
+
+from llm_structured_extract.config.settings import settings
+from llm_structured_extract.core.exceptions import ConfigurationError
+from llm_structured_extract.core.llm_adapters.base_adapter import ADAPTER_REGISTRY
+from llm_structured_extract.core.llm_adapters.openai_adapter import OpenAIAdapter
+from llm_structured_extract.core.usage import usage_scope
+from llm_structured_extract.utils.http_pool import close_sync_clients
+
+
+def _chat_handler(method, path, headers, body):
+    payload = json.loads(body)
+    return 200, {}, {
+        "id": "chatcmpl-1",
+        "object": "chat.completion",
+        "created": 0,
+        "model": payload["model"],
+        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": f"# {payload['model']}\n"}}],
+    }
+
+
+def test_openai_adapter_registered():
+    assert ADAPTER_REGISTRY["openai"] is OpenAIAdapter
+
+
+def test_openai_adapter_uses_base_url_and_shared_clients(stub_http_server):
+    server = stub_http_server(_chat_handler)
+    a1 = OpenAIAdapter(model="local-model", base_url=f"{server.url}/v1")
+    a2 = OpenAIAdapter(model="local-model", base_url=f"{server.url}/v1")
+
+    assert a1.generate_text("prompt") == "# local-model"
+    # 相同配置的适配器共享进程内同一个 SDK 客户端（异步客户端按事件循环共享）
+    assert a1._get_client() is a2._get_client()
+
+    async def _run():
+        assert a1._get_async_client() is a2._get_async_client()
+        return await a2.agenerate_text("prompt")
+
+    assert asyncio.run(_run()) == "# local-model"
+    assert {r["path"] for r in server.requests} == {"/v1/chat/completions"}
+    # 未配置 Key 时使用本地占位 Key
+    assert server.requests[0]["headers"]["authorization"] == "Bearer EMPTY"
+
+
+def test_openai_clients_are_rebuilt_when_shared_pool_is_closed(stub_http_server):
+    server = stub_http_server(_chat_handler)
+    adapter = OpenAIAdapter(model="local-model", base_url=f"{server.url}/v1")
+    client = adapter._get_client()
+    other = OpenAIAdapter(model="local-model", base_url=f"{server.url}/v1", api_key="sk-other")
+    assert other._get_client() is not client
+
+    close_sync_clients()
+    rebuilt = adapter._get_client()
+    assert rebuilt is not client
+    assert adapter.generate_text("prompt") == "# local-model"
+
+
+def test_remote_base_url_without_key_is_rejected(monkeypatch):
+    monkeypatch.setattr(settings, "OPENAI_API_KEY", "")
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    with pytest.raises(ConfigurationError):
+        OpenAIAdapter(model="qwen-plus", base_url="https://dashscope.aliyuncs.com/compatible-mode/v1")
+    assert OpenAIAdapter(model="local-model", base_url="http://localhost:8000/v1").api_key == "EMPTY"
+
+
+def _stream_handler(method, path, headers, body):
+    payload = json.loads(body)
+    assert payload["stream"] is True and payload["stream_options"] == {"include_usage": True}
+
+    def _event(choices, usage=None):
+        data = {"id": "chatcmpl-1", "object": "chat.completion.chunk", "created": 0, "model": payload["model"], "choices": choices, "usage": usage}
+        return f"data: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8")
+
+    events = [_event([{"index": 0, "delta": {"content": part}, "finish_reason": None}]) for part in ["# 标题", "\n内容"]]
+    events.append(_event([], {"prompt_tokens": 120, "completion_tokens": 8, "total_tokens": 128}))
+    events.append(b"data: [DONE]\n\n")
+    return 200, {"Content-Type": "text/event-stream"}, events
+
+
+def test_openai_streams_report_usage(stub_http_server):
+    server = stub_http_server(_stream_handler)
+    adapter = OpenAIAdapter(model="local-model", base_url=f"{server.url}/v1")
+
+    async def _astream():
+        return [chunk async for chunk in adapter.astream_text("prompt")]
+
+    with usage_scope(name="stream") as usage:
+        assert list(adapter.stream_text("prompt")) == ["# 标题", "\n内容"]
+        assert asyncio.run(_astream()) == ["# 标题", "\n内容"]
+
+    total = usage.as_dict()["total"]
+    assert (total["calls"], total["prompt_tokens"], total["completion_tokens"]) == (2, 240, 16)
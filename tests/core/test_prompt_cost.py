@@ -0,0 +1,66 @@
+import importlib.util
+import json
+import sys
+from pathlib import Path
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+from llm_structured_extract.core.prompt_engine import count_fields
+from llm_structured_extract.core.schema_registry import get_model, list_available_schemas
+from llm_structured_extract.utils.tokens import estimate_tokens
+
+REPORT_SCRIPT = Path(__file__).resolve().parents[2] / "scripts" / "prompt_cost_report.py"
+
+
+class _Shareholder(BaseModel):
+    name: str
+    ratio: Optional[float] = None
+
+
+class _Company(BaseModel):
+    name: str
+    controller: _Shareholder
+    shareholders: List[_Shareholder]
+    parent: Optional[_Shareholder] = None
+
+
+def test_count_fields_includes_nested_models():
+    # 4 个顶层字段 + 3 处嵌套（直接、List、Optional）各 2 个子字段
+    assert count_fields(_Shareholder) == 2
+    assert count_fields(_Company) == 10
+
+
+def test_estimate_tokens_weights_cjk_higher_than_ascii():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("公司基本概况") > estimate_tokens("abcdef")
+
+
+def _load_report_script():
+    spec = importlib.util.spec_from_file_location("prompt_cost_report", REPORT_SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_prompt_cost_report_covers_every_top_level_schema(tmp_path, monkeypatch, capsys):
+    report = _load_report_script()
+    doc = tmp_path / "doc.md"
+    doc.write_text("# 公司概况\n某公司成立于2015年。\n", encoding="utf-8")
+    expected = {
+        name for name in list_available_schemas()
+        if getattr(get_model(name), "__business_architecture__", "").strip()
+    }
+    assert expected
+
+    monkeypatch.setattr(sys, "argv", ["prompt_cost_report.py", str(doc), "--json"])
+    report.main()
+    rows = json.loads(capsys.readouterr().out)
+    assert {r["schema"] for r in rows} == expected
+    assert all(r["prompt_tokens"] > 0 and r["field_count"] > 0 for r in rows)
+
+    monkeypatch.setattr(sys, "argv", ["prompt_cost_report.py", str(doc)])
+    report.main()
+    table = capsys.readouterr().out
+    assert all(name in table for name in expected)
+    assert "TOTAL" in table
@@ -0,0 +1,34 @@
+import asyncio
+import time
+
+from llm_structured_extract.core.rate_limit import RateLimiter
+
+
+def test_requests_queue_once_rpm_is_exhausted():
+    limiter = RateLimiter(rpm=120)  # 桶容量 120，每秒补充 2 个
+
+    waits = [limiter.reserve(1) for _ in range(121)]
+
+    assert waits[:120] == [0.0] * 120
+    assert 0.4 < waits[120] <= 0.5
+
+
+def test_tpm_budget_delays_large_requests_and_refunds_on_cancel():
+    limiter = RateLimiter(tpm=600)  # 每秒补充 10 个 Token
+
+    assert limiter.reserve(600) == 0.0
+
+    async def _cancelled_acquire():
+        task = asyncio.create_task(limiter.aacquire(5))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    start = time.monotonic()
+    asyncio.run(_cancelled_acquire())
+    assert time.monotonic() - start < 0.4
+    # 被取消的预约已归还，下一次等待时间仅取决于 5 个 Token 的透支
+    assert limiter.reserve(5) <= 0.5
@@ -0,0 +1,85 @@
+import asyncio
+import time
+
+from llm_structured_extract.core.llm_adapters.base_adapter import BaseAdapter
+from llm_structured_extract.core.response_cache import (
+    CachingAdapter, MemoryCacheTier, ResponseCache, SQLiteCacheTier, response_cache_key
+)
+from llm_structured_extract.utils.metrics import metrics
+
+
+class _CountingAdapter(BaseAdapter):
+    model = "fake-model"
+
+    def __init__(self):
+        self.calls = 0
+
+    def generate_text(self, prompt, context_cache_id=None):
+        self.calls += 1
+        return f"# 输出 {self.calls}"
+
+    async def agenerate_text(self, prompt, context_cache_id=None):
+        return self.generate_text(prompt, context_cache_id)
+
+
+def _cache(tmp_path, **kwargs):
+    memory = MemoryCacheTier(kwargs.get("memory_max_bytes", 1024), kwargs.get("ttl_seconds"))
+    disk = SQLiteCacheTier(str(tmp_path / "cache.sqlite3"), kwargs.get("disk_max_bytes", 1024), kwargs.get("ttl_seconds"))
+    return ResponseCache(memory, disk)
+
+
+def test_key_covers_model_params_and_prompts():
+    base = response_cache_key("m", 0.1, 100, "sys", "prompt")
+    assert base == response_cache_key("m", 0.1, 100, "sys", "prompt")
+    variants = [
+        response_cache_key("m2", 0.1, 100, "sys", "prompt"),
+        response_cache_key("m", 0.2, 100, "sys", "prompt"),
+        response_cache_key("m", 0.1, 200, "sys", "prompt"),
+        response_cache_key("m", 0.1, 100, "sys2", "prompt"),
+        response_cache_key("m", 0.1, 100, "sys", "prompt2"),
+    ]
+    assert base not in variants and len(set(variants)) == len(variants)
+
+
+def test_adapter_hits_memory_then_disk_across_instances(tmp_path):
+    inner = _CountingAdapter()
+    hits_before = metrics.get("llm_response_cache_hits_total", tier="disk")
+
+    adapter = CachingAdapter(inner, "openai", cache=_cache(tmp_path))
+    assert adapter.generate_text("prompt") == "# 输出 1"
+    assert adapter.generate_text("prompt", context_cache_id="ctx") == "# 输出 1"
+    assert asyncio.run(adapter.agenerate_text("prompt")) == "# 输出 1"
+    assert inner.calls == 1
+
+    # 新进程只剩磁盘层
+    restarted = CachingAdapter(inner, "openai", cache=_cache(tmp_path))
+    assert restarted.generate_text("prompt") == "# 输出 1"
+    assert inner.calls == 1
+    assert metrics.get("llm_response_cache_hits_total", tier="disk") == hits_before + 1
+
+    assert restarted.generate_text("other prompt") == "# 输出 2"
+
+
+def test_ttl_expiry(tmp_path):
+    cache = _cache(tmp_path, ttl_seconds=0.05)
+    cache.set("k", "v")
+    assert cache.get("k") == "v"
+    time.sleep(0.08)
+    assert cache.get("k") is None
+    assert cache.disk.get("k") is None
+
+
+def test_size_based_eviction_drops_least_recently_used(tmp_path):
+    cache = _cache(tmp_path, memory_max_bytes=25, disk_max_bytes=25)
+    cache.set("a", "x" * 10)
+    cache.set("b", "y" * 10)
+    # 两层各自按本层的访问时间淘汰
+    assert cache.memory.get("a") == "x" * 10
+    time.sleep(0.01)
+    assert cache.disk.get("a")[0] == "x" * 10
+    time.sleep(0.01)
+    cache.set("c", "z" * 10)
+
+    assert cache.memory.get("b") is None and cache.disk.get("b") is None
+    assert cache.get("a") == "x" * 10 and cache.get("c") == "z" * 10
+    assert cache.memory.size_bytes <= 25 and cache.disk.size_bytes <= 25
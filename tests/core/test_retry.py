@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+
+from llm_structured_extract.config.settings import RetryConfig
+from llm_structured_extract.core.exceptions import LLMCallError, RateLimitError
+from llm_structured_extract.core.retry import RetryBudget, RetryingAdapter
+
+_FAST = RetryConfig(max_attempts=3, initial_backoff=0.001, max_backoff=0.001)
+
+
+class _FlakyAdapter:
+    def __init__(self, errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def generate_text(self, prompt, context_cache_id=None):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+    async def agenerate_text(self, prompt, context_cache_id=None):
+        return self.generate_text(prompt, context_cache_id)
+
+
+def test_retries_transient_errors_until_success():
+    inner = _FlakyAdapter([RateLimitError("429"), RateLimitError("429")])
+    adapter = RetryingAdapter(inner, config=_FAST, budget=RetryBudget(max_tokens=10))
+
+    assert asyncio.run(adapter.agenerate_text("p")) == "ok"
+    assert inner.calls == 3
+
+
+def test_fatal_errors_and_per_request_limit_are_not_retried():
+    fatal = _FlakyAdapter([LLMCallError("401 invalid api key")])
+    with pytest.raises(LLMCallError, match="401"):
+        RetryingAdapter(fatal, config=_FAST, budget=RetryBudget(max_tokens=10)).generate_text("p")
+    assert fatal.calls == 1
+
+    always = _FlakyAdapter([RateLimitError("429")] * 5)
+    with pytest.raises(RateLimitError):
+        RetryingAdapter(always, config=_FAST, budget=RetryBudget(max_tokens=10)).generate_text("p")
+    assert always.calls == _FAST.max_attempts
+
+
+def test_exhausted_global_budget_stops_retries():
+    budget = RetryBudget(ratio=0.0, min_per_second=0.0, max_tokens=1.0)
+    inner = _FlakyAdapter([RateLimitError("429")] * 5)
+    adapter = RetryingAdapter(inner, config=_FAST, budget=budget)
+
+    with pytest.raises(RateLimitError):
+        adapter.generate_text("p")
+    # 预算只够一次重试
+    assert inner.calls == 2
@@ -0,0 +1,61 @@
+import asyncio
+
+from llm_structured_extract.config.settings import ModelConfig, ModelPrice, RouteRule, RoutingConfig, settings
+from llm_structured_extract.core.extract import async_extract
+from llm_structured_extract.core.llm_adapters.base_adapter import BaseAdapter
+from llm_structured_extract.core.routing import select_route
+from llm_structured_extract.core.usage import record_usage, usage_scope
+
+
+class _RoutedAdapter(BaseAdapter):
+    def __init__(self, model=None):
+        self.model = model or "configured"
+
+    def generate_text(self, prompt, context_cache_id=None):
+        raise NotImplementedError
+
+    async def agenerate_text(self, prompt, context_cache_id=None):
+        assert context_cache_id is None
+        record_usage("routed", self.model, prompt_tokens=1000, completion_tokens=100, latency=0.5)
+        return f"# {self.model}"
+
+
+def _routing(**overrides):
+    rules = [
+        RouteRule(name="flagship", schemas=["company_financial_analysis_view"], provider="routed", model="flagship"),
+        RouteRule(name="cheap", max_input_tokens=1_000_000, provider="routed", model="turbo"),
+    ]
+    return RoutingConfig(**{"enabled": True, "rules": rules, **overrides})
+
+
+def test_select_route_by_schema_and_size():
+    config = _routing()
+    assert select_route("company_financial_analysis_view", "x", config) == ("flagship", "routed", "flagship")
+    assert select_route("company_basic_view", "x", config).name == "cheap"
+
+    config.rules[1].max_input_tokens = 10
+    assert select_route("company_basic_view", "长文本" * 100, config).is_default
+    assert select_route("company_basic_view", "x", RoutingConfig(enabled=False, rules=config.rules)).is_default
+
+
+def test_extract_uses_routed_model_and_reports_by_route(monkeypatch, fake_adapter):
+    fake_adapter(_RoutedAdapter, provider="routed")
+    monkeypatch.setattr(settings.yaml_config, "routing", _routing())
+    monkeypatch.setitem(
+        settings.yaml_config.llm.models, "routed",
+        ModelConfig(
+            input_price_per_1k=1.0, output_price_per_1k=1.0,
+            model_prices={"turbo": ModelPrice(input_price_per_1k=0.1, output_price_per_1k=0.1)},
+        ),
+    )
+
+    async def _run():
+        schemas = ["company_financial_analysis_view", "company_basic_view"]
+        return await asyncio.gather(*(async_extract("某公司成立于2015年。", s, context_cache_id="cache-1") for s in schemas))
+
+    with usage_scope(name="job") as job:
+        assert asyncio.run(_run()) == ["# flagship", "# turbo"]
+
+    report = job.as_dict()["by_route"]
+    assert report["flagship"]["calls"] == 1 and report["flagship"]["cost"] == 1.1
+    assert report["cheap"]["cost"] == 0.11 and report["cheap"]["avg_latency_seconds"] == 0.5
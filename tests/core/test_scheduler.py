@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+
+from llm_structured_extract.config.settings import settings
+from llm_structured_extract.core import adapter_manager
+from llm_structured_extract.core.exceptions import DeadlineExceededError
+from llm_structured_extract.core.deadline import deadline_scope
+from llm_structured_extract.core.llm_adapters.base_adapter import BaseAdapter
+from llm_structured_extract.core.scheduler import (
+    BATCH, INTERACTIVE, FairScheduler, SchedulingAdapter, scheduling_scope
+)
+
+
+class _SlowAdapter:
+    def __init__(self, scheduler):
+        self.scheduler = scheduler
+        self.completed = []
+        self.peak_batch = 0
+
+    async def agenerate_text(self, prompt, context_cache_id=None):
+        self.peak_batch = max(self.peak_batch, self.scheduler.inflight(BATCH))
+        await asyncio.sleep(0.02)
+        self.completed.append(prompt)
+        return prompt
+
+
+def test_interactive_request_skips_batch_backlog_and_keeps_reserved_slot():
+    scheduler = FairScheduler(capacity=2, reserved_slots=1)
+    inner = _SlowAdapter(scheduler)
+    adapter = SchedulingAdapter(inner, provider="test-sched", scheduler=scheduler)
+
+    async def _call(prompt, priority):
+        with scheduling_scope(priority, tenant="nightly"):
+            return await adapter.agenerate_text(prompt)
+
+    async def _run():
+        backlog = [asyncio.ensure_future(_call(f"batch-{i}", BATCH)) for i in range(6)]
+        await asyncio.sleep(0.005)
+        # 批量请求只占用未保留的 1 个槽位，交互请求无需排队
+        assert scheduler.queue_depth(BATCH) == 5
+        await _call("interactive", INTERACTIVE)
+        await asyncio.gather(*backlog)
+
+    asyncio.run(_run())
+    assert inner.completed.index("interactive") <= 1
+    assert inner.peak_batch == 1
+    assert scheduler.inflight() == 0 and scheduler.queue_depth() == 0
+
+
+def test_tenants_share_capacity_by_weight_without_starvation():
+    scheduler = FairScheduler(capacity=1, reserved_slots=0, weights={"heavy": 3.0})
+    order = []
+
+    async def _call(tenant):
+        await scheduler.aacquire(BATCH, tenant)
+        order.append(tenant)
+        await asyncio.sleep(0)
+        scheduler.release(BATCH)
+
+    async def _run():
+        # 先占住唯一的槽位，使两个租户的请求全部排队后再按公平顺序放行
+        await scheduler.aacquire(BATCH, "warmup")
+        tasks = [asyncio.ensure_future(_call("heavy")) for _ in range(30)]
+        tasks += [asyncio.ensure_future(_call("light")) for _ in range(30)]
+        await asyncio.sleep(0)
+        scheduler.release(BATCH)
+        await asyncio.gather(*tasks)
+
+    asyncio.run(_run())
+    first = order[:20]
+    assert first.count("heavy") == 15
+    assert first.count("light") == 5
+    # 先提交的大量 heavy 请求不会让 light 一直等待
+    assert "light" in order[:4]
+
+
+def test_waiting_past_deadline_gives_up_slot_request():
+    scheduler = FairScheduler(capacity=1)
+    assert scheduler.acquire(INTERACTIVE, "a") is not None
+    assert scheduler.acquire(INTERACTIVE, "b", timeout=0.01) is None
+    assert scheduler.queue_depth() == 0
+
+    class _Inner:
+        def generate_text(self, prompt, context_cache_id=None):
+            return prompt
+
+    adapter = SchedulingAdapter(_Inner(), provider="test-sched", scheduler=scheduler)
+    with deadline_scope(0.05), pytest.raises(DeadlineExceededError):
+        adapter.generate_text("x")
+
+    scheduler.release(INTERACTIVE)
+    assert adapter.generate_text("x") == "x"
+    assert scheduler.inflight() == 0
+
+
+def test_get_adapter_adds_scheduling_layer_when_enabled(monkeypatch, fake_adapter):
+    class _Fake(BaseAdapter):
+        def generate_text(self, prompt, context_cache_id=None):
+            return prompt
+
+        async def agenerate_text(self, prompt, context_cache_id=None):
+            return prompt
+
+    monkeypatch.setattr(settings.scheduler_config, "enabled", True)
+    fake_adapter(_Fake, provider="sched-fake")
+    adapter = adapter_manager.get_adapter("sched-fake")
+    assert isinstance(adapter, SchedulingAdapter)
+    with scheduling_scope(BATCH, tenant="backfill"):
+        assert asyncio.run(adapter.agenerate_text("ok")) == "ok"
+    with pytest.raises(ValueError):
+        with scheduling_scope("urgent"):
+            pass
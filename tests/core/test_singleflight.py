@@ -0,0 +1,143 @@
+import asyncio
+
+import pytest
+
+from llm_structured_extract.config.settings import settings
+from llm_structured_extract.core import scheduler
+from llm_structured_extract.core.deadline import run_with_deadline
+from llm_structured_extract.core.exceptions import DeadlineExceededError
+from llm_structured_extract.core.extract import async_extract, async_extract_to_model
+from llm_structured_extract.core.llm_adapters.base_adapter import BaseAdapter
+from llm_structured_extract.core.scheduler import BATCH, INTERACTIVE, current_priority, scheduling_scope
+from llm_structured_extract.core.singleflight import SingleFlight
+
+
+class _SlowAdapter(BaseAdapter):
+    calls = 0
+
+    def __init__(self, model=None):
+        self.model = model
+
+    def generate_text(self, prompt, context_cache_id=None):
+        raise NotImplementedError
+
+    async def agenerate_text(self, prompt, context_cache_id=None):
+        type(self).calls += 1
+        await asyncio.sleep(0.05)
+        return "# 公司基本信息\n## 公司名称\n测试公司"
+
+
+@pytest.fixture
+def slow_adapter(fake_adapter):
+    _SlowAdapter.calls = 0
+    return fake_adapter(_SlowAdapter)
+
+
+def test_identical_requests_share_one_call_and_parse(slow_adapter, tmp_path):
+    async def _run():
+        same = [async_extract_to_model("某公司成立于2015年。", "company_basic_view") for _ in range(5)]
+        other = async_extract("另一份文档", "company_basic_view", save_raw_to=str(tmp_path / "raw.md"))
+        return await asyncio.gather(*same, other)
+
+    *models, markdown = asyncio.run(_run())
+
+    assert slow_adapter.calls == 2
+    assert all(m is models[0] for m in models)
+    assert markdown.startswith("# 公司基本信息")
+    assert (tmp_path / "raw.md").exists()
+
+    # 已完成的请求不再合并
+    asyncio.run(async_extract("某公司成立于2015年。", "company_basic_view"))
+    assert slow_adapter.calls == 3
+
+
+def test_shared_call_survives_until_last_waiter_leaves():
+    flight = SingleFlight("test_flight")
+    state = {"started": 0, "cancelled": False}
+
+    async def _work():
+        state["started"] += 1
+        try:
+            await asyncio.sleep(0.1)
+        except asyncio.CancelledError:
+            state["cancelled"] = True
+            raise
+        return "done"
+
+    async def _run():
+        impatient = asyncio.ensure_future(flight.do("k", _work))
+        patient = asyncio.ensure_future(flight.do("k", _work))
+        await asyncio.sleep(0.01)
+        impatient.cancel()
+        result = await patient
+
+        lonely = asyncio.ensure_future(flight.do("k2", _work))
+        await asyncio.sleep(0.01)
+        lonely.cancel()
+        await asyncio.sleep(0.01)
+        return result
+
+    assert asyncio.run(_run()) == "done"
+    assert state["started"] == 2 and state["cancelled"]
+
+
+def test_short_deadline_of_first_caller_does_not_fail_coalesced_caller(slow_adapter, monkeypatch):
+    async def _slower(self, prompt, context_cache_id=None):
+        type(self).calls += 1
+        # 与真实适配器一样，单次调用的超时受当前截止时间约束
+        await run_with_deadline(asyncio.sleep(0.2))
+        return "# 公司基本信息\n## 公司名称\n测试公司"
+
+    monkeypatch.setattr(slow_adapter, "agenerate_text", _slower)
+
+    async def _run():
+        hasty = asyncio.ensure_future(async_extract("某公司成立于2015年。", "company_basic_view", timeout=0.05))
+        await asyncio.sleep(0.01)
+        patient = asyncio.ensure_future(async_extract("某公司成立于2015年。", "company_basic_view", timeout=10))
+        return await asyncio.gather(hasty, patient, return_exceptions=True)
+
+    hasty, patient = asyncio.run(_run())
+    assert isinstance(hasty, DeadlineExceededError)
+    assert patient.startswith("# 公司基本信息")
+    assert slow_adapter.calls == 1
+
+
+def test_interactive_request_does_not_join_batch_flight(fake_adapter, monkeypatch):
+    release_batch = None
+
+    class _Adapter(BaseAdapter):
+        def __init__(self, model=None):
+            pass
+
+        def generate_text(self, prompt, context_cache_id=None):
+            raise NotImplementedError
+
+        async def agenerate_text(self, prompt, context_cache_id=None):
+            if current_priority() == BATCH:
+                await release_batch.wait()
+            return "# 公司基本信息\n## 公司名称\n测试公司"
+
+    monkeypatch.setattr(scheduler, "_SCHEDULERS", {})
+    monkeypatch.setattr(settings.scheduler_config, "enabled", True)
+    monkeypatch.setattr(settings.scheduler_config, "max_concurrency", 2)
+    monkeypatch.setattr(settings.scheduler_config, "reserved_slots", 1)
+    fake_adapter(_Adapter)
+
+    async def _batch(text):
+        with scheduling_scope(BATCH, tenant="nightly"):
+            return await async_extract(text, "company_basic_view")
+
+    async def _run():
+        nonlocal release_batch
+        release_batch = asyncio.Event()
+        # 批量调用占满批量可用的唯一槽位，另一个批量调用排队
+        batch = [asyncio.ensure_future(_batch(text)) for text in ("文档甲", "文档乙")]
+        await asyncio.sleep(0.01)
+        with scheduling_scope(INTERACTIVE):
+            # 相同文档的交互请求不合并到批量调用上，直接使用保留槽位
+            interactive = await asyncio.wait_for(async_extract("文档甲", "company_basic_view"), timeout=1.0)
+        release_batch.set()
+        await asyncio.gather(*batch)
+        return interactive
+
+    assert asyncio.run(_run()) == "# 公司基本信息\n## 公司名称\n测试公司"
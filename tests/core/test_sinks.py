@@ -0,0 +1,183 @@
+import asyncio
+import json
+import sys
+
+import pytest
+
+from llm_structured_extract.config.settings import ResultSinkConfig
+from llm_structured_extract.core.exceptions import ConfigurationError
+from llm_structured_extract.core.sinks import FileSink, JsonlSink, ParquetSink, ResultRecord, create_sink
+
+
+def _record(i, schema="company_basic_view"):
+    return ResultRecord(f"doc{i}", schema, {"公司名称": f"公司{i}"}, f"# 公司基本信息\n## 公司名称\n公司{i}")
+
+
+def test_records_are_buffered_and_written_in_batches(tmp_path):
+    flushed = []
+
+    async def run():
+        sink = JsonlSink(tmp_path, batch_size=3, flush_interval=None)
+        sink.add_flush_listener(lambda batch: flushed.append([r.doc_id for r in batch]))
+        for i in range(2):
+            await sink.write(_record(i))
+        assert sink.written == 0 and not sink.files
+        await sink.write(_record(2))
+        assert sink.written == 3
+        await sink.write(_record(3))
+        await sink.close()
+        return sink
+
+    sink = asyncio.run(run())
+    assert flushed == [["doc0", "doc1", "doc2"], ["doc3"]]
+    rows = [json.loads(line) for line in sink.files[0].read_text(encoding="utf-8").splitlines()]
+    assert [row["doc_id"] for row in rows] == ["doc0", "doc1", "doc2", "doc3"]
+    assert rows[0]["data"] == {"公司名称": "公司0"} and rows[0]["created_at"] > 0
+
+
+def test_jsonl_rotates_by_size_without_splitting_records(tmp_path):
+    async def run():
+        async with JsonlSink(tmp_path, max_bytes=400, include_raw=False, batch_size=2) as sink:
+            for i in range(10):
+                await sink.write(_record(i))
+        return sink
+
+    sink = asyncio.run(run())
+    assert len(sink.files) > 1
+    lines = [line for path in sink.files for line in path.read_text(encoding="utf-8").splitlines()]
+    assert [json.loads(line)["doc_id"] for line in lines] == [f"doc{i}" for i in range(10)]
+    assert "raw_markdown" not in json.loads(lines[0])
+    assert all(path.stat().st_size <= 400 for path in sink.files)
+
+
+def test_file_sink_keeps_existing_layout(tmp_path):
+    async def run():
+        async with FileSink(tmp_path / "multi", per_document=True) as sink:
+            await sink.write(_record(1))
+            await sink.write(ResultRecord("doc2", "company_basic_view", None, "无法解析"))
+        async with FileSink(tmp_path / "single", per_document=False) as sink:
+            await sink.write(_record(1))
+
+    asyncio.run(run())
+    parsed = json.loads((tmp_path / "multi" / "doc1" / "parsed_json" / "company_basic_view.json").read_text(encoding="utf-8"))
+    assert parsed == {"公司名称": "公司1"}
+    assert (tmp_path / "multi" / "doc2" / "raw_markdown" / "company_basic_view.md").read_text(encoding="utf-8") == "无法解析"
+    assert not (tmp_path / "multi" / "doc2" / "parsed_json").exists()
+    assert (tmp_path / "single" / "raw_markdown" / "company_basic_view.md").exists()
+
+
+def test_periodic_flush_writes_partial_batches(tmp_path):
+    async def run():
+        sink = JsonlSink(tmp_path, batch_size=100, flush_interval=0.01)
+        await sink.write(_record(0))
+        await asyncio.sleep(0.1)
+        written = sink.written
+        await sink.close()
+        return written
+
+    assert asyncio.run(run()) == 1
+
+
+def test_create_sink_from_config(tmp_path, monkeypatch):
+    config = ResultSinkConfig(type="jsonl", batch_size=7, jsonl_max_bytes=1024)
+    sink = create_sink(tmp_path, config=config)
+    assert isinstance(sink, JsonlSink) and sink.batch_size == 7 and sink.max_bytes == 1024
+    assert isinstance(create_sink(tmp_path, kind="files", config=config), FileSink)
+    with pytest.raises(ConfigurationError):
+        create_sink(tmp_path, kind="csv", config=config)
+
+    monkeypatch.setitem(sys.modules, "pyarrow", None)
+    with pytest.raises(ConfigurationError, match="pyarrow"):
+        create_sink(tmp_path, kind="parquet", config=config)
+
+
+def _basic_view(i, controller_ratio=None):
+    return {"risk_check": {"penalties": f"无{i}"}, "equity_structure": {"controller_ratio": controller_ratio}}
+
+
+def test_parquet_sink_partitions_by_schema(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+
+    async def run():
+        async with ParquetSink(tmp_path, batch_size=10) as sink:
+            for i in range(3):
+                await sink.write(ResultRecord(f"doc{i}", "company_basic_view", _basic_view(i)))
+            await sink.write(_record(9, schema="unregistered_view"))
+        return sink
+
+    sink = asyncio.run(run())
+    assert len(sink.files) == 2
+    table = pq.read_table(next(tmp_path.glob("schema=company_basic_view/*.parquet")))
+    assert table.column("doc_id").to_pylist() == ["doc0", "doc1", "doc2"]
+    assert table.column("data").to_pylist()[0]["risk_check"]["penalties"] == "无0"
+    # 没有对应模型的 schema 以 JSON 字符串保存 data
+    other = pq.read_table(next(tmp_path.glob("schema=unregistered_view/*.parquet")))
+    assert json.loads(other.column("data").to_pylist()[0]) == {"公司名称": "公司9"}
+
+
+def test_parquet_part_files_share_one_schema(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+
+    async def run():
+        async with ParquetSink(tmp_path, batch_size=1) as sink:
+            # 第一批该字段全为空，第二批为字符串：按批推断结构时两个分片无法合并读取
+            await sink.write(ResultRecord("doc0", "company_basic_view", _basic_view(0)))
+            await sink.write(ResultRecord("doc1", "company_basic_view", _basic_view(1, controller_ratio="51%")))
+
+    asyncio.run(run())
+    table = pq.read_table(tmp_path / "schema=company_basic_view")
+    ratios = sorted(row["equity_structure"]["controller_ratio"] or "" for row in table.column("data").to_pylist())
+    assert ratios == ["", "51%"]
+
+
+def test_failed_flush_keeps_records_for_retry(tmp_path):
+    flushed = []
+
+    class _FlakySink(JsonlSink):
+        failures = 1
+
+        def _write_batch(self, batch):
+            if self.failures:
+                self.failures -= 1
+                raise OSError("disk full")
+            super()._write_batch(batch)
+
+    async def run():
+        sink = _FlakySink(tmp_path, batch_size=100, flush_interval=0.01)
+        sink.add_flush_listener(lambda batch: flushed.append([r.doc_id for r in batch]))
+        await sink.write(_record(0))
+        await sink.write(_record(1))
+        await asyncio.sleep(0.1)
+        await sink.close()
+        return sink
+
+    sink = asyncio.run(run())
+    assert flushed == [["doc0", "doc1"]]
+    assert sink.written == 2
+
+
+def test_write_does_not_fail_task_when_size_triggered_flush_fails(tmp_path):
+    flushed = []
+
+    class _FlakySink(JsonlSink):
+        failures = 1
+
+        def _write_batch(self, batch):
+            if self.failures:
+                self.failures -= 1
+                raise OSError("disk full")
+            super()._write_batch(batch)
+
+    async def run():
+        sink = _FlakySink(tmp_path, batch_size=1, flush_interval=None)
+        sink.add_flush_listener(lambda batch: flushed.append([r.doc_id for r in batch]))
+        # 记录已进入缓冲区，写出失败不应让调用方把任务判为失败并重做
+        await sink.write(_record(0))
+        assert not flushed
+        await sink.close()
+        return sink
+
+    sink = asyncio.run(run())
+    assert flushed == [["doc0"]]
+    rows = [line for path in tmp_path.glob("*.jsonl") for line in path.read_text(encoding="utf-8").splitlines()]
+    assert len(rows) == sink.written == 1
@@ -0,0 +1,136 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from llm_structured_extract.core.exceptions import LLMCallError, TransientLLMError
+from llm_structured_extract.core.extract import async_stream_extract, stream_extract
+from llm_structured_extract.core.llm_adapters.base_adapter import BaseAdapter
+from llm_structured_extract.core.llm_adapters.dashscope_adapter import DashScopeAdapter
+from llm_structured_extract.core.llm_adapters.ollama_adapter import OllamaAdapter
+from llm_structured_extract.core.retry import RetryBudget, RetryingAdapter
+from llm_structured_extract.core.streaming import AsyncTextStream, TextStream
+from llm_structured_extract.config.settings import ModelConfig, RetryConfig, settings
+
+
+def _sse_event(content):
+    data = {"output": {"choices": [{"message": {"role": "assistant", "content": content}}]}}
+    return f"id:1\nevent:result\ndata:{json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8")
+
+
+def _sse_handler(method, path, headers, body):
+    def _gen():
+        for part in ["# 标题\n", "| 字段 | 值 |\n", "| a | 1 |\n"]:
+            time.sleep(0.02)
+            yield _sse_event(part)
+    return 200, {"Content-Type": "text/event-stream"}, _gen()
+
+
+def test_dashscope_astream_text_yields_incremental_chunks(stub_http_server):
+    server = stub_http_server(_sse_handler)
+    adapter = DashScopeAdapter(model="qwen-test", api_key="test-key", base_url=server.url)
+
+    async def _run():
+        stream = AsyncTextStream(adapter.astream_text("prompt"), schema_name="demo")
+        return [chunk async for chunk in stream], stream
+
+    chunks, stream = asyncio.run(_run())
+
+    assert chunks == ["# 标题\n", "| 字段 | 值 |\n", "| a | 1 |\n"]
+    assert stream.text == "".join(chunks)
+    assert server.requests[0]["headers"]["x-dashscope-sse"] == "enable"
+    assert json.loads(server.requests[0]["body"])["parameters"]["incremental_output"] is True
+
+    stats = stream.stats
+    assert stats.chunks == 3
+    assert stats.time_to_first_token >= 0.02
+    assert len(stats.inter_chunk_latencies) == 2
+    assert stats.mean_inter_token_latency > 0
+
+
+class _FlakyStreamAdapter(BaseAdapter):
+    def __init__(self, fail_after=None):
+        self.calls = 0
+        self.fail_after = fail_after
+
+    def generate_text(self, prompt, context_cache_id=None):
+        raise NotImplementedError
+
+    async def agenerate_text(self, prompt, context_cache_id=None):
+        raise NotImplementedError
+
+    def stream_text(self, prompt, context_cache_id=None):
+        self.calls += 1
+        if self.fail_after is None and self.calls == 1:
+            raise TransientLLMError("503 before first chunk")
+        yield "a"
+        if self.fail_after is not None:
+            raise TransientLLMError("connection dropped mid-stream")
+        yield "b"
+
+    async def astream_text(self, prompt, context_cache_id=None):
+        self.calls += 1
+        if self.fail_after is None and self.calls == 1:
+            raise TransientLLMError("503 before first chunk")
+        yield "a"
+        if self.fail_after is not None:
+            raise TransientLLMError("connection dropped mid-stream")
+        yield "b"
+
+
+def _retrying(inner):
+    config = RetryConfig(max_attempts=3, initial_backoff=0.0, max_backoff=0.0)
+    return RetryingAdapter(inner, config=config, budget=RetryBudget(max_tokens=10))
+
+
+def test_stream_retries_only_before_first_chunk():
+    inner = _FlakyStreamAdapter()
+    stream = TextStream(_retrying(inner).stream_text("prompt"))
+    assert list(stream) == ["a", "b"]
+    assert inner.calls == 2
+
+    # 已产出分片后失败不再重试，避免调用方收到重复内容
+    inner = _FlakyStreamAdapter(fail_after=1)
+    stream = TextStream(_retrying(inner).stream_text("prompt"))
+    with pytest.raises(TransientLLMError):
+        list(stream)
+    assert inner.calls == 1
+    assert stream.text == "a"
+
+
+def test_stream_extract_wraps_provider_errors(fake_adapter):
+    fake_adapter(_FlakyStreamAdapter)
+
+    async def _consume():
+        return [chunk async for chunk in await async_stream_extract("某公司成立于2015年。", "company_basic_view")]
+
+    # 与 extract 一致：提供商错误包装为 LLMCallError
+    with pytest.raises(LLMCallError, match="503 before first chunk") as excinfo:
+        list(stream_extract("某公司成立于2015年。", "company_basic_view"))
+    assert isinstance(excinfo.value.__cause__, TransientLLMError)
+
+    # 重新创建适配器实例，异步路径同样在首个分片前失败
+    fake_adapter(_FlakyStreamAdapter)
+    with pytest.raises(LLMCallError, match="503 before first chunk") as excinfo:
+        asyncio.run(_consume())
+    assert isinstance(excinfo.value.__cause__, TransientLLMError)
+
+
+def test_abandoned_ollama_stream_releases_parallel_slot(stub_http_server, monkeypatch):
+    monkeypatch.setitem(settings.yaml_config.llm.models, "ollama", ModelConfig(name="qwen-local", max_concurrency=1))
+
+    def _handler(method, path, headers, body):
+        lines = [{"message": {"content": "# 标题"}, "done": False}, {"message": {"content": "\n内容"}, "done": True}]
+        return 200, {"Content-Type": "application/x-ndjson"}, [json.dumps(line).encode() + b"\n" for line in lines]
+
+    adapter = OllamaAdapter(host=stub_http_server(_handler).url)
+    stream = TextStream(_retrying(adapter).stream_text("prompt"))
+    chunks = iter(stream)
+    assert next(chunks) == "# 标题"
+    chunks.close()
+
+    # 调用方仍持有 stream 对象，槽位也要在提前结束迭代时释放
+    slot = adapter._sync_slot()
+    assert slot.acquire(blocking=False)
+    slot.release()
@@ -0,0 +1,54 @@
+import asyncio
+
+from llm_structured_extract.config.settings import ModelConfig, settings
+from llm_structured_extract.core.llm_adapters.dashscope_adapter import DashScopeAdapter
+from llm_structured_extract.core.request_context import request_scope
+from llm_structured_extract.core.usage import estimate_cost, record_usage, usage_scope
+from llm_structured_extract.utils.metrics import metrics
+
+
+def _usage_handler(method, path, headers, body):
+    return 200, {}, {
+        "output": {"choices": [{"message": {"role": "assistant", "content": "# 标题\n内容"}}]},
+        "usage": {"input_tokens": 1200, "output_tokens": 300, "prompt_tokens_details": {"cached_tokens": 1000}},
+    }
+
+
+def test_dashscope_reports_usage_per_schema(stub_http_server):
+    server = stub_http_server(_usage_handler)
+    adapter = DashScopeAdapter(model="qwen-test", api_key="test-key", base_url=server.url)
+    before = metrics.get("llm_cached_tokens_total", provider="dashscope", model="qwen-test", schema="company_basic_view", route="default")
+
+    async def _run():
+        with request_scope(schema="company_basic_view"):
+            return await adapter.agenerate_text("prompt")
+
+    with usage_scope(name="job") as job:
+        asyncio.run(_run())
+
+    usage = job.by_schema["company_basic_view"]
+    assert (usage.calls, usage.prompt_tokens, usage.completion_tokens, usage.cached_tokens) == (1, 1200, 300, 1000)
+    assert usage.latency > 0
+    assert usage.cost == estimate_cost("dashscope", 1200, 300, 1000)
+    assert metrics.get("llm_cached_tokens_total", provider="dashscope", model="qwen-test", schema="company_basic_view", route="default") == before + 1000
+
+
+def test_nested_scopes_aggregate_job_document_and_schema(monkeypatch):
+    monkeypatch.setitem(
+        settings.yaml_config.llm.models, "openai",
+        ModelConfig(name="m", input_price_per_1k=1.0, output_price_per_1k=2.0, cached_input_price_per_1k=0.1),
+    )
+
+    with usage_scope(name="job") as job:
+        for document in ("a.md", "b.md"):
+            with usage_scope(name=document) as doc:
+                for schema in ("s1", "s2"):
+                    with request_scope(schema=schema):
+                        record_usage("openai", "m", prompt_tokens=1000, completion_tokens=500, cached_tokens=400)
+            assert doc.total.calls == 2 and set(doc.by_schema) == {"s1", "s2"}
+
+    report = job.as_dict()
+    assert report["total"]["calls"] == 4
+    assert report["by_schema"]["s1"]["prompt_tokens"] == 2000
+    # 600 未缓存 * 1.0 + 400 缓存 * 0.1 + 500 输出 * 2.0（每千 Token）
+    assert report["total"]["cost"] == round(4 * (0.6 + 0.04 + 1.0), 6)
@@ -0,0 +1,135 @@
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip("aiohttp")
+from aiohttp.test_utils import TestClient, TestServer
+
+from llm_structured_extract.config.settings import ServiceConfig
+from llm_structured_extract.core.llm_adapters.base_adapter import BaseAdapter
+from llm_structured_extract_service.batches import LocalBatchBackend
+from llm_structured_extract_service.main import BATCHES_KEY, create_app
+
+MARKDOWN = "# 公司基本信息\n## 公司名称\n测试公司"
+
+
+class _ServiceAdapter(BaseAdapter):
+    delay = 0.0
+
+    def generate_text(self, prompt, context_cache_id=None):
+        raise NotImplementedError
+
+    async def agenerate_text(self, prompt, context_cache_id=None):
+        await asyncio.sleep(self.delay)
+        return MARKDOWN
+
+    async def astream_text(self, prompt, context_cache_id=None):
+        for line in MARKDOWN.splitlines(keepends=True):
+            await asyncio.sleep(0)
+            yield line
+
+
+@pytest.fixture
+def fake_llm(fake_adapter, monkeypatch):
+    monkeypatch.setattr(_ServiceAdapter, "delay", 0.0)
+    return fake_adapter(_ServiceAdapter)
+
+
+def _run(tmp_path, scenario, **config):
+    async def main():
+        service_config = ServiceConfig(**{"default_timeout": 10, **config})
+        app = create_app(service_config, batch_backend=LocalBatchBackend(output_dir=str(tmp_path)))
+        async with TestClient(TestServer(app)) as client:
+            return await scenario(client)
+
+    return asyncio.run(main())
+
+
+def _events(body: str):
+    events = []
+    for block in body.strip().split("\n\n"):
+        if block.startswith(":"):
+            events.append(("keepalive", None))
+            continue
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def test_extract_endpoints_and_error_mapping(tmp_path, fake_llm):
+    async def scenario(client):
+        resp = await client.post("/v1/extract_to_model", json={"text": "某公司", "schema": "company_basic_view"})
+        model = (resp.status, await resp.json())
+        resp = await client.post("/v1/extract", json={"text": "某公司", "schema": "company_basic_view"})
+        markdown = (resp.status, await resp.json())
+        bad_schema = (await client.post("/v1/extract", json={"text": "某公司", "schema": "no_such_schema"})).status
+        missing_text = (await client.post("/v1/extract", json={"schema": "company_basic_view"})).status
+        return model, markdown, bad_schema, missing_text
+
+    model, markdown, bad_schema, missing_text = _run(tmp_path, scenario)
+    assert model[0] == 200 and model[1]["schema"] == "company_basic_view" and "result" in model[1]
+    assert markdown == (200, {"schema": "company_basic_view", "markdown": MARKDOWN})
+    assert (bad_schema, missing_text) == (400, 400)
+
+
+def test_saturated_service_returns_429(tmp_path, fake_llm):
+    fake_llm.delay = 0.3
+
+    async def scenario(client):
+        body = {"text": "某公司", "schema": "company_basic_view"}
+        first = asyncio.ensure_future(client.post("/v1/extract", json=body))
+        await asyncio.sleep(0.05)
+        rejected = await client.post("/v1/extract", json={**body, "text": "另一家公司"})
+        health = await (await client.get("/healthz")).json()
+        return (await first).status, rejected.status, rejected.headers.get("Retry-After"), await rejected.json(), health
+
+    first, rejected, retry_after, payload, health = _run(tmp_path, scenario, max_concurrency=1, max_queue=0)
+    assert (first, rejected) == (200, 429)
+    assert retry_after and payload["reason"] == "queue_full"
+    assert health["active"] == 1
+
+
+def test_streaming_responses(tmp_path, fake_llm):
+    async def scenario(client):
+        body = {"text": "某公司", "schema": "company_basic_view", "stream": True}
+        markdown = await (await client.post("/v1/extract", json=body)).text()
+        fake_llm.delay = 0.2
+        model = await client.post("/v1/extract_to_model", json=body, headers={"Accept": "text/event-stream"})
+        return markdown, model.headers["Content-Type"], await model.text()
+
+    markdown, content_type, model = _run(tmp_path, scenario, stream_heartbeat=0.05)
+    events = _events(markdown)
+    assert [e for e, _ in events] == ["chunk"] * 3 + ["done"]
+    assert "".join(data["text"] for e, data in events if e == "chunk") == MARKDOWN
+    assert content_type.startswith("text/event-stream")
+    events = _events(model)
+    assert events[0][0] == "keepalive" and events[-1][0] == "result"
+    assert events[-1][1]["schema"] == "company_basic_view"
+
+
+def test_batch_submission_and_status(tmp_path, fake_llm):
+    async def scenario(client):
+        body = {
+            "job": "nightly",
+            "schemas": ["company_basic_view"],
+            "documents": [{"id": "a", "text": "甲公司"}, {"id": "b", "text": "乙公司"}],
+        }
+        submitted = await client.post("/v1/batch", json=body)
+        duplicate = (await client.post("/v1/batch", json=body)).status
+        invalid = (await client.post("/v1/batch", json={**body, "job": "../etc"})).status
+        for _ in range(100):
+            status = await (await client.get("/v1/batch/nightly")).json()
+            if status["state"] != "running":
+                break
+            await asyncio.sleep(0.02)
+        missing = (await client.get("/v1/batch/unknown")).status
+        # 结束的任务只保留状态摘要，不再持有 BatchRunner 与文档正文
+        assert not client.app[BATCHES_KEY]._running
+        return submitted.status, await submitted.json(), duplicate, invalid, status, missing
+
+    code, submitted, duplicate, invalid, status, missing = _run(tmp_path, scenario)
+    assert (code, submitted["status_url"]) == (202, "/v1/batch/nightly")
+    assert (duplicate, invalid, missing) == (409, 400, 404)
+    assert status["state"] == "done" and status["tasks_done"] == 2 and status["tasks_failed"] == 0
+    assert (tmp_path / "nightly" / "a" / "parsed_json" / "company_basic_view.json").exists()
@@ -0,0 +1,139 @@
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from llm_structured_extract.config.settings import WorkerConfig
+from llm_structured_extract.core.llm_adapters.base_adapter import BaseAdapter
+from llm_structured_extract.core.sinks import ResultRecord
+from llm_structured_extract.core.usage import UsageTracker, record_usage
+from llm_structured_extract_service.queue import DEAD, RETRY, STALE, RedisTaskQueue
+from llm_structured_extract_service.worker import ExtractionWorker, _delivery
+
+SCHEMAS = ["company_basic_view", "company_industry_view"]
+
+
+def _queue(server=None, **overrides):
+    client = fakeredis.FakeRedis(server=server or fakeredis.FakeServer(), decode_responses=True)
+    return RedisTaskQueue(client, name="test", config=WorkerConfig(**{"retry_delay": 0, **overrides}))
+
+
+def test_claims_are_exclusive_and_expire_after_visibility_timeout():
+    server = fakeredis.FakeServer()
+    producer, a, b = (_queue(server, visibility_timeout=0.2) for _ in range(3))
+    producer.enqueue("文档正文", SCHEMAS, job="job1", doc_id="doc1")
+
+    first, second = a.claim(), b.claim()
+    assert {first.schema, second.schema} == set(SCHEMAS)
+    assert a.claim() is None and a.document(first) == "文档正文"
+    assert a.stats() == {"visible": 0, "invisible": 2, "dead": 0}
+
+    # 续期的任务保持不可见；未续期的到期后重新投递，旧回执失效
+    time.sleep(0.12)
+    assert a.extend(first)
+    time.sleep(0.12)
+    redelivered = b.claim()
+    assert redelivered.task_id == second.task_id and redelivered.attempts == 2
+    assert not b.ack(second)
+    assert b.ack(redelivered) and a.ack(first)
+    assert producer.stats() == {"visible": 0, "invisible": 0, "dead": 0}
+    assert producer.job_stats("job1") == {"enqueued": 2, "done": 2}
+
+
+def test_failed_tasks_retry_then_dead_letter_and_redrive():
+    queue = _queue(max_attempts=2)
+    queue.enqueue("文档正文", SCHEMAS[:1], job="job1", doc_id="doc1")
+
+    task = queue.claim()
+    assert queue.nack(task, "boom") == RETRY
+    assert queue.nack(task, "boom") == STALE
+    task = queue.claim()
+    assert queue.nack(task, "boom again") == DEAD
+    assert queue.claim() is None
+
+    [dead] = queue.dead_letters()
+    assert (dead["doc_id"], dead["last_error"], dead["attempts"]) == ("doc1", "boom again", "2")
+    assert queue.redrive() == 1
+    task = queue.claim()
+    assert task.attempts == 1 and queue.ack(task)
+    assert queue.job_stats("job1") == {"enqueued": 1, "retried": 1, "dead": 0, "done": 1}
+
+
+def test_tasks_abandoned_too_often_are_dead_lettered_on_claim():
+    queue = _queue(max_attempts=1, visibility_timeout=0.01)
+    queue.enqueue("文档正文", SCHEMAS[:1], job="job1", doc_id="doc1")
+    assert queue.claim() is not None
+    time.sleep(0.02)
+    assert queue.claim() is None
+    assert queue.stats()["dead"] == 1
+    assert queue.dead_letters()[0]["last_error"] == "visibility timeout exceeded"
+
+
+def test_concurrent_claims_hand_out_each_task_once():
+    server = fakeredis.FakeServer()
+    producer = _queue(server)
+    task_ids = producer.enqueue("文档正文", [f"schema_{i}" for i in range(40)], job="job1", doc_id="doc1")
+    consumers = [_queue(server) for _ in range(8)]
+
+    def _drain(queue):
+        claimed = []
+        while (task := queue.claim()) is not None:
+            claimed.append(task.task_id)
+        return claimed
+
+    with ThreadPoolExecutor(max_workers=len(consumers)) as pool:
+        claimed = [task_id for batch in pool.map(_drain, consumers) for task_id in batch]
+    assert sorted(claimed) == sorted(task_ids)
+
+
+class _WorkerAdapter(BaseAdapter):
+    def generate_text(self, prompt, context_cache_id=None):
+        raise NotImplementedError
+
+    async def agenerate_text(self, prompt, context_cache_id=None):
+        await asyncio.sleep(0.01)
+        if "坏文档" in prompt:
+            raise RuntimeError("boom")
+        record_usage("fake", "fake", prompt_tokens=100, completion_tokens=10)
+        return "# 公司基本信息\n## 公司名称\n测试公司"
+
+
+def test_worker_processes_queue_and_acks_after_results_are_written(tmp_path, fake_adapter):
+    fake_adapter(_WorkerAdapter)
+
+    queue = _queue(max_attempts=2)
+    queue.enqueue("某公司成立于2010年。", SCHEMAS, job="nightly", doc_id="good")
+    queue.enqueue("坏文档", SCHEMAS[:1], job="nightly", doc_id="bad")
+
+    worker = ExtractionWorker(queue, concurrency=1, output_dir=str(tmp_path), sink_kind="jsonl")
+    asyncio.run(worker.run(drain=True))
+
+    stats = queue.job_stats("nightly")
+    assert (stats["done"], stats["retried"], stats["dead"]) == (2, 1, 1)
+    assert stats["prompt_tokens"] == 200
+    assert queue.stats() == {"visible": 0, "invisible": 0, "dead": 1}
+    rows = [json.loads(line) for path in (tmp_path / "nightly").glob("*.jsonl") for line in path.read_text(encoding="utf-8").splitlines()]
+    assert sorted((row["doc_id"], row["schema"]) for row in rows) == [("good", schema) for schema in SCHEMAS]
+
+
+def test_written_result_acks_its_own_delivery(tmp_path):
+    queue = _queue(visibility_timeout=0.01)
+    queue.enqueue("文档正文", SCHEMAS[:1], job="nightly", doc_id="doc1")
+    stale = queue.claim()
+    time.sleep(0.02)
+    current = queue.claim()
+    assert current.task_id == stale.task_id
+
+    worker = ExtractionWorker(queue, output_dir=str(tmp_path))
+    for task in (stale, current):
+        worker._unacked[_delivery(task)] = (task, UsageTracker())
+    record = ResultRecord(current.doc_id, current.schema, {}, delivery=_delivery(current))
+    worker._ack_written("nightly", [record])
+
+    # 新投递被确认，旧投递仍按自己的回执等待（其确认会被队列判为过期）
+    assert queue.job_stats("nightly")["done"] == 1
+    assert list(worker._unacked) == [_delivery(stale)]